@@ -10,32 +10,245 @@ import os
 import os.path as path
 import re
 import shutil
+import stat
 import glob
+import hashlib
+import json
+import time
 from FuzzyFileNav.multiconf import get as qualify_settings
-from FuzzyFileNav.notify import error, notify
-import platform
-if platform.system() == "Windows":
-    import ctypes
+from FuzzyFileNav.notify import error, notify, set_sub_notify
+from FuzzyFileNav.lib import listing
+from FuzzyFileNav.lib.cache import ListingCache, ListingStore, signature
+from FuzzyFileNav.lib.complete import CompletionIndex
+from FuzzyFileNav.lib.fuzzy import Matcher
+from FuzzyFileNav.lib.guard import Guard, Unreachable
+from FuzzyFileNav.lib.index import FileIndex
+from FuzzyFileNav.lib.jobs import ScanJob, WorkQueue
+from FuzzyFileNav.lib.reach import REACHABLE, Reachability
+from FuzzyFileNav.lib.settings import SettingsStore
+from FuzzyFileNav.lib.statcache import StatCache
+from FuzzyFileNav.lib.transfer import PasteJob, format_size, is_temporary
+from FuzzyFileNav.lib.walk import WalkJob
+from FuzzyFileNav.lib.watch import create_watcher
 
 FUZZY_SETTINGS = "fuzzy_file_nav.sublime-settings"
 CMD_WIN = r"^(?:(?:(~)|(\.\.))(?:\\|/)|((?:[A-Za-z]{1}:)?(?:\\|/))|([\w\W]*(?:\\|/)))$"
 CMD_NIX = r"^(?:(?:(~)|(\.\.))/|(/)|([\w\W]*/))$"
 WIN_DRIVE = r"(^[A-Za-z]{1}:(?:\\|/))"
 PLATFORM = None
+LISTING_CACHE = ListingCache()
+PREFETCH_CACHE = ListingCache(20000)
+LISTING_STORE = ListingStore()
+STORE_QUEUE = WorkQueue(low_priority=True)
+WARM_QUEUE = WorkQueue(low_priority=True)
+IDLE_QUEUE = WorkQueue(low_priority=True)
+INDEX_QUEUE = WorkQueue(low_priority=True)
+NARROW_QUEUE = WorkQueue()
+NARROW_MATCHER = [None, None, None]
+NARROW_DELAY = 100
+INDEXES = {}
+INDEX_RESULT_LIMIT = 200
+EXCLUDES = listing.Excludes()
+# File system checks made on the UI thread go through `FS`, so a stale mount can't hang Sublime.
+FS = Guard()
+STAT_CACHE = StatCache(FS.stat)
+REACHABILITY = Reachability()
+SETTINGS = SettingsStore(
+    lambda: sublime.load_settings(FUZZY_SETTINGS),
+    lambda obj, key, default: qualify_settings(obj, key, default, expanduser)
+)
+PANEL_REFRESH_INTERVAL = 0.5
+WATCH_LIMIT = 64
+WATCHER = None
+STATUS_KEY = "fuzzy_file_nav"
+PASTE_STATUS_KEY = "fuzzy_file_nav_paste"
 
 
 def debug_log(s):
     """Debug log."""
-    if sublime.load_settings(FUZZY_SETTINGS).get("debug", False):
+    if SETTINGS.get().debug:
         print("FuzzyFileNav: {}".format(s))
 
 
-def status_cwd():
-    """Set the status bar to the current working directory."""
+def get_watcher():
+    """Get the folder watcher, creating it if watching is enabled."""
 
-    if FuzzyFileNavCommand.status:
-        sublime.run_command("fuzzy_get_cwd")
-        sublime.set_timeout(status_cwd, 1000)
+    global WATCHER
+    backend = SETTINGS.get().folder_watcher
+    if backend not in ("auto", "inotify", "poll"):
+        return None
+    if WATCHER is None:
+        try:
+            WATCHER = create_watcher(
+                lambda changes: sublime.set_timeout(lambda: FuzzyFileNavCommand.queue_changes(changes), 0),
+                backend
+            )
+        except OSError as e:
+            debug_log("folder watcher unavailable - {}".format(e))
+            return None
+    return WATCHER
+
+
+def close_watcher():
+    """Close the folder watcher."""
+
+    global WATCHER
+    if WATCHER is not None:
+        WATCHER.close()
+        WATCHER = None
+
+
+def release_matcher():
+    """Drop the large listing matcher (runs on the narrowing worker)."""
+
+    NARROW_MATCHER[:] = [None, None, None]
+
+
+def get_index_file(root):
+    """Get the file the index of a folder is stored in."""
+
+    folder = path.join(sublime.cache_path(), "FuzzyFileNav", "index")
+    os.makedirs(folder, exist_ok=True)
+    return path.join(folder, hashlib.sha1(root.encode("utf-8", "surrogateescape")).hexdigest() + ".idx")
+
+
+def get_store_folder():
+    """Get the folder listings are persisted in."""
+
+    return path.join(sublime.cache_path(), "FuzzyFileNav", "listings")
+
+
+def store_listing(cwd, sig, folder):
+    """Persist a folder's listing in the background."""
+
+    if LISTING_STORE:
+        STORE_QUEUE.submit(save_listing, cwd, sig, folder.all.copy())
+
+
+def save_listing(cwd, sig, result):
+    """Write a listing to the store (runs on the store worker)."""
+
+    try:
+        LISTING_STORE.save(cwd, sig, result)
+    except OSError as e:
+        debug_log("listing not stored - {}".format(e))
+
+
+def get_warm_up_targets(window):
+    """Get the folders to list ahead of time: home, the bookmarks, and the window's project folders."""
+
+    settings = SETTINGS.get()
+    targets = [settings.home] + [bm.path for bm in settings.bookmarks if bm.warm and bm.path]
+    if window is not None:
+        targets.extend(window.folders())
+    found = set()
+    folders = []
+    for target in targets:
+        if not target:
+            # `normpath` would turn an empty path into the working directory.
+            continue
+        target = path.normpath(target)
+        if target not in found:
+            found.add(target)
+            folders.append(target)
+    return folders
+
+
+def warm_up():
+    """Queue the warm-up folders to be listed in the background."""
+
+    if not SETTINGS.get().warm_up:
+        return
+    WARM_QUEUE.clear()
+    for target in get_warm_up_targets(sublime.active_window()):
+        WARM_QUEUE.submit(warm_folder, target)
+
+
+def warm_folder(target):
+    """Read a folder into the listing cache if it isn't cached already (runs on the warm-up worker)."""
+
+    try:
+        # A dead mount only holds up the worker until the deadline, and is then skipped until it responds again.
+        if not FS.isdir(target):
+            return
+        sig = FS.call(target, signature, target)
+        if LISTING_CACHE.peek(target, sig):
+            return
+        start = time.perf_counter()
+        folder = listing.Folder(listing.scan(target), EXCLUDES, "\\" if PLATFORM == "windows" else "/")
+        LISTING_CACHE.put(target, sig, folder)
+        store_listing(target, sig, folder)
+        debug_log(
+            "warmed up - {} ({} entries, {:.0f} ms)".format(
+                target, len(folder) - 1, (time.perf_counter() - start) * 1000
+            )
+        )
+    except OSError as e:
+        debug_log("warm up failed - {} - {}".format(target, e))
+
+
+def get_entry_filter(hide_hidden):
+    """Get a `DirEntry` filter that applies the hidden file rules, or `None` if nothing is hidden."""
+
+    if not hide_hidden:
+        return None
+    excludes = EXCLUDES
+    return lambda e: not listing.is_hidden(e) and not excludes.match(e.name)
+
+
+def get_index_filter():
+    """Get the key and entry filter for indexes built with the current hidden file settings."""
+
+    hide_hidden = not SETTINGS.get().show_system_hidden_files
+    return json.dumps([hide_hidden, list(EXCLUDES.patterns)]), get_entry_filter(hide_hidden)
+
+
+def update_index(root):
+    """Load the index of a folder and bring it up to date (runs on the index worker)."""
+
+    key, accept = get_index_filter()
+    idx = INDEXES.get(root)
+    filename = None
+    try:
+        filename = get_index_file(root)
+        if idx is None:
+            idx = FileIndex.load(filename)
+    except (OSError, ValueError):
+        pass
+    if idx is None or idx.key != key or idx.root != root:
+        idx = FileIndex(root, key)
+
+    start = time.perf_counter()
+    listed = idx.update(accept)
+    INDEXES[root] = idx
+    if listed and filename is not None:
+        try:
+            idx.save(filename)
+        except OSError as e:
+            debug_log("index not saved - {}".format(e))
+    debug_log(
+        "index updated - {} ({} files, {} folders listed, {:.0f} ms)".format(
+            root, len(idx), listed, (time.perf_counter() - start) * 1000
+        )
+    )
+    return idx
+
+
+def get_indexed_roots(window):
+    """Get the `[name, path]` of the bookmarks and project folders that are indexed."""
+
+    settings = SETTINGS.get()
+    roots = [[bm.name, bm.path] for bm in settings.bookmarks if bm.index and bm.path]
+    if settings.index_project_folders:
+        roots.extend([path.basename(f) or f, f] for f in window.folders())
+    found = set()
+    indexed = []
+    for name, root in roots:
+        root = path.normpath(root)
+        if root not in found and FS.isdir(root):
+            found.add(root)
+            indexed.append([name, root])
+    return indexed
 
 
 def get_root_path():
@@ -59,14 +272,17 @@ def get_path_true_case(pth):
     if PLATFORM == "windows":
         # http://stackoverflow.com/a/14742779
         true_path = None
-        if path.exists(pth):
+        if FS.exists(pth):
             glob_test = []
             parts = path.normpath(pth).split('\\')
             glob_test.append(parts[0].upper())
             for p in parts[1:]:
                 glob_test.append("{}[{}]".format(p[:-1], p[-1]))
-            results = glob.glob('\\'.join(glob_test))
-            if results is not None:
+            try:
+                results = FS.call(pth, glob.glob, '\\'.join(glob_test))
+            except Unreachable:
+                results = None
+            if results:
                 true_path = results[0]
     else:
         true_path = pth
@@ -95,7 +311,7 @@ def back_dir(cwd):
 def get_drives():
     """Search through valid drive names and see if they exist."""
 
-    return [d + ":" for d in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" if path.exists(d + ":")]
+    return [d + ":" for d in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" if FS.exists(d + ":")]
 
 
 def back_to_root(cwd):
@@ -165,6 +381,10 @@ class FuzzyPanelText(object):
 class FuzzyEventListener(sublime_plugin.EventListener):
     """Listener that detects panel closes, shortcuts pressed in the panel, and panel content changes."""
 
+    panel_text = ""
+    full_name = ""
+    empty = True
+
     def on_activated(self, view):
         """Track when fuzzy panels are activated or deactivated."""
 
@@ -177,15 +397,45 @@ class FuzzyEventListener(sublime_plugin.EventListener):
             (FuzzyFileNavCommand.view is None or FuzzyFileNavCommand.view.id() != view.id())
         ):
             FuzzyFileNavCommand.view = view
+        # Restore text typed before the panel was refreshed.
+        if (
+            FuzzyFileNavCommand.active and FuzzyFileNavCommand.restore_text and
+            FuzzyFileNavCommand.view is not None and FuzzyFileNavCommand.view.id() == view.id() and
+            view.element() == "quick_panel:input"
+        ):
+            FuzzyEditGlobal.bfr = FuzzyFileNavCommand.restore_text
+            FuzzyEditGlobal.region = sublime.Region(0, view.size())
+            FuzzyFileNavCommand.restore_text = None
+            view.run_command("fuzzy_apply_edits")
+            FuzzyEditGlobal.clear()
+            sels = view.sel()
+            sels.clear()
+            sels.add(sublime.Region(view.size()))
 
     def on_query_context(self, view, key, operator, operand, match_all):
         """Capture shortcuts in a `FuzzyNavPanel`."""
 
         active = FuzzyFileNavCommand.active is True
         if active and FuzzyFileNavCommand.view is not None and FuzzyFileNavCommand.view.id() == view.id():
-            FuzzyPanelText.set_content(view.substr(view.line(view.sel()[0])))
-            full_name = path.join(FuzzyFileNavCommand.cwd, FuzzyPanelText.get_content())
-            empty = (FuzzyPanelText.get_content().strip() in ("", '.', '..'))
+            # Sublime queries every binding's context for each key press, so only read the panel
+            # and stat paths once per change of the panel's content.
+            panel_key = (view.id(), view.change_count(), FuzzyFileNavCommand.cwd)
+            if panel_key != STAT_CACHE.key:
+                self.panel_text = view.substr(view.line(view.sel()[0]))
+                self.full_name = path.join(FuzzyFileNavCommand.cwd, self.panel_text)
+                self.empty = (self.panel_text.strip() in ("", '.', '..'))
+            folder = FuzzyFileNavCommand.folder
+            STAT_CACHE.update(
+                panel_key, FuzzyFileNavCommand.cwd,
+                folder.all if folder is not None else FuzzyFileNavCommand.listing
+            )
+            FuzzyPanelText.set_content(self.panel_text)
+            full_name = self.full_name
+            empty = self.empty
+            exists = STAT_CACHE.exists
+            isdir = STAT_CACHE.isdir
+            # Paths on a stale mount don't exist, but actions that would create them are disabled too.
+            unreachable = STAT_CACHE.unreachable
             # See if this is the auto-complete path command
             if key in [
                 "fuzzy_path_complete", "fuzzy_path_complete_back", "fuzzy_toggle_hidden",
@@ -195,16 +445,16 @@ class FuzzyEventListener(sublime_plugin.EventListener):
             elif key == "fuzzy_open_folder":
                 if (
                     (
-                        (not empty and path.exists(full_name) and path.isdir(full_name)) or
-                        (empty and path.exists(FuzzyFileNavCommand.cwd))
+                        (not empty and exists(full_name) and isdir(full_name)) or
+                        (empty and exists(FuzzyFileNavCommand.cwd))
                     )
                 ):
                     return active
-            elif key in ["fuzzy_reveal", "fuzzy_search"]:
-                if path.exists(FuzzyFileNavCommand.cwd):
+            elif key in ["fuzzy_reveal", "fuzzy_search", "fuzzy_flatten"]:
+                if exists(FuzzyFileNavCommand.cwd):
                     return active
                 else:
-                    notify("{} does not exist!".format(FuzzyFileNavCommand.cwd))
+                    self.missing(FuzzyFileNavCommand.cwd)
             elif key in ["fuzzy_quick_open"]:
                 sels = view.sel()
                 if len(sels) == 1:
@@ -213,37 +463,49 @@ class FuzzyEventListener(sublime_plugin.EventListener):
                     else:
                         pass
             elif key == "fuzzy_delete":
-                if not empty and path.exists(full_name):
+                if not empty and exists(full_name):
                     return active
                 elif not empty:
-                    notify("{} does not exist!".format(full_name))
+                    self.missing(full_name)
             elif key in ["fuzzy_make_file", "fuzzy_make_folder"]:
-                if not empty and not path.exists(full_name):
+                if not empty and not exists(full_name) and not unreachable(full_name):
                     return active
+                elif not empty and unreachable(full_name):
+                    self.missing(full_name)
                 elif not empty:
                     notify("{} already exists!".format(full_name))
             elif key == "fuzzy_save_as":
-                if not empty and (not path.exists(full_name) or not path.isdir(full_name)):
+                if not empty and not unreachable(full_name) and (not exists(full_name) or not isdir(full_name)):
                     return active
+                elif not empty and unreachable(full_name):
+                    self.missing(full_name)
                 elif not empty:
                     notify("{} is a directory!".format(full_name))
             elif key == "fuzzy_copy":
-                if not empty and path.exists(full_name):
+                if not empty and exists(full_name):
                     return active
                 elif not empty:
-                    notify("{} does not exist!".format(full_name))
+                    self.missing(full_name)
             elif key == "fuzzy_cut":
-                if path.exists(FuzzyFileNavCommand.cwd):
+                if exists(FuzzyFileNavCommand.cwd):
                     return active
                 else:
-                    notify("{} does not exist!".format(FuzzyFileNavCommand.cwd))
+                    self.missing(FuzzyFileNavCommand.cwd)
             elif key == "fuzzy_paste":
-                if path.exists(FuzzyFileNavCommand.cwd) and len(FuzzyClipboardCommand.clips):
+                if exists(FuzzyFileNavCommand.cwd) and len(FuzzyClipboardCommand.clips):
                     return active
                 else:
-                    notify("{} does not exist!".format(FuzzyFileNavCommand.cwd))
+                    self.missing(FuzzyFileNavCommand.cwd)
         return False
 
+    def missing(self, target):
+        """Tell the user that a path doesn't exist, or didn't respond."""
+
+        if STAT_CACHE.unreachable(target):
+            notify("{} is not reachable!".format(target))
+        else:
+            notify("{} does not exist!".format(target))
+
     def on_modified(self, view):
         """Monitor content change in the panel and take actions accordingly."""
 
@@ -255,14 +517,15 @@ class FuzzyEventListener(sublime_plugin.EventListener):
             win = view.window()
             line_text = view.substr(view.line(sel))
             FuzzyPathCompleteCommand.update_autocomplete(line_text)
+            FuzzyFileNavCommand.queue_narrow(line_text)
             regex = CMD_WIN if PLATFORM == "windows" else CMD_NIX
             m = re.match(regex, line_text)
             if m:
                 if m.group(1):
                     # Go Home
                     FuzzyFileNavCommand.fuzzy_reload = True
-                    home = qualify_settings(sublime.load_settings(FUZZY_SETTINGS), "home", "", expanduser)
-                    home = get_root_path() if not path.exists(home) or not path.isdir(home) else home
+                    home = SETTINGS.get().home
+                    home = get_root_path() if not FS.isdir(home) else home
                     win.run_command("hide_overlay")
                     win.run_command("fuzzy_file_nav", {"start": home})
                 elif m.group(2):
@@ -274,7 +537,7 @@ class FuzzyEventListener(sublime_plugin.EventListener):
                     # Go to root of drive/computer
                     new_path = None
                     if PLATFORM == "windows" and re.match(WIN_DRIVE, line_text):
-                        if path.exists(line_text):
+                        if FS.exists(line_text):
                             new_path = line_text.upper()
                     else:
                         new_path = back_to_root(FuzzyFileNavCommand.cwd)
@@ -285,7 +548,7 @@ class FuzzyEventListener(sublime_plugin.EventListener):
                 elif m.group(4):
                     # Load folder
                     new_path = path.join(FuzzyFileNavCommand.cwd, m.group(4))
-                    if path.exists(new_path) and path.isdir(new_path):
+                    if FS.isdir(new_path):
                         FuzzyFileNavCommand.fuzzy_reload = True
                         win.run_command("hide_overlay")
                         win.run_command("fuzzy_file_nav", {"start": new_path})
@@ -343,9 +606,14 @@ class FuzzyOpenFolderCommand(sublime_plugin.WindowCommand):
         if data is None:
             data = {}
         new_folder = path.join(FuzzyFileNavCommand.cwd, file_name)
-        if not path.exists(new_folder):
+        try:
+            st = FS.stat(new_folder)
+        except Unreachable:
+            notify("{} is not reachable!".format(new_folder))
             return
-        if not path.isdir(new_folder):
+        except (OSError, ValueError):
+            return
+        if not stat.S_ISDIR(st.st_mode):
             new_folder = path.dirname(new_folder)
         if "folders" not in data:
             data["folders"] = []
@@ -354,12 +622,10 @@ class FuzzyOpenFolderCommand(sublime_plugin.WindowCommand):
         if not already_exists:
             true_path = get_path_true_case(new_folder)
             if true_path is not None:
-                if (
-                    sublime.load_settings(FUZZY_SETTINGS).get("add_folder_to_project_relative", False) and
-                    proj_file is not None
-                ):
+                settings = SETTINGS.get()
+                if settings.add_folder_to_project_relative and proj_file is not None:
                     new_folder = path.relpath(new_folder, path.dirname(proj_file))
-                follow_sym = sublime.load_settings(FUZZY_SETTINGS).get("add_folder_to_project_follow_symlink", True)
+                follow_sym = settings.add_folder_to_project_follow_symlink
                 data["folders"].append({'follow_symlinks': follow_sym, 'path': new_folder})
                 window.set_project_data(data)
             else:
@@ -440,7 +706,7 @@ class FuzzyRevealCommand(sublime_plugin.WindowCommand):
 
         file_name = FuzzyPanelText.get_content()
         FuzzyPanelText.clear_content()
-        if path.exists(path.join(FuzzyFileNavCommand.cwd, file_name)):
+        if FS.exists(path.join(FuzzyFileNavCommand.cwd, file_name)):
             self.window.run_command("open_dir", {"dir": FuzzyFileNavCommand.cwd, "file": file_name})
         else:
             self.window.run_command("open_dir", {"dir": FuzzyFileNavCommand.cwd, "file": ""})
@@ -455,17 +721,31 @@ class FuzzySearchFolderCommand(sublime_plugin.WindowCommand):
         file_name = FuzzyPanelText.get_content()
         FuzzyPanelText.clear_content()
         folder = path.join(FuzzyFileNavCommand.cwd, file_name)
-        if path.exists(folder) and path.isdir(folder):
+        if FS.isdir(folder):
             self.window.run_command("show_panel", {"panel": "find_in_files", "where": folder})
         else:
             self.window.run_command("show_panel", {"panel": "find_in_files", "where": FuzzyFileNavCommand.cwd})
 
 
+class FuzzyFlattenCommand(sublime_plugin.WindowCommand):
+    """List every file under the current folder in the panel."""
+
+    def run(self):
+        """Run command."""
+
+        if FuzzyFileNavCommand.active and FuzzyFileNavCommand.instance is not None:
+            FuzzyFileNavCommand.fuzzy_reload = True
+            self.window.run_command("hide_overlay")
+            FuzzyFileNavCommand.instance.flatten_files(FuzzyFileNavCommand.cwd)
+
+
 class FuzzyClipboardCommand(sublime_plugin.WindowCommand):
     """Command to handle fuzzy cut/copy/paste actions."""
 
     clips = []
     action = None
+    job = None
+    status_view = None
 
     def run(self, action):
         """Run command."""
@@ -488,15 +768,15 @@ class FuzzyClipboardCommand(sublime_plugin.WindowCommand):
         """Paste files."""
 
         errors = False
+        if self.cls.job is not None:
+            notify("Wait for the current paste to finish, or cancel it!")
+            return
         self.to_path = path.join(FuzzyFileNavCommand.cwd, FuzzyPanelText.get_content())
         FuzzyPanelText.clear_content()
         move = (self.cls.action == "cut")
         self.from_path = self.cls.clips[0]
         self.cls.clear_entries()
-        multi_file = (
-            bool(sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_after_action", False)) and
-            "paste" not in sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_exceptions", [])
-        )
+        multi_file = SETTINGS.get().keep_panel_open("paste")
 
         if not multi_file:
             self.window.run_command("hide_overlay")
@@ -504,54 +784,39 @@ class FuzzyClipboardCommand(sublime_plugin.WindowCommand):
         else:
             FuzzyFileNavCommand.fuzzy_reload = True
 
-        if path.exists(self.from_path):
-            if path.isdir(self.from_path):
-                self.action = shutil.copytree if not bool(move) else shutil.move
+        if FS.exists(self.from_path):
+            # The copy or move itself runs in the background; see `start_paste`.
+            self.action = lambda source, dest, merge=False: self.start_paste(source, dest, move, merge)
+            if FS.isdir(self.from_path):
                 errors = self.dir_copy()
             else:
-                self.action = shutil.copyfile if not bool(move) else shutil.move
                 errors = self.file_copy()
         if multi_file:
             if errors:
                 FuzzyFileNavCommand.reset()
+            elif self.cls.job is not None:
+                # The panel is patched once the paste is done; until then only the typed name is cleared.
+                FuzzyFileNavCommand.fuzzy_reload = False
+                FuzzyFileNavCommand.clear_text()
             else:
-                self.window.run_command("hide_overlay")
-                self.window.run_command("fuzzy_file_nav", {"start": FuzzyFileNavCommand.cwd})
+                # Nothing was pasted (the overwrite was declined); show the panel again.
+                targets = [self.to_path, path.join(self.to_path, path.basename(self.from_path))]
+                FuzzyFileNavCommand.patch_panel(self.window, targets)
 
     def dir_copy(self):
         """Handle directory copy."""
 
         errors = False
         try:
-            if path.exists(self.to_path):
-                if path.isdir(self.to_path):
+            if FS.exists(self.to_path):
+                if FS.isdir(self.to_path):
                     dest = path.join(self.to_path, path.basename(self.from_path))
-                    same = self.samefile(self.from_path, dest)
-                    if path.exists(dest) and not same:
-                        if sublime.ok_cancel_dialog('{} exists!\n\nOverwrite?'.format(dest)):
-                            if path.isdir(dest):
-                                shutil.rmtree(dest)
-                            else:
-                                os.remove(dest)
-                        else:
-                            return errors
-                    if not same:
-                        self.action(self.from_path, dest)
+                    self.dir_paste(dest)
                 else:
                     errors = True
                     error("{} already exists!".format(self.to_path))
-            elif path.exists(path.dirname(self.to_path)):
-                same = self.samefile(self.from_path, self.to_path)
-                if path.exists(self.to_path) and not same:
-                    if sublime.ok_cancel_dialog('{} exists!\n\nOverwrite?'.format(self.to_path)):
-                        if path.isdir(self.to_path):
-                            shutil.rmtree(self.to_path)
-                        else:
-                            os.remove(self.to_path)
-                    else:
-                        return errors
-                if not same:
-                    self.action(self.from_path, self.to_path)
+            elif FS.exists(path.dirname(self.to_path)):
+                self.dir_paste(self.to_path)
             else:
                 errors = True
                 error("Cannot copy {}".format(self.from_path))
@@ -560,11 +825,32 @@ class FuzzyClipboardCommand(sublime_plugin.WindowCommand):
             error("Cannot copy {}".format(self.from_path))
         return errors
 
+    def dir_paste(self, dest):
+        """Paste a folder, asking whether to merge into or replace a folder that is already there."""
+
+        if self.samefile(self.from_path, dest):
+            return
+        merge = False
+        # What is overwritten is only removed once the paste is complete.
+        if FS.isdir(dest):
+            answer = sublime.yes_no_cancel_dialog(
+                '{} exists!\n\nMerge copies only new and changed files into it; '
+                'Replace overwrites it.'.format(dest),
+                "Merge", "Replace"
+            )
+            if answer == sublime.DIALOG_CANCEL:
+                return
+            merge = answer == sublime.DIALOG_YES
+        elif FS.exists(dest):
+            if not sublime.ok_cancel_dialog('{} exists!\n\nOverwrite?'.format(dest)):
+                return
+        self.action(self.from_path, dest, merge)
+
     def samefile(self, a, b):
         """Check if files are the same."""
 
-        if path.exists(a) and path.exists(b):
-            return path.samefile(a, b)
+        if FS.exists(a) and FS.exists(b):
+            return FS.call(b, path.samefile, a, b)
 
         # One or both don't exist, so they can't be the same.
         return False
@@ -574,11 +860,11 @@ class FuzzyClipboardCommand(sublime_plugin.WindowCommand):
 
         errors = False
         try:
-            if path.exists(self.to_path):
-                if path.isdir(self.to_path):
+            if FS.exists(self.to_path):
+                if FS.isdir(self.to_path):
                     file_name = path.join(self.to_path, path.basename(self.from_path))
                     same = self.samefile(self.from_path, file_name)
-                    if path.exists(file_name) and not same:
+                    if FS.exists(file_name) and not same:
                         if not sublime.ok_cancel_dialog("{} exists!\n\nOverwrite file?".format(file_name)):
                             return errors
                     if not same:
@@ -587,18 +873,103 @@ class FuzzyClipboardCommand(sublime_plugin.WindowCommand):
                     same = self.samefile(self.from_path, self.to_path)
                     if not same and sublime.ok_cancel_dialog("{} exists!\n\nOverwrite file?".format(self.to_path)):
                         self.action(self.from_path, self.to_path)
-            elif path.exists(path.dirname(self.to_path)):
+            elif FS.exists(path.dirname(self.to_path)):
                 same = self.samefile(self.from_path, self.to_path)
                 if not same:
                     self.action(self.from_path, self.to_path)
             else:
                 errors = True
-                error("Cannot copy {}".fromat(self.from_path))
+                error("Cannot copy {}".format(self.from_path))
         except Exception:
             errors = True
-            error("Cannot copy {}".fromat(self.from_path))
+            error("Cannot copy {}".format(self.from_path))
         return errors
 
+    def start_paste(self, source, dest, move, merge=False):
+        """Copy or move the source to the destination in the background."""
+
+        debug_log("paste - {} -> {} (move: {}, merge: {})".format(source, dest, move, merge))
+        settings = SETTINGS.get()
+        self.cls.job = PasteJob(
+            source, dest, move,
+            lambda job: sublime.set_timeout(lambda: self.on_paste_progress(job), 0),
+            lambda job: sublime.set_timeout(lambda: self.on_paste_done(job), 0),
+            lambda job, e: sublime.set_timeout(lambda: self.on_paste_error(job, e), 0),
+            workers=settings.paste_workers, merge=merge, compare_hash=settings.paste_merge_hash
+        ).start()
+        self.on_paste_progress(self.cls.job)
+
+    def on_paste_progress(self, job):
+        """Show the paste's progress in the status bar."""
+
+        if job is not self.cls.job:
+            return
+        view = self.window.active_view()
+        if view is None:
+            return
+        if view != self.cls.status_view:
+            self.cls.clear_status()
+            self.cls.status_view = view
+        verb = "Merging" if job.merge else ("Moving" if job.move else "Pasting")
+        view.set_status(PASTE_STATUS_KEY, "{} {}: {}".format(verb, path.basename(job.source), job.status()))
+
+    def on_paste_done(self, job):
+        """Report the completed paste and show it in the panel."""
+
+        if job is not self.cls.job:
+            return
+        self.cls.job = None
+        self.cls.clear_status()
+        if job.merge:
+            debug_log("merge - {} files copied, {} unchanged skipped ({})".format(
+                job.files_done - job.files_skipped, job.files_skipped, format_size(job.bytes_skipped)
+            ))
+            sublime.status_message(
+                "Merged {} ({} files, {} in {:.1f} s; {} unchanged files skipped)".format(
+                    path.basename(job.dest), job.files_done - job.files_skipped, format_size(job.bytes_done),
+                    job.elapsed, job.files_skipped
+                )
+            )
+        else:
+            sublime.status_message(
+                "Pasted {} ({} in {:.1f} s)".format(path.basename(job.dest), format_size(job.bytes_done), job.elapsed)
+            )
+        targets = [job.dest]
+        if job.move:
+            targets.insert(0, job.source)
+        if FuzzyFileNavCommand.active and FuzzyFileNavCommand.instance is not None:
+            FuzzyFileNavCommand.patch_panel(FuzzyFileNavCommand.instance.window, targets, keep_text=True)
+
+    def on_paste_error(self, job, e):
+        """Report a paste that failed."""
+
+        if job is not self.cls.job:
+            return
+        self.cls.job = None
+        self.cls.clear_status()
+        error("Cannot copy {}!\n\n{}".format(job.source, e))
+
+    @classmethod
+    def cancel_paste(cls):
+        """Cancel the running paste, which removes what it has copied so far."""
+
+        job = cls.job
+        if job is None:
+            return False
+        debug_log("cancel paste - {}".format(job.source))
+        job.cancel()
+        cls.job = None
+        cls.clear_status()
+        return True
+
+    @classmethod
+    def clear_status(cls):
+        """Remove the paste's status bar entry."""
+
+        if cls.status_view is not None:
+            cls.status_view.erase_status(PASTE_STATUS_KEY)
+            cls.status_view = None
+
     @classmethod
     def add_entry(cls, entry):
         """Add entry to clip board."""
@@ -620,6 +991,21 @@ class FuzzyClipboardCommand(sublime_plugin.WindowCommand):
         cls.action = None
 
 
+class FuzzyCancelPasteCommand(sublime_plugin.ApplicationCommand):
+    """Cancel the paste that is running in the background."""
+
+    def run(self):
+        """Run command."""
+
+        if FuzzyClipboardCommand.cancel_paste():
+            sublime.status_message("Paste cancelled")
+
+    def is_enabled(self):
+        """Only enable while a paste is running."""
+
+        return FuzzyClipboardCommand.job is not None
+
+
 class FuzzyDeleteCommand(sublime_plugin.WindowCommand):
     """Delete file/folder."""
 
@@ -629,10 +1015,7 @@ class FuzzyDeleteCommand(sublime_plugin.WindowCommand):
         errors = False
         full_name = path.join(FuzzyFileNavCommand.cwd, FuzzyPanelText.get_content())
         FuzzyPanelText.clear_content()
-        multi_file = (
-            bool(sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_after_action", False)) and
-            "delete" not in sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_exceptions", [])
-        )
+        multi_file = SETTINGS.get().keep_panel_open("delete")
 
         if not multi_file:
             self.window.run_command("hide_overlay")
@@ -642,10 +1025,13 @@ class FuzzyDeleteCommand(sublime_plugin.WindowCommand):
 
         if sublime.ok_cancel_dialog("Delete {}?\n\nWarning: this is permanent!".format(full_name)):
             try:
-                if path.isdir(full_name):
+                if stat.S_ISDIR(FS.stat(full_name).st_mode):
                     shutil.rmtree(full_name)
                 else:
-                    os.remove(full_name)
+                    FS.remove(full_name)
+            except Unreachable:
+                errors = True
+                error("{} is not reachable!".format(full_name))
             except Exception:
                 errors = True
                 error("Error deleting {}!".format(full_name))
@@ -654,8 +1040,7 @@ class FuzzyDeleteCommand(sublime_plugin.WindowCommand):
             if errors:
                 FuzzyFileNavCommand.reset()
             else:
-                self.window.run_command("hide_overlay")
-                self.window.run_command("fuzzy_file_nav", {"start": FuzzyFileNavCommand.cwd})
+                FuzzyFileNavCommand.patch_panel(self.window, [full_name])
 
 
 class FuzzySaveFileCommand(sublime_plugin.WindowCommand):
@@ -685,16 +1070,20 @@ class FuzzySaveFileCommand(sublime_plugin.WindowCommand):
         """Run command."""
 
         full_name = path.join(FuzzyFileNavCommand.cwd, FuzzyPanelText.get_content())
-        file_exists = path.exists(full_name)
+        try:
+            FS.stat(full_name)
+            file_exists = True
+        except Unreachable:
+            error("{} is not reachable!".format(full_name))
+            return
+        except (OSError, ValueError):
+            file_exists = False
         if file_exists:
             if not sublime.ok_cancel_dialog("{} exists!\n\nOverwrite file?".format(full_name)):
                 return
 
         FuzzyPanelText.clear_content()
-        self.multi_file = (
-            bool(sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_after_action", False)) and
-            "saveas" not in sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_exceptions", [])
-        )
+        self.multi_file = SETTINGS.get().keep_panel_open("saveas")
         active_view = self.window.active_view()
         if active_view is None:
             return
@@ -709,8 +1098,7 @@ class FuzzySaveFileCommand(sublime_plugin.WindowCommand):
 
         try:
             if not file_exists:
-                with open(full_name, "a"):
-                    pass
+                FS.touch(full_name)
             active_view.set_scratch(True)
             self.window.run_command("close")
             self.view = self.window.open_file(full_name)
@@ -730,10 +1118,7 @@ class FuzzyMakeFileCommand(sublime_plugin.WindowCommand):
         errors = False
         full_name = path.join(FuzzyFileNavCommand.cwd, FuzzyPanelText.get_content())
         FuzzyPanelText.clear_content()
-        multi_file = (
-            bool(sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_after_action", False)) and
-            "mkfile" not in sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_exceptions", [])
-        )
+        multi_file = SETTINGS.get().keep_panel_open("mkfile")
         if not multi_file:
             self.window.run_command("hide_overlay")
             FuzzyFileNavCommand.reset()
@@ -741,9 +1126,11 @@ class FuzzyMakeFileCommand(sublime_plugin.WindowCommand):
             FuzzyFileNavCommand.fuzzy_reload = True
 
         try:
-            with open(full_name, "a"):
-                pass
+            FS.touch(full_name)
             self.window.open_file(full_name)
+        except Unreachable:
+            errors = True
+            error("{} is not reachable!".format(full_name))
         except Exception:
             errors = True
             error("Could not create {}!".format(full_name))
@@ -752,8 +1139,7 @@ class FuzzyMakeFileCommand(sublime_plugin.WindowCommand):
             if errors:
                 FuzzyFileNavCommand.reset()
             else:
-                self.window.run_command("hide_overlay")
-                self.window.run_command("fuzzy_file_nav", {"start": FuzzyFileNavCommand.cwd})
+                FuzzyFileNavCommand.patch_panel(self.window, [full_name])
 
 
 class FuzzyMakeFolderCommand(sublime_plugin.WindowCommand):
@@ -765,10 +1151,7 @@ class FuzzyMakeFolderCommand(sublime_plugin.WindowCommand):
         errors = False
         full_name = path.join(FuzzyFileNavCommand.cwd, FuzzyPanelText.get_content())
         FuzzyPanelText.clear_content()
-        multi_file = (
-            bool(sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_after_action", False)) and
-            "mkdir" not in sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_exceptions", [])
-        )
+        multi_file = SETTINGS.get().keep_panel_open("mkdir")
         if not multi_file:
             self.window.run_command("hide_overlay")
             FuzzyFileNavCommand.reset()
@@ -776,7 +1159,10 @@ class FuzzyMakeFolderCommand(sublime_plugin.WindowCommand):
             FuzzyFileNavCommand.fuzzy_reload = True
 
         try:
-            os.makedirs(full_name)
+            FS.makedirs(full_name)
+        except Unreachable:
+            errors = True
+            error("{} is not reachable!".format(full_name))
         except Exception:
             errors = True
             error("Could not create {}!".format(full_name))
@@ -785,42 +1171,164 @@ class FuzzyMakeFolderCommand(sublime_plugin.WindowCommand):
             if errors:
                 FuzzyFileNavCommand.reset()
             else:
-                self.window.run_command("hide_overlay")
-                self.window.run_command("fuzzy_file_nav", {"start": FuzzyFileNavCommand.cwd})
+                FuzzyFileNavCommand.patch_panel(self.window, [full_name])
 
 
 class FuzzyBookmarksLoadCommand(sublime_plugin.WindowCommand):
     """Load bookmarks in panel."""
 
+    token = 0
+    redrawing = False
+    index = 0
+    states = {}
+
     def run(self):
         """Run command."""
 
         if FuzzyFileNavCommand.active:
             self.window.run_command("hide_overlay")
+        # Only bookmarks that are for this host and/or platform are in the settings snapshot.
+        self.bookmarks = [[bm.name, bm.path] for bm in SETTINGS.get().bookmarks]
+        if not self.bookmarks:
+            return
+        self.window.run_command("hide_overlay")
+        FuzzyFileNavCommand.reset()
+        # Bookmarks are shown right away and checked in the background, so a dead mount can't hold up the panel.
+        self.token += 1
+        self.index = 0
+        self.states = {}
+        token = self.token
+        REACHABILITY.check(
+            [target for _, target in self.bookmarks if target],
+            lambda states: sublime.set_timeout(lambda: self.on_checked(token, states), 0)
+        )
+        self.show()
+
+    def get_state(self, target):
+        """Get the reachability of a bookmark, or `None` if it is being checked."""
+
+        # "My Computer" on Windows lists the drives, so it is always there.
+        if PLATFORM == "windows" and target == "":
+            return REACHABLE
+        # The panel's own check is used, as results aren't cached when `bookmark_reachability_ttl` is 0.
+        state = self.states.get(target)
+        return state if state is not None else REACHABILITY.get(target)
+
+    def show(self):
+        """Show the bookmarks, marking those that can't be reached or are still being checked."""
+
         self.display = []
-        # Search through bookmarks
-        bookmarks = sublime.load_settings(FUZZY_SETTINGS).get("bookmarks", [])
-        for bm in bookmarks:
-            # Only show bookmarks that are for this host and/or platform
-            target = qualify_settings(bm, "path", None, expanduser)
-            # Make sure bookmarks point to valid locations
-            if (
-                target is not None and
-                ((path.exists(target) and path.isdir(target)) or (PLATFORM == "windows" and target == ""))
-            ):
-                self.display.append([bm.get("name", target), target])
-        if len(self.display) > 0:
-            # Display bookmarks if valid ones were found
-            self.window.run_command("hide_overlay")
-            FuzzyFileNavCommand.reset()
-            self.window.show_quick_panel(self.display, self.check_selection)
+        for name, target in self.bookmarks:
+            state = self.get_state(target)
+            if state is None:
+                target = "{} (checking...)".format(target)
+            elif state != REACHABLE:
+                target = "{} ({})".format(target, state)
+            self.display.append([name, target])
+        self.window.show_quick_panel(self.display, self.check_selection, 0, self.index, self.on_highlight)
+
+    def on_highlight(self, value):
+        """Track the highlighted bookmark."""
+
+        self.index = value
+
+    def on_checked(self, token, states):
+        """Redraw the open panel with the results of the checks."""
+
+        if token != self.token:
+            return
+        self.states = states
+        self.redrawing = True
+        self.window.run_command("hide_overlay")
+        self.redrawing = False
+        self.show()
 
     def check_selection(self, value):
         """Check the user's selection and navigate the folder."""
 
+        if self.redrawing:
+            return
+        # The panel is closed, so its checks no longer need to be shown.
+        self.token += 1
         if value > -1:
+            name, target = self.bookmarks[value]
+            state = self.get_state(target)
+            if state is not None and state != REACHABLE:
+                notify("{} is not reachable ({})!".format(target, state))
+                return
             # Load fuzzy navigation with bookmarked shortcut
-            self.window.run_command("fuzzy_file_nav", {"start": self.display[value][1]})
+            self.window.run_command("fuzzy_file_nav", {"start": target})
+
+
+class FuzzyIndexSearchCommand(sublime_plugin.WindowCommand):
+    """Search the recursive index of a bookmark or project folder and open the result."""
+
+    def run(self, root=None):
+        """Run command."""
+
+        if FuzzyFileNavCommand.active:
+            self.window.run_command("hide_overlay")
+        if root is not None:
+            self.search_root(path.normpath(root))
+            return
+        self.roots = get_indexed_roots(self.window)
+        if not self.roots:
+            notify("No indexed folders! Add \"index\": true to a bookmark or enable index_project_folders.")
+        elif len(self.roots) == 1:
+            self.search_root(self.roots[0][1])
+        else:
+            self.window.show_quick_panel(self.roots, self.check_root)
+
+    def check_root(self, value):
+        """Search the selected folder."""
+
+        if value > -1:
+            self.search_root(self.roots[value][1])
+
+    def search_root(self, root):
+        """Update the folder's index in the background and ask what to find."""
+
+        self.root = root
+        if root not in INDEXES:
+            sublime.status_message("Indexing {}...".format(root))
+        INDEX_QUEUE.submit(self.update, root)
+        self.window.show_input_panel("Find in {}:".format(root), "", self.find, None, None)
+
+    def update(self, root):
+        """Update the index (runs on the index worker)."""
+
+        idx = update_index(root)
+        sublime.set_timeout(lambda: sublime.status_message("Indexed {}: {} files".format(root, len(idx))), 0)
+
+    def find(self, query):
+        """Search the index once it is up to date."""
+
+        INDEX_QUEUE.submit(self.search, self.root, query)
+
+    def search(self, root, query):
+        """Search the index (runs on the index worker)."""
+
+        idx = INDEXES.get(root)
+        if idx is None:
+            idx = update_index(root)
+        results = idx.search(query, INDEX_RESULT_LIMIT)
+        sublime.set_timeout(lambda: self.show_results(root, results), 0)
+
+    def show_results(self, root, results):
+        """Show the best matches."""
+
+        if not results:
+            notify("No files found!")
+            return
+        self.root = root
+        self.results = results
+        self.window.show_quick_panel(results, self.check_selection)
+
+    def check_selection(self, value):
+        """Open the selected file."""
+
+        if value > -1:
+            self.window.open_file(path.join(self.root, *self.results[value].split("/")))
 
 
 class FuzzyGetCwdCommand(sublime_plugin.ApplicationCommand):
@@ -833,6 +1341,23 @@ class FuzzyGetCwdCommand(sublime_plugin.ApplicationCommand):
             sublime.status_message("CWD: " + FuzzyFileNavCommand.cwd)
 
 
+class FuzzyPurgeListingStoreCommand(sublime_plugin.ApplicationCommand):
+    """Delete every persisted folder listing."""
+
+    def run(self):
+        """Run command."""
+
+        # Listings still waiting to be written would only be stored again.
+        STORE_QUEUE.clear()
+        STORE_QUEUE.submit(self.purge)
+
+    def purge(self):
+        """Delete the stored listings (runs on the store worker)."""
+
+        count = LISTING_STORE.purge()
+        sublime.set_timeout(lambda: sublime.status_message("Purged {} stored folder listings".format(count)), 0)
+
+
 class FuzzyToggleHiddenCommand(sublime_plugin.WindowCommand):
     """Toggle whether hidden files are shown or hidden."""
 
@@ -847,8 +1372,17 @@ class FuzzyToggleHiddenCommand(sublime_plugin.WindowCommand):
                 FuzzyFileNavCommand.hide_hidden = True
             else:
                 FuzzyFileNavCommand.hide_hidden = False
-            self.window.run_command("hide_overlay")
-            self.window.run_command("fuzzy_file_nav", {"start": FuzzyFileNavCommand.cwd})
+            instance = FuzzyFileNavCommand.instance
+            if FuzzyFileNavCommand.folder is not None and instance is not None and instance.window == self.window:
+                # Both views come from the same records, so just show the other one.
+                instance.refresh_panel(FuzzyFileNavCommand.folder.view(FuzzyFileNavCommand.hide_hidden))
+                FuzzyFileNavCommand.update_status()
+            elif FuzzyFileNavCommand.flatten and instance is not None:
+                self.window.run_command("hide_overlay")
+                instance.flatten_files(FuzzyFileNavCommand.cwd)
+            else:
+                self.window.run_command("hide_overlay")
+                self.window.run_command("fuzzy_file_nav", {"start": FuzzyFileNavCommand.cwd})
 
 
 class FuzzyStartFromFileCommand(sublime_plugin.WindowCommand):
@@ -870,11 +1404,11 @@ class FuzzyStartFromFileCommand(sublime_plugin.WindowCommand):
             self.window.run_command(
                 "fuzzy_file_nav",
                 {
-                    "start": path.dirname(name) if not path.isdir(name) else name
+                    "start": path.dirname(name) if not FS.isdir(name) else name
                 }
             )
         else:
-            action = sublime.load_settings(FUZZY_SETTINGS).get("start_from_here_default_action", "bookmarks")
+            action = SETTINGS.get().start_from_here_default_action
             if action in actions:
                 # Load special action
                 debug_log("Load default action: {}".format(action))
@@ -888,7 +1422,7 @@ class FuzzyStartFromFileCommand(sublime_plugin.WindowCommand):
         """Get the target to navigate from."""
 
         target = None
-        if len(paths) and path.exists(paths[0]):
+        if len(paths) and FS.exists(paths[0]):
             target = paths[0]
         return target
 
@@ -909,8 +1443,8 @@ class FuzzyStartFromFileCommand(sublime_plugin.WindowCommand):
     def home(self):
         """Navigate from home."""
 
-        home = qualify_settings(sublime.load_settings(FUZZY_SETTINGS), "home", "", expanduser)
-        home = get_root_path() if not path.exists(home) or not path.isdir(home) else home
+        home = SETTINGS.get().home
+        home = get_root_path() if not FS.isdir(home) else home
         self.window.run_command("fuzzy_file_nav", {"start": home})
 
     def root(self):
@@ -921,7 +1455,7 @@ class FuzzyStartFromFileCommand(sublime_plugin.WindowCommand):
     def bookmarks(self):
         """Load bookmarks."""
 
-        if len(sublime.load_settings(FUZZY_SETTINGS).get("bookmarks", [])):
+        if len(SETTINGS.get().bookmarks):
             self.window.run_command("fuzzy_bookmarks_load")
         else:
             self.home()
@@ -935,9 +1469,8 @@ class FuzzyQuickOpenCommand(sublime_plugin.WindowCommand):
 
         hl_index = FuzzyPathCompleteCommand.hl_index
         if hl_index != -1 or hl_index < len(FuzzyFileNavCommand.files):
-            file_path = path.join(FuzzyFileNavCommand.cwd, FuzzyFileNavCommand.files[hl_index])
-            if not path.isdir(file_path):
-                self.window.open_file(file_path)
+            if not FuzzyFileNavCommand.panel_is_dir(hl_index):
+                self.window.open_file(path.join(FuzzyFileNavCommand.cwd, FuzzyFileNavCommand.files[hl_index]))
 
 
 class FuzzyPathCompleteCommand(sublime_plugin.WindowCommand):
@@ -947,13 +1480,13 @@ class FuzzyPathCompleteCommand(sublime_plugin.WindowCommand):
     in_progress = False
     text = None
     hl_index = -1
+    index = None
 
     def run(self, back=False):
         """Run command."""
         cls = FuzzyPathCompleteCommand
         view = FuzzyFileNavCommand.view
-        settings = sublime.load_settings(FUZZY_SETTINGS)
-        completion_style = settings.get("completion_style", "fuzzy")
+        completion_style = SETTINGS.get().completion_style
         if view is not None:
             if completion_style == "fuzzy":
                 self.sublime_completion(cls, view)
@@ -966,7 +1499,7 @@ class FuzzyPathCompleteCommand(sublime_plugin.WindowCommand):
 
         if cls.hl_index > 0 and cls.hl_index < len(FuzzyFileNavCommand.files):
             FuzzyEditGlobal.bfr = FuzzyFileNavCommand.files[cls.hl_index]
-            if path.isdir(path.join(FuzzyFileNavCommand.cwd, FuzzyEditGlobal.bfr)):
+            if FuzzyFileNavCommand.panel_is_dir(cls.hl_index):
                 FuzzyEditGlobal.bfr = FuzzyEditGlobal.bfr[0:len(FuzzyEditGlobal.bfr) - 1]
             FuzzyEditGlobal.region = sublime.Region(0, view.size())
             view.run_command("fuzzy_apply_edits")
@@ -978,31 +1511,22 @@ class FuzzyPathCompleteCommand(sublime_plugin.WindowCommand):
     def terminal_completion(self, cls, view, back, nix_path_complete):
         """Terminal style completion."""
 
-        complete = []
         case_insensitive = PLATFORM == "windows" or not nix_path_complete
         sel = view.sel()[0]
 
         if cls.text is None:
             cls.text = view.substr(view.line(sel))
         debug_log("completion text - " + cls.text)
-        current = cls.text.lower() if case_insensitive else cls.text
-        for item in FuzzyFileNavCommand.files:
-            # Windows is case insensitive
-            if item == '..':
-                continue
-            i = item.lower() if case_insensitive else item
-            # See if current input matches the beginning of some of the entries
-            if i.startswith(current):
-                if path.isdir(path.join(FuzzyFileNavCommand.cwd, item)):
-                    item = item[0:len(item) - 1]
-                complete.append(item)
 
+        # See if current input matches the beginning of some of the entries
+        index = self.get_index(case_insensitive)
+        start, end = index.find(cls.text)
+        if nix_path_complete and start != end:
+            complete = [index.common_prefix(start, end)]
+        else:
+            complete = index.completions(start, end)
         complete_len = len(complete)
 
-        if nix_path_complete and complete_len:
-            self.nix_common_chars(current, complete, case_insensitive)
-            complete_len = len(complete)
-
         # If only one entry matches, auto-complete it
         if (nix_path_complete and complete_len == 1) or (not nix_path_complete and complete_len):
             if nix_path_complete:
@@ -1025,30 +1549,17 @@ class FuzzyPathCompleteCommand(sublime_plugin.WindowCommand):
             cls.last = None
             cls.text = None
 
-    def nix_common_chars(self, current_complete, clist, case_insensitive):
-        """Resolve entries using their common start."""
+    def get_index(self, case_insensitive):
+        """Get the completion index for the current listing, building it if needed."""
 
-        common = current_complete
-        while True:
-            match = True
-            cmn_len = len(current_complete)
-            if len(clist[0]) > cmn_len:
-                common += clist[0][cmn_len].lower() if case_insensitive else clist[0][cmn_len]
-                cmn_len += 1
-            else:
-                break
-            for item in clist:
-                value = item.lower() if case_insensitive else item
-                if not value.startswith(common):
-                    match = False
-                    break
-            if not match:
-                break
-            else:
-                current_complete = common
-        selection = clist[0][0:len(current_complete)]
-        del clist[:]
-        clist.append(selection)
+        cls = FuzzyPathCompleteCommand
+        index = cls.index
+        if (
+            index is None or index.listing is not FuzzyFileNavCommand.listing or
+            index.version != FuzzyFileNavCommand.listing.version or index.case_insensitive != case_insensitive
+        ):
+            index = cls.index = CompletionIndex(FuzzyFileNavCommand.listing, case_insensitive)
+        return index
 
     @classmethod
     def update_autocomplete(cls, text):
@@ -1080,19 +1591,279 @@ class FuzzyFileNavCommand(sublime_plugin.WindowCommand):
     fuzzy_reload = False
     hide_hidden = False
     cwd = ""
-    status = False
+    files = []
+    listing = None
+    folder = None
+    job = None
+    panel_shown = False
+    refreshed = 0.0
+    restore_text = None
+    prefetch_token = 0
+    prefetch_count = 0
+    prefetched = 0
+    instance = None
+    watched = []
+    changes = []
+    changes_pending = False
+    listed_in = None
+    stale = False
+    status_view = None
+    flatten = False
+    shown = None
+    narrow_text = ""
+    narrow_token = 0
 
     @classmethod
     def reset(cls):
         """Reset variables."""
 
+        cls.cancel_job()
+        cls.unwatch_all()
+        IDLE_QUEUE.clear()
+        STAT_CACHE.clear()
+        cls.prefetch_token += 1
+        cls.prefetch_count = 0
         cls.active = False
         cls.win_id = None
         cls.view = None
-        cls.status = False
-        cls.hide_hidden = not bool(sublime.load_settings(FUZZY_SETTINGS).get("show_system_hidden_files", False))
+        cls.flatten = False
+        cls.stale = False
+        cls.folder = None
+        cls.shown = None
+        cls.narrow_text = ""
+        cls.narrow_token += 1
+        NARROW_QUEUE.clear()
+        NARROW_QUEUE.submit(release_matcher)
+        cls.clear_status()
+        cls.panel_shown = False
+        cls.restore_text = None
+        cls.hide_hidden = not SETTINGS.get().show_system_hidden_files
         # `FuzzyClipboardCommand.clear_entries()`
 
+    @classmethod
+    def cancel_job(cls):
+        """Cancel the background listing job."""
+
+        if cls.job is not None:
+            debug_log("cancel listing - {}".format(cls.job.cwd))
+            cls.job.cancel()
+            cls.job = None
+
+    @classmethod
+    def watch(cls, folder):
+        """Watch a folder for changes while the panel is open."""
+
+        watcher = get_watcher()
+        if watcher is None:
+            return
+        if folder in cls.watched:
+            cls.watched.remove(folder)
+        else:
+            try:
+                # Polling stats the folder and `inotify` looks it up, either of which can block on a stale mount.
+                watched = FS.call(folder, watcher.watch, folder)
+            except OSError:
+                watched = False
+            if not watched:
+                return
+            debug_log("watch - {}".format(folder))
+        cls.watched.append(folder)
+        # Keep watching the recently visited (and cached) folders, up to a limit.
+        while len(cls.watched) > WATCH_LIMIT:
+            watcher.unwatch(cls.watched.pop(0))
+
+    @classmethod
+    def unwatch_all(cls):
+        """Release all watches."""
+
+        if WATCHER is not None:
+            WATCHER.clear()
+        cls.watched = []
+        cls.changes = []
+
+    @classmethod
+    def queue_changes(cls, changes):
+        """Queue folder changes reported by the watcher, applying them in batches."""
+
+        if not cls.active:
+            return
+        cls.changes.extend(changes)
+        if not cls.changes_pending:
+            cls.changes_pending = True
+            sublime.set_timeout(cls.apply_changes, 100)
+
+    @classmethod
+    def apply_changes(cls):
+        """Apply queued folder changes to the cached listings and the open panel."""
+
+        cls.changes_pending = False
+        if not cls.active or cls.instance is None or not cls.changes:
+            cls.changes = []
+            return
+        if cls.job is not None:
+            # Wait for the current folder to finish listing.
+            cls.changes_pending = True
+            sublime.set_timeout(cls.apply_changes, 100)
+            return
+
+        changes = cls.changes
+        cls.changes = []
+        cwd = cls.cwd
+        folder = cls.folder
+        relist = False
+        patched = False
+        for change in changes:
+            if change.name is not None and is_temporary(change.name):
+                # A paste's copy in progress; the paste patches the panel once it is in place.
+                continue
+            if change.folder != cwd or cls.flatten:
+                LISTING_CACHE.invalidate(change.folder)
+                PREFETCH_CACHE.invalidate(change.folder)
+            elif change.name is None:
+                relist = True
+            elif change.added:
+                try:
+                    entry = FS.call(cwd, listing.stat_entry, cwd, change.name)
+                except OSError:
+                    # Already gone again.
+                    continue
+                index = folder.all.find(entry.name)
+                if index != -1 and folder.all.entries[index] == entry:
+                    # Already patched in by the action that made the change.
+                    continue
+                folder.insert(entry)
+                patched = True
+            elif folder.remove(change.name) != -1:
+                patched = True
+
+        debug_log("folder changes - {} (relist: {})".format(len(changes), relist))
+        if cls.flatten or folder is None:
+            return
+        if relist:
+            LISTING_CACHE.invalidate(cwd)
+            cls.instance.reload_panel()
+        elif patched:
+            cls.store_listing()
+            cls.instance.refresh_panel(folder.view(cls.hide_hidden))
+            cls.update_status()
+
+    @classmethod
+    def clear_text(cls):
+        """Clear the text typed in the open panel without showing the panel again."""
+
+        view = cls.view
+        if view is None:
+            return
+        FuzzyEditGlobal.bfr = ""
+        FuzzyEditGlobal.region = sublime.Region(0, view.size())
+        view.run_command("fuzzy_apply_edits")
+        FuzzyEditGlobal.clear()
+
+    @classmethod
+    def store_listing(cls):
+        """Cache the patched records of the current folder."""
+
+        try:
+            sig = FS.call(cls.cwd, signature, cls.cwd)
+        except OSError:
+            LISTING_CACHE.invalidate(cls.cwd)
+            return
+        LISTING_CACHE.put(cls.cwd, sig, cls.folder)
+        store_listing(cls.cwd, sig, cls.folder)
+
+    @classmethod
+    def patch_panel(cls, window, targets, keep_text=False):
+        """
+        Show the panel again after an action created or removed the target paths.
+
+        Entries of the current folder are re-read individually and patched
+        into the listing in memory, highlighting the last one that exists,
+        or, with `keep_text`, keeping the typed text and the highlighted
+        entry.  If there is no listing to patch, the folder is read again.
+        """
+
+        folder = cls.folder
+        cwd = cls.cwd
+        if cls.instance is None or folder is None or cls.job is not None or cls.flatten or not cwd:
+            window.run_command("hide_overlay")
+            window.run_command("fuzzy_file_nav", {"start": cwd})
+            return
+
+        highlight = None
+        for target in targets:
+            rel = path.relpath(path.normpath(target), cwd)
+            if rel == os.curdir or rel == os.pardir or rel.startswith(os.pardir + os.sep):
+                continue
+            # Nested targets (`mkdir a/b`) change the top level entry.
+            name = rel.split(os.sep)[0]
+            try:
+                entry = FS.call(cwd, listing.stat_entry, cwd, name)
+            except OSError:
+                folder.remove(name)
+                continue
+            folder.insert(entry)
+            result = folder.view(cls.hide_hidden)
+            index = result.find(name)
+            if index != -1:
+                highlight = result.names[index]
+
+        debug_log("patched listing - {}".format(", ".join(targets)))
+        cls.store_listing()
+        if keep_text:
+            highlight = None
+        else:
+            cls.restore_text = None
+            cls.narrow_text = ""
+        cls.instance.refresh_panel(folder.view(cls.hide_hidden), highlight, keep_text=keep_text)
+        cls.update_status()
+
+    @classmethod
+    def panel_is_dir(cls, index):
+        """Check if the panel row at the index is a folder."""
+
+        return cls.listing.is_dir(cls.shown[index] if cls.shown is not None else index)
+
+    @classmethod
+    def queue_narrow(cls, text):
+        """Narrow a large listing to what is typed once typing pauses."""
+
+        if cls.shown is None or text == cls.narrow_text or cls.instance is None:
+            return
+        cls.narrow_text = text
+        cls.narrow_token += 1
+        token = cls.narrow_token
+        sublime.set_timeout(lambda: cls.instance.narrow(token), NARROW_DELAY)
+
+    @classmethod
+    def update_status(cls):
+        """Show the current folder, its entry count, and how long it took to list in the status bar."""
+
+        window = cls.instance.window if cls.instance is not None else None
+        view = window.active_view() if window is not None else None
+        if view is None or not cls.active:
+            return
+        if view != cls.status_view:
+            cls.clear_status()
+            cls.status_view = view
+        count = len(cls.listing) - 1 if cls.listing is not None else 0
+        if cls.job is not None and cls.stale:
+            details = "{} entries, stored, revalidating... {:.0f} ms".format(count, cls.job.elapsed * 1000)
+        elif cls.job is not None:
+            details = "listing... {} entries, {:.0f} ms".format(count, cls.job.elapsed * 1000)
+        elif cls.listed_in is None:
+            details = "{} entries, cached".format(count)
+        else:
+            details = "{} entries, listed in {:.0f} ms".format(count, cls.listed_in * 1000)
+        view.set_status(STATUS_KEY, "CWD: {} ({})".format(cls.cwd, details))
+
+    @classmethod
+    def clear_status(cls):
+        """Remove the status bar entry."""
+
+        if cls.status_view is not None:
+            cls.status_view.erase_status(STATUS_KEY)
+            cls.status_view = None
+
     @classmethod
     def set_hidden(cls, value):
         """Set hiding hidden file option."""
@@ -1108,22 +1879,25 @@ class FuzzyFileNavCommand(sublime_plugin.WindowCommand):
         previous = self.cls.cwd
         self.cls.active = True
         self.cls.win_id = self.window.id()
-        self.regex_exclude = sublime.load_settings(FUZZY_SETTINGS).get("regex_exclude", [])
         FuzzyPathCompleteCommand.reset_autocomplete()
 
         debug_log("start - {}".format(start if start is not None else "None"))
 
         # Check if a start destination has been given
-        # and ensure it is valid.
-        directory = get_root_path() if start is None or not path.exists(start) or not path.isdir(start) else start
+        # and ensure it is valid.  A folder that doesn't respond isn't swapped for the root.
+        valid = start is not None and FS.isdir(start)
+        unreachable = start is not None and not valid and FS.unreachable(start)
+        directory = start if valid or unreachable else get_root_path()
         self.cls.cwd = directory if PLATFORM == "windows" and directory == "" else path.normpath(directory)
 
         debug_log("cwd - {}".format(self.cls.cwd))
 
         # Get and display options.
         try:
+            if unreachable:
+                raise Unreachable(directory)
             self.display_files(self.cls.cwd)
-        except Exception:
+        except Exception as e:
             if self.cls.fuzzy_reload:
                 # Reloading, so fuzzy panel must be up, so preserve previous state
                 self.cls.fuzzy_reload = False
@@ -1131,85 +1905,389 @@ class FuzzyFileNavCommand(sublime_plugin.WindowCommand):
             else:
                 # Not reloading, so go ahead and reset the state
                 self.cls.reset()
-            notify("{} is not accessible!".format(self.cls.cwd))
+            if isinstance(e, Unreachable):
+                notify("{} is not reachable!".format(directory))
+            else:
+                notify("{} is not accessible!".format(self.cls.cwd))
 
     def get_files(self, cwd):
         """Get files, folders, or window's drives."""
 
         # Get files/drives (windows).
-        files = get_drives() if PLATFORM == "windows" and cwd == "" else os.listdir(cwd)
-        folders = []
-        documents = []
-        for f in files:
-            valid = True
-            full_path = path.join(cwd, f)
-
-            # Check exclusion to omit files.
-            if self.hide_hidden:
-                if valid:
-                    if not PLATFORM == "windows":
-                        if f.startswith('.') and f != "..":
-                            valid = False
-                    else:
-                        attrs = ctypes.windll.kernel32.GetFileAttributesW(full_path)
-                        if attrs != -1 and bool(attrs & 2):
-                            valid = False
-
-                if valid:
-                    for regex in self.regex_exclude:
-                        if re.match(regex, f):
-                            valid = False
-
-            # Store file/folder info.
-            if valid:
-                if not path.isdir(full_path):
-                    documents.append(f)
-                else:
-                    folders.append(f + ("\\" if PLATFORM == "windows" else "/"))
-        return [".."] + sorted(folders) + sorted(documents)
+        if PLATFORM == "windows" and cwd == "":
+            return self.process_entries(listing.drive_entries(get_drives()))
+        return self.process_entries(listing.scan(cwd))
+
+    def process_entries(self, entries):
+        """Sort entry records into a folder that can show or hide the hidden entries."""
+
+        return listing.Folder(entries, EXCLUDES, "\\" if PLATFORM == "windows" else "/")
+
+    def build_folder(self, entries):
+        """Sort entry records into a folder and filter the listing to show (runs on the scan worker)."""
+
+        folder = self.process_entries(entries)
+        folder.view(self.hide_hidden)
+        return folder
 
     def on_highlight(self, value):
         """Get index of highlighted file."""
 
         FuzzyPathCompleteCommand.hl_index = value
 
+        # Schedule a prefetch of the highlighted folder once the highlight settles.
+        self.cls.prefetch_token += 1
+        if value > 0 and value < len(self.cls.files) and self.cls.panel_is_dir(value):
+            token = self.cls.prefetch_token
+            target = path.join(self.cls.cwd, self.cls.files[value])
+            delay = SETTINGS.get().prefetch_delay
+            sublime.set_timeout(lambda: self.schedule_prefetch(token, target), delay)
+
+    def schedule_prefetch(self, token, target):
+        """Queue a low priority prefetch of the given folder if it is still highlighted."""
+
+        budget = SETTINGS.get().prefetch_budget
+        if (
+            not self.cls.active or token != self.cls.prefetch_token or
+            self.cls.prefetch_count >= budget or self.cls.job is not None
+        ):
+            return
+        self.cls.prefetch_count += 1
+        IDLE_QUEUE.clear()
+        IDLE_QUEUE.submit(self.prefetch, path.normpath(target))
+
+    def prefetch(self, target):
+        """Read a folder into the prefetch cache (runs on the idle worker)."""
+
+        try:
+            sig = FS.call(target, signature, target)
+            if LISTING_CACHE.peek(target, sig) or PREFETCH_CACHE.peek(target, sig):
+                return
+            PREFETCH_CACHE.put(target, sig, self.get_files(target))
+            FuzzyFileNavCommand.prefetched += 1
+            debug_log("prefetched - {}".format(target))
+        except Exception:
+            pass
+
     def display_files(self, cwd, index=-1):
         """Display files in folder."""
 
         # Get the folders children
-        self.cls.status = True
-        status_cwd()
-        self.cls.files = self.get_files(cwd)
+        self.cls.instance = self
+        self.cls.cancel_job()
+        self.cls.flatten = False
+        self.cls.stale = False
+        self.cls.listed_in = None
+
+        if PLATFORM == "windows" and cwd == "":
+            start = time.perf_counter()
+            result = self.process_entries(listing.drive_entries(get_drives()))
+            self.cls.listed_in = time.perf_counter() - start
+        else:
+            # Unchanged folders are shown right away, everything else is read in the background
+            # and the panel is filled in as entries arrive.
+            sig = FS.call(cwd, signature, cwd)
+            result = PREFETCH_CACHE.take(cwd, sig)
+            if result is not None:
+                LISTING_CACHE.put(cwd, sig, result)
+                stats = PREFETCH_CACHE.stats()
+                debug_log(
+                    "prefetch hit - {} (hits: {}, misses: {}, prefetched: {}, hit rate: {:.0%})".format(
+                        cwd, stats["hits"], stats["misses"], self.cls.prefetched,
+                        stats["hits"] / self.cls.prefetched if self.cls.prefetched else 0.0
+                    )
+                )
+            else:
+                result = LISTING_CACHE.get(cwd, sig)
+            if result is None:
+                result = self.load_stored(cwd, sig)
+            if result is None or self.cls.stale:
+                debug_log("listing cache miss - {} {}".format(cwd, LISTING_CACHE.stats()))
+                self.cls.job = ScanJob(
+                    cwd,
+                    lambda job, chunk: sublime.set_timeout(lambda: self.on_listing_chunk(job), 0),
+                    lambda job: sublime.set_timeout(lambda: self.on_listing_done(job, sig), 0),
+                    lambda job, e: sublime.set_timeout(lambda: self.on_listing_error(job, e), 0),
+                    build=self.build_folder,
+                    interval=PANEL_REFRESH_INTERVAL
+                ).start()
+                if result is None:
+                    result = self.process_entries([])
+            else:
+                debug_log("listing cache hit - {} {}".format(cwd, LISTING_CACHE.stats()))
+            self.cls.watch(cwd)
+        self.cls.folder = result
+        self.cls.narrow_text = ""
+        self.set_listing(result.view(self.hide_hidden))
+        self.cls.update_status()
 
         # Make sure panel is down before loading a new one.
-        self.cls.view = None
-        sublime.set_timeout(
-            lambda: self.window.show_quick_panel(
+        self.show_panel(index)
+
+    def load_stored(self, cwd, sig):
+        """
+        Get the persisted listing of a folder, or `None`.
+
+        A listing stored with a different signature is still returned, but
+        marked stale so that it is shown while the folder is read again.
+        """
+
+        stored = LISTING_STORE.load(cwd)
+        if stored is None:
+            return None
+        stored_sig, result = stored
+        result = listing.Folder.from_listing(result, EXCLUDES)
+        if stored_sig == sig:
+            debug_log("listing store hit - {}".format(cwd))
+            LISTING_CACHE.put(cwd, sig, result)
+        else:
+            debug_log("listing store stale - {}".format(cwd))
+            self.cls.stale = True
+        return result
+
+    def flatten_files(self, cwd, index=-1):
+        """List every file under the folder, filling in the panel as the tree is read."""
+
+        self.cls.instance = self
+        self.cls.cancel_job()
+        self.cls.flatten = True
+        self.cls.stale = False
+        self.cls.folder = None
+        self.cls.listed_in = None
+        settings = SETTINGS.get()
+        self.cls.job = WalkJob(
+            cwd,
+            lambda job, chunk: sublime.set_timeout(lambda: self.on_flatten_chunk(job), 0),
+            lambda job: sublime.set_timeout(lambda: self.on_flatten_done(job), 0),
+            lambda job, e: sublime.set_timeout(lambda: self.on_flatten_error(job), 0),
+            get_entry_filter(self.hide_hidden),
+            settings.flatten_depth,
+            settings.flatten_max_entries,
+            settings.flatten_workers,
+            "\\" if PLATFORM == "windows" else "/"
+        ).start()
+        self.cls.narrow_text = ""
+        self.set_listing(self.flat_listing([]))
+        self.cls.update_status()
+        self.show_panel(index)
+
+    def flat_listing(self, files):
+        """Create a listing of relative file paths."""
+
+        return listing.Listing(
+            [listing.Entry(f, False, False, False) for f in files], "\\" if PLATFORM == "windows" else "/"
+        )
+
+    def on_flatten_chunk(self, job):
+        """Show the files found so far."""
+
+        if job is self.cls.job and time.time() - self.cls.refreshed >= PANEL_REFRESH_INTERVAL:
+            self.refresh_panel(self.flat_listing(job.files))
+            self.cls.update_status()
+
+    def on_flatten_done(self, job):
+        """Show all of the files found."""
+
+        if job is not self.cls.job:
+            return
+        self.cls.job = None
+        self.cls.listed_in = job.elapsed
+        self.refresh_panel(self.flat_listing(job.files))
+        self.cls.update_status()
+        if job.truncated:
+            notify("Only the first {} files are shown!".format(len(job.files)))
+
+    def on_flatten_error(self, job):
+        """Close the panel if the folder couldn't be read."""
+
+        if job is not self.cls.job:
+            return
+        self.cls.job = None
+        notify("{} is not accessible!".format(job.root))
+        self.window.run_command("hide_overlay")
+        self.cls.reset()
+
+    def show_panel(self, index=-1):
+        """Show the quick panel with the current listing."""
+
+        def show():
+            """Show the panel."""
+
+            self.cls.panel_shown = True
+            self.cls.refreshed = time.time()
+            self.window.show_quick_panel(
                 self.cls.files, self.check_selection, 0, index, on_highlight=self.on_highlight
-            ),
-            0
+            )
+
+        self.cls.view = None
+        self.cls.panel_shown = False
+        sublime.set_timeout(show, 0)
+
+    def refresh_panel(self, result, name=None, keep_text=True):
+        """Show a new listing in the open panel, highlighting the named (or the highlighted) entry."""
+
+        if name is None:
+            hl_index = FuzzyPathCompleteCommand.hl_index
+            name = self.cls.files[hl_index] if 0 <= hl_index < len(self.cls.files) else None
+        self.set_listing(result)
+        self.redraw_panel(name, keep_text)
+
+    def redraw_panel(self, name=None, keep_text=True):
+        """Show the panel's rows again, highlighting the named entry and optionally keeping the typed text."""
+
+        if not self.cls.panel_shown:
+            # The panel is about to be shown and will pick up the new rows.
+            return
+
+        view = self.cls.view
+        if keep_text and view is not None and len(view.sel()):
+            self.cls.restore_text = view.substr(view.line(view.sel()[0]))
+        try:
+            index = self.cls.files.index(name) if name is not None else -1
+        except ValueError:
+            index = -1
+        self.cls.fuzzy_reload = True
+        self.window.run_command("hide_overlay")
+        self.show_panel(index)
+
+    def set_listing(self, result):
+        """
+        Set the listing and the rows the panel shows.
+
+        Listings larger than `large_listing_threshold` only show the parent
+        folder and the first `large_listing_results` entries.  Typing
+        re-queries the whole listing for the best matches.
+        """
+
+        settings = SETTINGS.get()
+        self.cls.listing = result
+        threshold = settings.large_listing_threshold
+        if threshold <= 0 or len(result) <= threshold:
+            self.cls.shown = None
+            # The panel needs real strings; names are only created here, when shown.
+            self.cls.files = list(result.names)
+            return
+        self.cls.shown = list(range(min(len(result), settings.large_listing_results + 1)))
+        self.cls.files = result.names[:len(self.cls.shown)]
+        if self.cls.narrow_text:
+            self.cls.narrow_token += 1
+            token = self.cls.narrow_token
+            sublime.set_timeout(lambda: self.narrow(token), NARROW_DELAY)
+
+    def narrow(self, token):
+        """Search the whole listing for the typed text in the background."""
+
+        if token != self.cls.narrow_token or self.cls.shown is None:
+            return
+        result = self.cls.listing
+        NARROW_QUEUE.clear()
+        NARROW_QUEUE.submit(
+            self.search_listing, token, result, result.version, self.cls.narrow_text,
+            SETTINGS.get().large_listing_results
         )
 
+    def search_listing(self, token, result, version, text, limit):
+        """Find the best matches in the listing (runs on the narrowing worker)."""
+
+        # The matcher is kept until the listing changes, so it is only built once per folder.
+        if NARROW_MATCHER[0] is not result or NARROW_MATCHER[1] != version:
+            NARROW_MATCHER[:] = [result, version, Matcher(result.names[1:])]
+        if token != self.cls.narrow_token:
+            return
+        rows = [0] + [i + 1 for _, i in NARROW_MATCHER[2].search(text, limit)]
+        sublime.set_timeout(lambda: self.show_narrowed(token, result, version, rows), 0)
+
+    def show_narrowed(self, token, result, version, rows):
+        """Show the matches found for the typed text."""
+
+        if token != self.cls.narrow_token or result is not self.cls.listing or version != result.version:
+            return
+        self.cls.shown = rows
+        self.cls.files = [result.names[i] for i in rows]
+        debug_log("narrowed - {!r} ({} of {})".format(self.cls.narrow_text, len(rows) - 1, len(result) - 1))
+        self.redraw_panel()
+
+    def reload_panel(self):
+        """Read the current folder again and show it in the open panel, keeping the typed text."""
+
+        view = self.cls.view
+        if view is not None and len(view.sel()):
+            self.cls.restore_text = view.substr(view.line(view.sel()[0]))
+        self.cls.fuzzy_reload = True
+        self.window.run_command("hide_overlay")
+        try:
+            self.display_files(self.cls.cwd)
+        except Exception:
+            self.cls.fuzzy_reload = False
+            notify("{} is not accessible!".format(self.cls.cwd))
+            self.cls.reset()
+
+    def on_listing_chunk(self, job):
+        """Show a partial listing while a large folder is being read."""
+
+        # A stored listing is shown until the whole folder is read.
+        if (
+            job is self.cls.job and not self.cls.stale and
+            time.time() - self.cls.refreshed >= PANEL_REFRESH_INTERVAL
+        ):
+            self.cls.folder = job.result
+            self.refresh_panel(self.cls.folder.view(self.hide_hidden))
+            self.cls.update_status()
+
+    def on_listing_done(self, job, sig):
+        """Cache and show the completed listing."""
+
+        if job is not self.cls.job:
+            return
+        self.cls.job = None
+        self.cls.stale = False
+        self.cls.listed_in = job.elapsed
+        self.cls.folder = job.result
+        LISTING_CACHE.put(job.cwd, sig, self.cls.folder)
+        store_listing(job.cwd, sig, self.cls.folder)
+        self.refresh_panel(self.cls.folder.view(self.hide_hidden))
+        self.cls.update_status()
+
+    def on_listing_error(self, job, e):
+        """Back out of a folder that couldn't be read."""
+
+        if job is not self.cls.job:
+            return
+        self.cls.job = None
+        self.cls.stale = False
+        notify("{} is not accessible!".format(job.cwd))
+        previous = back_dir(job.cwd)
+        if previous == job.cwd:
+            self.window.run_command("hide_overlay")
+            self.cls.reset()
+        else:
+            self.cls.fuzzy_reload = True
+            self.window.run_command("hide_overlay")
+            self.cls.cwd = previous if PLATFORM == "windows" and previous == "" else path.normpath(previous)
+            self.display_files(self.cls.cwd)
+
     def check_selection(self, selection):
         """Check the users selection and navigate to directory or open file."""
 
         debug_log("Process selection")
         if selection > -1:
             self.cls.fuzzy_reload = False
-            # The first selection is the "go up a directory" option.
-            directory = back_dir(self.cls.cwd) if selection == 0 else path.join(self.cls.cwd, self.cls.files[selection])
+            root = self.cls.cwd
+            if self.cls.flatten and selection == 0:
+                # Leave the flattened view.
+                directory = root
+            else:
+                # The first selection is the "go up a directory" option.
+                directory = back_dir(root) if selection == 0 else path.join(root, self.cls.files[selection])
             self.cls.cwd = directory if PLATFORM == "windows" and directory == "" else path.normpath(directory)
 
             # Check if the option is a folder or if we are at the root (needed for windows)
             try:
-                if (path.isdir(self.cls.cwd) or self.cls.cwd == get_root_path()):
+                if (FS.isdir(self.cls.cwd) or self.cls.cwd == get_root_path()):
                     # List directories content
                     self.display_files(self.cls.cwd)
                 else:
-                    multi = (
-                        bool(sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_after_action", False)) and
-                        "open" not in sublime.load_settings(FUZZY_SETTINGS).get("keep_panel_open_exceptions", [])
-                    )
+                    multi = SETTINGS.get().keep_panel_open("open")
 
                     # Open file
                     new_view = self.window.open_file(self.cls.cwd)
@@ -1227,7 +2305,11 @@ class FuzzyFileNavCommand(sublime_plugin.WindowCommand):
                         sublime.set_timeout(lambda: fun(new_view, multi), 500)
 
                     # If multi-file open is set, leave panel open after opening file
-                    if multi:
+                    if multi and self.cls.flatten:
+                        self.cls.cwd = root
+                        self.cls.fuzzy_reload = True
+                        self.show_panel(selection)
+                    elif multi:
                         self.cls.cwd = path.normpath(back_dir(self.cls.cwd))
                         self.display_files(self.cls.cwd, selection)
                     else:
@@ -1245,12 +2327,41 @@ class FuzzyFileNavCommand(sublime_plugin.WindowCommand):
             self.cls.fuzzy_reload = False
 
 
+def init_excludes(settings):
+    """Compile the `regex_exclude` patterns, reporting invalid patterns once."""
+
+    global EXCLUDES
+    if settings.regex_exclude == EXCLUDES.patterns:
+        return
+    EXCLUDES = listing.Excludes(settings.regex_exclude)
+    for pattern, err in EXCLUDES.errors:
+        print("FuzzyFileNav: Invalid regex_exclude pattern {!r}: {}".format(pattern, err))
+    if EXCLUDES.errors:
+        notify("Invalid regex_exclude patterns were ignored! See console for details.")
+
+
 def init_hidden():
     """Initialize the "show hidden file" setting."""
 
     setting = sublime.load_settings(FUZZY_SETTINGS)
-    show_hidden = not bool(setting.get("show_system_hidden_files", False))
-    FuzzyFileNavCommand.set_hidden(show_hidden)
+    settings = SETTINGS.refresh(setting)
+    init_excludes(settings)
+    set_sub_notify(settings.use_sub_notify)
+    FuzzyFileNavCommand.set_hidden(not settings.show_system_hidden_files)
+    # The watcher backend may have changed; it will be recreated when needed.
+    close_watcher()
+    FuzzyFileNavCommand.watched = []
+    # Exclusion patterns may have changed, so cached listings can't be trusted.
+    LISTING_CACHE.clear()
+    LISTING_CACHE.resize(settings.listing_cache_size)
+    PREFETCH_CACHE.clear()
+    FS.timeout = max(settings.fs_timeout, 0) / 1000
+    FS.ttl = max(settings.fs_unreachable_ttl, 0)
+    FS.forget()
+    REACHABILITY.invalidate()
+    REACHABILITY.ttl = max(settings.bookmark_reachability_ttl, 0)
+    REACHABILITY.timeout = max(settings.bookmark_timeout, 0) / 1000
+    STORE_QUEUE.submit(LISTING_STORE.configure, get_store_folder(), settings.listing_store_size * 1024 * 1024)
     setting.clear_on_change('reload')
     setting.add_on_change('reload', init_hidden)
 
@@ -1261,3 +2372,15 @@ def plugin_loaded():
     global PLATFORM
     PLATFORM = sublime.platform()
     init_hidden()
+    # Wait for startup to settle, so listing folders doesn't compete with loading Sublime.
+    sublime.set_timeout(warm_up, max(SETTINGS.get().warm_up_delay, 0))
+
+
+def plugin_unloaded():
+    """Tear down plugin."""
+
+    FuzzyFileNavCommand.cancel_job()
+    FuzzyFileNavCommand.clear_status()
+    FuzzyClipboardCommand.cancel_paste()
+    WARM_QUEUE.clear()
+    close_watcher()
@@ -0,0 +1 @@
+"""FuzzyFileNav support library."""
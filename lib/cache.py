@@ -0,0 +1,331 @@
+"""
+Directory listing cache.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from itertools import accumulate
+from .listing import Listing, PackedEntries
+
+MAGIC = b'FFNLST01'
+HEADER = struct.Struct('<I')
+
+
+def signature(cwd):
+    """
+    Get the signature of a directory.
+
+    A directory's modified time changes whenever an entry is added,
+    removed, or renamed, and the device/inode pair catches a folder that
+    was replaced by another one with the same name.
+    """
+
+    st = os.stat(cwd)
+    return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+
+class ListingCache(object):
+    """
+    Bounded LRU cache of processed directory listings.
+
+    Listings are keyed by path and validated against the directory's
+    signature on every lookup.  The cache is bounded by the total number
+    of entries held across all listings rather than the number of
+    listings, as a single large folder can outweigh hundreds of small ones.
+    """
+
+    def __init__(self, max_entries=100000):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.listings = OrderedDict()
+        self.max_entries = max_entries
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, sig):
+        """Get a cached listing."""
+
+        with self.lock:
+            item = self.listings.get(key)
+            if item is None or item[0] != sig:
+                self.misses += 1
+                if item is not None:
+                    self._remove(key)
+                return None
+            self.listings.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def peek(self, key, sig):
+        """Check for a valid listing without counting a hit or miss or refreshing its age."""
+
+        with self.lock:
+            item = self.listings.get(key)
+            return item is not None and item[0] == sig
+
+    def take(self, key, sig):
+        """Get a cached listing and remove it from the cache."""
+
+        value = self.get(key, sig)
+        if value is not None:
+            self.invalidate(key)
+        return value
+
+    def put(self, key, sig, value):
+        """Cache a listing, evicting the least recently used listings to make room."""
+
+        count = len(value)
+        with self.lock:
+            if key in self.listings:
+                self._remove(key)
+            if count > self.max_entries:
+                return
+            while self.listings and self.size + count > self.max_entries:
+                self._remove(next(iter(self.listings)))
+                self.evictions += 1
+            # The count is kept, as a cached listing can be patched in place before it is put again.
+            self.listings[key] = (sig, value, count)
+            self.size += count
+
+    def invalidate(self, key):
+        """Remove a listing from the cache."""
+
+        with self.lock:
+            if key in self.listings:
+                self._remove(key)
+
+    def clear(self):
+        """Remove all listings from the cache."""
+
+        with self.lock:
+            self.listings.clear()
+            self.size = 0
+
+    def resize(self, max_entries):
+        """Change the maximum number of entries, evicting listings if required."""
+
+        with self.lock:
+            self.max_entries = max_entries
+            while self.listings and self.size > self.max_entries:
+                self._remove(next(iter(self.listings)))
+                self.evictions += 1
+
+    def stats(self):
+        """Get cache statistics."""
+
+        with self.lock:
+            return {
+                "listings": len(self.listings),
+                "entries": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _remove(self, key):
+        """Remove a listing; the lock must be held."""
+
+        self.size -= self.listings.pop(key)[2]
+
+    def __contains__(self, key):
+        """Check if a listing is cached for the key (valid or not)."""
+
+        with self.lock:
+            return key in self.listings
+
+    def __len__(self):
+        """Get the number of cached listings."""
+
+        with self.lock:
+            return len(self.listings)
+
+
+class ListingStore(object):
+    """
+    Folder listings persisted across restarts.
+
+    Each listing is written to its own file in `folder`, named by a hash
+    of its path, as its signature, its entries' name lengths and flags,
+    and one buffer of their names, in listing order, so it loads without
+    sorting.  A listing's file is touched whenever it is loaded, and the
+    least recently used files are deleted once the files are over
+    `max_bytes`.  A `max_bytes` of 0 disables the store.
+    """
+
+    def __init__(self, folder=None, max_bytes=0):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+    def __bool__(self):
+        """Check if the store is enabled."""
+
+        return bool(self.folder) and self.max_bytes > 0
+
+    def configure(self, folder, max_bytes):
+        """Change where listings are stored and how much space they may use."""
+
+        with self.lock:
+            self.folder = folder
+            self.max_bytes = max_bytes
+        if self:
+            self.trim()
+
+    def filename(self, key):
+        """Get the file a listing is stored in."""
+
+        return os.path.join(self.folder, hashlib.sha1(key.encode('utf-8', 'surrogateescape')).hexdigest() + '.lst')
+
+    def load(self, key):
+        """
+        Get the `(signature, listing)` stored for a key, or `None`.
+
+        Unreadable or corrupt files are deleted.
+        """
+
+        if not self:
+            return None
+        filename = self.filename(key)
+        with self.lock:
+            try:
+                with open(filename, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+            try:
+                sig, result = self.decode(key, data)
+            except ValueError:
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+                return None
+            try:
+                os.utime(filename)
+            except OSError:
+                pass
+        return sig, result
+
+    def save(self, key, sig, result):
+        """Write a listing to its file, replacing it atomically, then trim the store."""
+
+        if not self:
+            return
+        data = self.encode(key, sig, result)
+        if len(data) > self.max_bytes:
+            return
+        filename = self.filename(key)
+        with self.lock:
+            os.makedirs(self.folder, exist_ok=True)
+            temp = filename + '.tmp'
+            with open(temp, 'wb') as f:
+                f.write(data)
+            os.replace(temp, filename)
+        self.trim()
+
+    def trim(self):
+        """Delete the least recently used files until the store fits in `max_bytes`."""
+
+        with self.lock:
+            files = []
+            try:
+                with os.scandir(self.folder) as it:
+                    for entry in it:
+                        if entry.name.endswith('.lst'):
+                            st = entry.stat()
+                            files.append((st.st_mtime_ns, st.st_size, entry.path))
+            except OSError:
+                return
+            total = sum(f[1] for f in files)
+            for _, size, filename in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(filename)
+                    total -= size
+                except OSError:
+                    pass
+
+    def purge(self):
+        """Delete every stored listing and return how many were deleted."""
+
+        count = 0
+        with self.lock:
+            if not self.folder:
+                return count
+            try:
+                with os.scandir(self.folder) as it:
+                    names = [entry.path for entry in it if entry.name.endswith(('.lst', '.tmp'))]
+            except OSError:
+                return count
+            for filename in names:
+                try:
+                    os.remove(filename)
+                    count += filename.endswith('.lst')
+                except OSError:
+                    pass
+        return count
+
+    @staticmethod
+    def encode(key, sig, result):
+        """Encode a listing."""
+
+        entries = result.entries
+        buffer = entries.buffer
+        names = b''.join([buffer[start:start + length] for start, length in zip(entries.starts, entries.lengths)])
+        lengths = entries.lengths[:]
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        header = json.dumps({
+            'key': key, 'sig': list(sig), 'sep': result.sep, 'count': len(entries),
+            'folders': result.folders, 'names': len(names)
+        }).encode('utf-8')
+        return b''.join([MAGIC, HEADER.pack(len(header)), header, lengths.tobytes(), entries.flags.tobytes(), names])
+
+    @staticmethod
+    def decode(key, data):
+        """Decode a listing, raising `ValueError` if the data isn't a listing of the key."""
+
+        if not data.startswith(MAGIC):
+            raise ValueError('Not a listing file')
+        try:
+            offset = len(MAGIC)
+            size = HEADER.unpack_from(data, offset)[0]
+            offset += HEADER.size
+            header = json.loads(data[offset:offset + size].decode('utf-8'))
+            offset += size
+            count = header['count']
+            if header['key'] != key or count < 1:
+                raise ValueError('Listing file is for another folder')
+            entries = PackedEntries()
+            entries.lengths.frombytes(data[offset:offset + count * entries.lengths.itemsize])
+            offset += count * entries.lengths.itemsize
+            if sys.byteorder == 'big':
+                entries.lengths.byteswap()
+            entries.flags.frombytes(data[offset:offset + count])
+            offset += count
+            entries.buffer = bytearray(data[offset:])
+            if (
+                len(entries.lengths) != count or len(entries.flags) != count or
+                len(entries.buffer) != header['names'] or sum(entries.lengths) != len(entries.buffer)
+            ):
+                raise ValueError('Corrupt listing file: truncated')
+            entries.starts.extend(accumulate(entries.lengths[:-1], initial=0))
+            result = Listing((), header['sep'])
+            result.entries = entries
+            result.folders = header['folders']
+            return tuple(header['sig']), result
+        except (struct.error, KeyError, TypeError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError('Corrupt listing file: {}'.format(e))
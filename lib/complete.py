@@ -0,0 +1,91 @@
+"""
+Terminal style path completion index.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+from array import array
+from bisect import bisect_left
+
+MAX_CHAR = 0x10FFFF
+
+
+class CompletionIndex(object):
+    """
+    Sorted prefix index of a listing.
+
+    Keys are the listing's display names (lower cased when matching is
+    case insensitive) sorted alongside their position in the listing, so
+    the entries that start with some text are one contiguous range found
+    with two binary searches.  Completions are returned in listing order
+    with the directory separator stripped, just as the panel shows them.
+    """
+
+    def __init__(self, listing, case_insensitive):
+        """Build the index."""
+
+        self.listing = listing
+        self.version = listing.version
+        self.case_insensitive = case_insensitive
+        sep = len(listing.sep)
+        keyed = sorted(
+            (name.lower() if case_insensitive else name, i)
+            for i, name in enumerate(listing.names) if i
+        )
+        self.keys = [k for k, _ in keyed]
+        self.order = array('l', [i for _, i in keyed])
+        self.values = [
+            name[:-sep] if listing.is_dir(i) else name
+            for i, name in enumerate(listing.names)
+        ]
+
+    def find(self, text):
+        """Get the `(start, end)` range of keys that start with the text."""
+
+        if self.case_insensitive:
+            text = text.lower()
+        start = bisect_left(self.keys, text)
+        if not text:
+            return start, len(self.keys)
+        last = ord(text[-1])
+        if last == MAX_CHAR:
+            end = start
+            while end < len(self.keys) and self.keys[end].startswith(text):
+                end += 1
+        else:
+            end = bisect_left(self.keys, text[:-1] + chr(last + 1), start)
+        return start, end
+
+    def completions(self, start, end):
+        """Get the completions in a range, in listing order."""
+
+        return [self.values[i] for i in sorted(self.order[start:end])]
+
+    def common_prefix(self, start, end):
+        """
+        Get the longest prefix shared by the completions in a range.
+
+        The prefix is taken from the first completion in listing order,
+        so it keeps that entry's case.
+        """
+
+        first = None
+        low = high = None
+        for i in self.order[start:end]:
+            value = self.values[i]
+            if self.case_insensitive:
+                value = value.lower()
+            if first is None or i < first:
+                first = i
+            if low is None or value < low:
+                low = value
+            if high is None or value > high:
+                high = value
+        if first is None:
+            return ''
+        size = 0
+        for a, b in zip(low, high):
+            if a != b:
+                break
+            size += 1
+        return self.values[first][:size]
@@ -0,0 +1,206 @@
+"""
+Fuzzy matcher for large candidate sets.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import heapq
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_SEPARATOR = 9
+BONUS_BOUNDARY = 8
+BONUS_CAMEL = 7
+BONUS_CONSECUTIVE = 4
+PATH_SEPARATORS = '/\\'
+WORD_SEPARATORS = ' _-.'
+PARALLEL_THRESHOLD = 1000000
+
+
+def char_mask(text):
+    """
+    Get a 64 bit mask of the characters in the (lower cased) text.
+
+    Characters share bits (`ord(c) & 63`), so a candidate whose mask
+    doesn't contain the query's mask can't match, but one that does still
+    has to be scored.
+    """
+
+    mask = 0
+    for c in set(text):
+        mask |= 1 << (ord(c) & 63)
+    return mask
+
+
+def score(query, text, lowered):
+    """
+    Score a candidate, returning `None` if the query isn't a subsequence of it.
+
+    `query` must be lower case and `lowered` is the lower cased `text`.
+    The first occurrence of the query is found scanning forward, then
+    the shortest window ending there is found scanning back, and the
+    window is scored: every match scores, gaps cost, and matches at the
+    start of a path component or word, at camel case humps, or right
+    after the previous match earn bonuses (the first character's bonus
+    counts double).  Lower casing can change a text's length (`'İ'`
+    becomes two characters); such texts are scored on `lowered` alone,
+    without camel case bonuses.
+    """
+
+    if len(text) != len(lowered):
+        text = lowered
+    pos = -1
+    for c in query:
+        pos = lowered.find(c, pos + 1)
+        if pos < 0:
+            return None
+    start = pos + 1
+    for c in reversed(query):
+        start = lowered.rfind(c, 0, start)
+    pos = start - 1
+
+    total = 0
+    prev = -1
+    find = lowered.find
+    for c in query:
+        pos = find(c, pos + 1)
+        # Inline `bonus`; this loop is where large searches spend their time.
+        if pos == 0:
+            b = BONUS_SEPARATOR
+        else:
+            before = text[pos - 1]
+            if before in PATH_SEPARATORS:
+                b = BONUS_SEPARATOR
+            elif before in WORD_SEPARATORS:
+                b = BONUS_BOUNDARY
+            elif before.islower() and text[pos].isupper():
+                b = BONUS_CAMEL
+            else:
+                b = 0
+        if prev < 0:
+            b *= 2
+        elif pos == prev + 1:
+            if b < BONUS_CONSECUTIVE:
+                b = BONUS_CONSECUTIVE
+        else:
+            total += SCORE_GAP_START + SCORE_GAP_EXTENSION * (pos - prev - 2)
+        total += SCORE_MATCH + b
+        prev = pos
+    return total
+
+
+class Matcher(object):
+    """
+    Fuzzy match a query against a fixed list of candidates.
+
+    Candidates are lower cased and reduced to character masks once.  A
+    search rejects candidates whose mask lacks a query character, scores
+    the rest, and keeps the best `limit` in a heap, so memory is bounded
+    by `limit` rather than the number of matches.  The indexes of every
+    match are remembered, so a query that extends the previous one (the
+    user typed another character) only looks at the previous matches.
+
+    With `processes`, lists of more than `PARALLEL_THRESHOLD` candidates
+    are split into shards, each loaded once into its own worker process,
+    and searched in parallel.  Processes can only be used where
+    `multiprocessing` can start a Python interpreter.
+    """
+
+    def __init__(self, candidates, processes=0):
+        """Prepare the candidates."""
+
+        self.candidates = candidates
+        self.lowered = [c.lower() for c in candidates]
+        self.masks = array('Q', [char_mask(c) for c in self.lowered])
+        self.processes = processes if len(candidates) > PARALLEL_THRESHOLD else 0
+        self.shards = None
+        self.last = None
+
+    def __len__(self):
+        """Get the number of candidates."""
+
+        return len(self.candidates)
+
+    def search(self, query, limit=100):
+        """Get the `(score, index)` of the best matches, best first."""
+
+        query = query.lower()
+        if not query:
+            return [(0, i) for i in range(min(limit, len(self.candidates)))]
+        if self.processes:
+            return self.search_parallel(query, limit)
+
+        qmask = char_mask(query)
+        if self.last is not None and query.startswith(self.last[0]):
+            indexes = self.last[1]
+        else:
+            masks = self.masks
+            indexes = [i for i, m in enumerate(masks) if m & qmask == qmask]
+
+        candidates = self.candidates
+        lowered = self.lowered
+        matched = array('l')
+        heap = []
+        for i in indexes:
+            s = score(query, candidates[i], lowered[i])
+            if s is None:
+                continue
+            matched.append(i)
+            item = (s, -len(lowered[i]), -i)
+            if len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        self.last = (query, matched)
+        return [(s, -i) for s, _, i in sorted(heap, reverse=True)]
+
+    def search_parallel(self, query, limit):
+        """Search the shards in worker processes and merge their results."""
+
+        if self.shards is None:
+            self.start_shards()
+        futures = [(offset, pool.submit(search_shard, query, limit)) for offset, pool in self.shards]
+        results = []
+        for offset, future in futures:
+            results.extend((s, -len(self.lowered[i + offset]), -(i + offset)) for s, i in future.result())
+        return [(s, -i) for s, _, i in heapq.nlargest(limit, results)]
+
+    def start_shards(self):
+        """Start one worker process per shard."""
+
+        context = multiprocessing.get_context('spawn')
+        size = -(-len(self.candidates) // self.processes)
+        self.shards = []
+        for offset in range(0, len(self.candidates), size):
+            pool = ProcessPoolExecutor(
+                1, mp_context=context, initializer=load_shard, initargs=(self.candidates[offset:offset + size],)
+            )
+            self.shards.append((offset, pool))
+
+    def close(self):
+        """Stop the worker processes."""
+
+        if self.shards is not None:
+            for _, pool in self.shards:
+                pool.shutdown(wait=False, cancel_futures=True)
+            self.shards = None
+
+
+SHARD = None
+
+
+def load_shard(candidates):
+    """Load a shard's candidates into a worker process."""
+
+    global SHARD
+    SHARD = Matcher(candidates)
+
+
+def search_shard(query, limit):
+    """Search the worker process's shard."""
+
+    return SHARD.search(query, limit)
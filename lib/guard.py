@@ -0,0 +1,151 @@
+"""
+Deadline guarded file system calls.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import os.path as path
+import queue
+import stat
+import threading
+import time
+
+
+class Unreachable(OSError):
+    """A path didn't respond in time, or recently didn't."""
+
+
+class Guard(object):
+    """
+    Run file system calls on worker threads with a deadline.
+
+    A call on a stale network mount can block for the full mount timeout,
+    so calls are handed to a worker and the caller waits at most `timeout`
+    seconds.  A call that runs out of time raises `Unreachable` and its
+    path is remembered for `ttl` seconds; calls on that path, or anything
+    under it, fail right away until then.  The stuck worker is left to
+    finish on its own and a new one is started for the next call.  A
+    `timeout` of 0 runs calls directly.
+    """
+
+    def __init__(self, timeout=2.0, ttl=30.0):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.timeout = timeout
+        self.ttl = ttl
+        self.tasks = queue.Queue()
+        self.idle = 0
+        self.timed_out = {}
+
+    def unreachable(self, target):
+        """Check if the path, or a folder above it, recently timed out."""
+
+        with self.lock:
+            if not self.timed_out:
+                return False
+            now = time.monotonic()
+            while True:
+                when = self.timed_out.get(target)
+                if when is not None:
+                    if now - when <= self.ttl:
+                        return True
+                    del self.timed_out[target]
+                parent = path.dirname(target)
+                if not parent or parent == target:
+                    return False
+                target = parent
+
+    def forget(self, target=None):
+        """Forget that a path, or every path, timed out."""
+
+        with self.lock:
+            if target is None:
+                self.timed_out.clear()
+            else:
+                self.timed_out.pop(target, None)
+
+    def call(self, target, fn, *args):
+        """Call `fn(*args)`, which touches `target`, raising `Unreachable` if it doesn't return in time."""
+
+        if self.timeout <= 0:
+            return fn(*args)
+        if self.unreachable(target):
+            raise Unreachable('{} recently timed out'.format(target))
+        task = [threading.Event(), None, None]
+        with self.lock:
+            if self.idle:
+                self.idle -= 1
+            else:
+                threading.Thread(target=self.work, daemon=True).start()
+        self.tasks.put((task, fn, args))
+        if not task[0].wait(self.timeout):
+            with self.lock:
+                self.timed_out[target] = time.monotonic()
+            raise Unreachable('{} did not respond within {:.1f} seconds'.format(target, self.timeout))
+        if task[2] is not None:
+            raise task[2]
+        return task[1]
+
+    def work(self):
+        """Run calls (runs on a worker thread)."""
+
+        while True:
+            task, fn, args = self.tasks.get()
+            try:
+                task[1] = fn(*args)
+            except Exception as e:
+                task[2] = e
+            task[0].set()
+            with self.lock:
+                self.idle += 1
+
+    def stat(self, target):
+        """Get the status of a path."""
+
+        return self.call(target, os.stat, target)
+
+    def exists(self, target):
+        """Check if a path exists; paths that don't respond don't exist."""
+
+        try:
+            self.stat(target)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def isdir(self, target):
+        """Check if a path is a folder; paths that don't respond aren't."""
+
+        try:
+            return stat.S_ISDIR(self.stat(target).st_mode)
+        except (OSError, ValueError):
+            return False
+
+    def create(self, target, fn, *args):
+        """Call `fn(*args)` to create `target`; the deadline counts against the folder it is created in."""
+
+        return self.call(path.dirname(target) or target, fn, *args)
+
+    def touch(self, target):
+        """Create a file if it doesn't exist."""
+
+        self.create(target, touch, target)
+
+    def makedirs(self, target):
+        """Create a folder and any missing parents."""
+
+        self.create(target, os.makedirs, target)
+
+    def remove(self, target):
+        """Remove a file."""
+
+        self.call(target, os.remove, target)
+
+
+def touch(target):
+    """Create a file if it doesn't exist."""
+
+    with open(target, 'a'):
+        pass
@@ -0,0 +1,263 @@
+"""
+Persistent recursive file index.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import heapq
+import json
+import os
+import os.path as path
+import re
+import struct
+from collections import namedtuple
+
+MAGIC = b'FFNIDX01'
+HEADER = struct.Struct('<I')
+RECORD = struct.Struct('<IqIII')
+
+
+def split(blob):
+    """Split a name blob into names."""
+
+    return blob.split(b'\n') if blob else []
+
+
+def consume(text, query):
+    """Get how many leading characters of the query are a subsequence of the text."""
+
+    i = 0
+    size = len(query)
+    for c in text:
+        if i == size:
+            break
+        if c == query[i]:
+            i += 1
+    return i
+
+
+class DirRecord(namedtuple('DirRecord', ['mtime', 'count', 'files', 'dirs'])):
+    """
+    One indexed directory.
+
+    File and sub-directory names are each stored as a single newline joined
+    blob of encoded names, so a directory costs a few objects no matter
+    how many files it holds.
+    """
+
+    __slots__ = ()
+
+
+class FileIndex(object):
+    """
+    Recursive index of the files under a root.
+
+    Directories are keyed by their path relative to the root (with `/`
+    separators).  `update` stats every indexed directory but only lists
+    the ones whose modification time changed, since adding, removing, or
+    renaming an entry is what changes a directory's time.  Symlinked
+    directories are not followed.  `key` identifies the filter the index
+    was built with; an index is rebuilt from scratch when it changes.
+    """
+
+    def __init__(self, root, key=''):
+        """Initialize."""
+
+        self.root = root
+        self.key = key
+        self.dirs = {}
+        self.count = 0
+
+    def __len__(self):
+        """Get the number of indexed files."""
+
+        return self.count
+
+    def read_dir(self, folder, mtime, accept):
+        """List a directory into a record."""
+
+        files = []
+        dirs = []
+        with os.scandir(folder) as it:
+            for entry in it:
+                if accept is not None and not accept(entry):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                (dirs if is_dir else files).append(os.fsencode(entry.name))
+        return DirRecord(mtime, len(files), b'\n'.join(files), b'\n'.join(dirs))
+
+    def update(self, accept=None, cancelled=None):
+        """
+        Bring the index up to date with the file system.
+
+        `accept(entry)` filters the `os.DirEntry` records that are indexed.
+        Returns the number of directories that had to be listed, or `None`
+        if `cancelled()` became true before the update finished.
+        """
+
+        old = self.dirs
+        dirs = {}
+        count = 0
+        listed = 0
+        stack = ['']
+        while stack:
+            if cancelled is not None and cancelled():
+                return None
+            rel = stack.pop()
+            folder = path.join(self.root, rel) if rel else self.root
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+            record = old.get(rel)
+            if record is None or record.mtime != mtime:
+                try:
+                    record = self.read_dir(folder, mtime, accept)
+                except OSError:
+                    continue
+                listed += 1
+            dirs[rel] = record
+            count += record.count
+            prefix = rel + '/' if rel else ''
+            for name in split(record.dirs):
+                stack.append(prefix + os.fsdecode(name))
+        self.dirs = dirs
+        self.count = count
+        return listed
+
+    def paths(self):
+        """Iterate the relative paths of all indexed files."""
+
+        for rel, record in self.dirs.items():
+            prefix = rel + '/' if rel else ''
+            for name in split(record.files):
+                yield prefix + os.fsdecode(name)
+
+    def search(self, query, limit=100):
+        """
+        Find the files whose relative path contains the query's characters in order.
+
+        Matching is case insensitive (ASCII only).  Names are matched in
+        their encoded blobs and only the matches become strings.  Files
+        whose name contains the query are ranked first, then those that
+        need the fewest query characters from their folder, then shorter
+        paths.  Folders that can't improve on the results found so far
+        are skipped.
+        """
+
+        query = os.fsencode(query.replace(os.sep, '/')).lower()
+        if not query or limit <= 0:
+            return []
+        contains = re.compile(b'^[^\n]*?' + re.escape(query) + b'[^\n]*$', re.I | re.M)
+        patterns = {}
+        heap = []
+        order = 0
+
+        for rel, record in self.dirs.items():
+            if not record.files:
+                continue
+            prefix = os.fsencode(rel + '/' if rel else '').lower()
+            used = consume(prefix, query)
+            base = (used << 20) + len(prefix)
+            full = len(heap) >= limit
+            if full and base + 1 >= -heap[0][0]:
+                continue
+
+            # Names that contain the whole query rank first.
+            for m in contains.finditer(record.files):
+                score = base + len(m.group(0))
+                if len(heap) < limit:
+                    heapq.heappush(heap, (-score, order, rel, m.group(0)))
+                elif score < -heap[0][0]:
+                    heapq.heapreplace(heap, (-score, order, rel, m.group(0)))
+                order += 1
+
+            # Then the rest of the query as a subsequence of the name.
+            base += 1 << 40
+            if len(heap) >= limit and base + 1 >= -heap[0][0]:
+                continue
+            rest = query[used:]
+            if rest:
+                pattern = patterns.get(rest)
+                if pattern is None:
+                    pattern = patterns[rest] = re.compile(
+                        b'^[^\n]*?' + b'[^\n]*?'.join(re.escape(rest[i:i + 1]) for i in range(len(rest))) +
+                        b'[^\n]*$',
+                        re.I | re.M
+                    )
+                names = (m.group(0) for m in pattern.finditer(record.files))
+            else:
+                names = split(record.files)
+            for name in names:
+                if query in name.lower():
+                    continue
+                score = base + len(name)
+                if len(heap) < limit:
+                    heapq.heappush(heap, (-score, order, rel, name))
+                elif score < -heap[0][0]:
+                    heapq.heapreplace(heap, (-score, order, rel, name))
+                order += 1
+
+        return [
+            (rel + '/' if rel else '') + os.fsdecode(name)
+            for _, _, rel, name in sorted(heap, key=lambda c: (-c[0], c[1]))
+        ]
+
+    def save(self, filename):
+        """Write the index to a file, replacing it atomically."""
+
+        header = json.dumps({'root': self.root, 'key': self.key, 'dirs': len(self.dirs)}).encode('utf-8')
+        temp = filename + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(MAGIC)
+            f.write(HEADER.pack(len(header)))
+            f.write(header)
+            for rel, record in self.dirs.items():
+                name = os.fsencode(rel)
+                f.write(RECORD.pack(len(name), record.mtime, record.count, len(record.files), len(record.dirs)))
+                f.write(name)
+                f.write(record.files)
+                f.write(record.dirs)
+        os.replace(temp, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read an index from a file.
+
+        Raises `ValueError` if the file isn't a valid index.
+        """
+
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError('Not an index file')
+        try:
+            offset = len(MAGIC)
+            size = HEADER.unpack_from(data, offset)[0]
+            offset += HEADER.size
+            header = json.loads(data[offset:offset + size].decode('utf-8'))
+            offset += size
+            index = cls(header['root'], header['key'])
+            count = 0
+            for _ in range(header['dirs']):
+                name_size, mtime, files, files_size, dirs_size = RECORD.unpack_from(data, offset)
+                offset += RECORD.size
+                rel = os.fsdecode(data[offset:offset + name_size])
+                offset += name_size
+                record = DirRecord(
+                    mtime, files, data[offset:offset + files_size],
+                    data[offset + files_size:offset + files_size + dirs_size]
+                )
+                offset += files_size + dirs_size
+                index.dirs[rel] = record
+                count += files
+        except (struct.error, KeyError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError('Corrupt index file: {}'.format(e))
+        if offset != len(data):
+            raise ValueError('Corrupt index file: trailing data')
+        index.count = count
+        return index
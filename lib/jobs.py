@@ -0,0 +1,202 @@
+"""
+Background jobs.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from . import listing
+
+
+class Job(object):
+    """
+    Cancellable background job.
+
+    Subclasses implement `work`; it should poll `cancelled` often and
+    return as soon as it is set.  Callbacks are called from the job's
+    thread, so the caller is responsible for handing results over to the
+    UI thread.  `elapsed` is the time the job has been running, or took
+    once `finished` is set.
+    """
+
+    def __init__(self):
+        """Initialize."""
+
+        self._cancel = threading.Event()
+        self.thread = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        """Get the time in seconds the job has been running."""
+
+        if self.started is None:
+            return 0.0
+        return (self.finished if self.finished is not None else time.perf_counter()) - self.started
+
+    @property
+    def cancelled(self):
+        """Check if the job was cancelled."""
+
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Cancel the job."""
+
+        self._cancel.set()
+
+    def start(self):
+        """Start the job on a daemon thread."""
+
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+        return self
+
+    def is_alive(self):
+        """Check if the job is still running."""
+
+        return self.thread is not None and self.thread.is_alive()
+
+    def work(self):
+        """Do the work."""
+
+        raise NotImplementedError
+
+
+class ScanJob(Job):
+    """
+    List a directory in the background.
+
+    Entry records are collected in `entries` and streamed to `on_chunk`
+    in chunks of `chunk_size`.  `on_done` is called once the directory is
+    read, and `on_error` receives the exception if it can't be read.
+    Callbacks receive the job as their first argument.  Nothing is
+    reported once the job is cancelled.
+
+    With `build`, the entries are also turned into `result` with
+    `build(entries)` on the job's thread, so sorting a large folder
+    doesn't hold up the UI.  `on_chunk` is then only called when a partial
+    `result` was built, at most every `interval` seconds, and the final
+    `result` is built before `on_done`.
+    """
+
+    def __init__(self, cwd, on_chunk, on_done, on_error, chunk_size=2000, build=None, interval=0.5):
+        """Initialize."""
+
+        super().__init__()
+        self.cwd = cwd
+        self.entries = []
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.on_error = on_error
+        self.chunk_size = chunk_size
+        self.build = build
+        self.interval = interval
+        self.result = None
+        self.built = None
+
+    def work(self):
+        """List the directory."""
+
+        chunk = []
+        scan = listing.iter_scan(self.cwd)
+        try:
+            for entry in scan:
+                if self.cancelled:
+                    return
+                chunk.append(entry)
+                if len(chunk) >= self.chunk_size:
+                    self.add(chunk)
+                    chunk = []
+        except Exception as e:
+            self.finished = time.perf_counter()
+            if not self.cancelled:
+                self.on_error(self, e)
+            return
+        finally:
+            scan.close()
+        if self.cancelled:
+            return
+        if self.build is not None:
+            self.entries.extend(chunk)
+            self.result = self.build(self.entries)
+            if self.cancelled:
+                return
+        elif chunk:
+            self.add(chunk)
+        self.finished = time.perf_counter()
+        self.on_done(self)
+
+    def add(self, chunk):
+        """Collect a chunk of entries and report it, building a partial result first if one is due."""
+
+        self.entries.extend(chunk)
+        if self.build is not None:
+            now = time.perf_counter()
+            if self.built is not None and now - self.built < self.interval:
+                return
+            self.result = self.build(list(self.entries))
+            self.built = time.perf_counter()
+            if self.cancelled:
+                return
+        self.on_chunk(self, chunk)
+
+
+class WorkQueue(object):
+    """
+    Run tasks one at a time on a single worker thread.
+
+    The worker is started on first use.  With `low_priority`, the worker
+    lowers its own scheduling priority where the platform allows it
+    (Linux schedules threads individually), so background work yields
+    to the UI.  `clear` drops every task that has not started yet.
+    """
+
+    def __init__(self, low_priority=False):
+        """Initialize."""
+
+        self.low_priority = low_priority
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.generation = 0
+
+    def submit(self, fn, *args):
+        """Queue a task."""
+
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.work, daemon=True)
+                self.thread.start()
+            self.queue.put((self.generation, fn, args))
+
+    def clear(self):
+        """Drop pending tasks."""
+
+        with self.lock:
+            self.generation += 1
+
+    def work(self):
+        """Process tasks."""
+
+        if self.low_priority and sys.platform.startswith('linux'):
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+            except (AttributeError, OSError):
+                pass
+
+        while True:
+            generation, fn, args = self.queue.get()
+            if generation != self.generation:
+                continue
+            try:
+                fn(*args)
+            except Exception:
+                traceback.print_exc()
@@ -0,0 +1,578 @@
+"""
+Directory listing engine.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import re
+import stat
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from collections.abc import Sequence
+from itertools import accumulate, compress, islice
+from operator import attrgetter
+
+IS_WINDOWS = sys.platform.startswith('win')
+FILE_ATTRIBUTE_HIDDEN = 0x2
+
+FLAG_DIR = 0x1
+FLAG_HIDDEN = 0x2
+FLAG_LINK = 0x4
+# The parent directory is a folder, but is displayed without a separator.
+FLAG_PARENT = 0x8
+# Surrogates are allowed through so names that aren't valid UTF-8 still round trip.
+NAME_ENCODING = ('utf-8', 'surrogatepass')
+PACK_CHUNK = 4096
+
+# Patterns that reference groups by number, reference named groups, or set global flags
+# can't be safely joined with other patterns, as joining changes group numbers and flag scope.
+RE_UNJOINABLE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)')
+
+
+class Entry(namedtuple('Entry', ['name', 'is_dir', 'is_hidden', 'is_link'])):
+    """
+    Directory entry record.
+
+    The type information is captured once, when the directory is read,
+    so consumers never have to go back to the disk to ask for it.
+    """
+
+    __slots__ = ()
+
+
+PARENT = Entry('..', True, False, False)
+
+
+def is_hidden(entry):
+    """
+    Check if a `DirEntry` is a system hidden file.
+
+    On Windows the file attributes come back with the directory read,
+    so `DirEntry.stat` is served from its cache and costs no system call.
+    """
+
+    if IS_WINDOWS:
+        try:
+            return bool(entry.stat(follow_symlinks=False).st_file_attributes & FILE_ATTRIBUTE_HIDDEN)
+        except OSError:
+            return False
+    return entry.name.startswith('.')
+
+
+def make_entry(entry):
+    """
+    Create an entry record from a `DirEntry`.
+
+    `DirEntry.is_dir` uses the type reported by the directory read and
+    only falls back to a `stat` when the type is unknown or the entry
+    is a symlink that must be followed.
+    """
+
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False
+    try:
+        is_link = entry.is_symlink()
+    except OSError:
+        is_link = False
+    return Entry(entry.name, is_dir, is_hidden(entry), is_link)
+
+
+class Excludes(object):
+    """
+    Compiled exclusion patterns.
+
+    Patterns are compiled once and joined into a single alternation, so
+    matching a name costs one regular expression match no matter how many
+    patterns there are.  Patterns that can't be joined are matched on
+    their own.  Invalid patterns are skipped and recorded in `errors` as
+    `(pattern, message)` tuples.
+    """
+
+    def __init__(self, patterns=()):
+        """Compile the patterns."""
+
+        self.patterns = tuple(patterns)
+        self.errors = []
+        joinable = []
+        self.separate = []
+        for pattern in self.patterns:
+            try:
+                compiled = re.compile(pattern)
+            except (re.error, TypeError) as e:
+                self.errors.append((pattern, str(e)))
+                continue
+            if RE_UNJOINABLE.search(pattern):
+                self.separate.append(compiled)
+            else:
+                joinable.append(pattern)
+
+        self.combined = None
+        if joinable:
+            try:
+                self.combined = re.compile('|'.join('(?:{})'.format(p) for p in joinable))
+            except re.error:
+                # Something like duplicate group names; fall back to matching one by one.
+                self.separate = [re.compile(p) for p in joinable] + self.separate
+
+    def __bool__(self):
+        """Check if there are any patterns to match."""
+
+        return self.combined is not None or bool(self.separate)
+
+    def match(self, name):
+        """Check if the name is excluded."""
+
+        if self.combined is not None and self.combined.match(name):
+            return True
+        for pattern in self.separate:
+            if pattern.match(name):
+                return True
+        return False
+
+
+def stat_entry(folder, name):
+    """Create an entry record for a single name in a folder."""
+
+    target = os.path.join(folder, name)
+    st = os.lstat(target)
+    is_link = stat.S_ISLNK(st.st_mode)
+    if is_link:
+        try:
+            is_dir = stat.S_ISDIR(os.stat(target).st_mode)
+        except OSError:
+            is_dir = False
+    else:
+        is_dir = stat.S_ISDIR(st.st_mode)
+    if IS_WINDOWS:
+        hidden = bool(getattr(st, 'st_file_attributes', 0) & FILE_ATTRIBUTE_HIDDEN)
+    else:
+        hidden = name.startswith('.')
+    return Entry(name, is_dir, hidden, is_link)
+
+
+def iter_scan(cwd):
+    """Yield entry records for the given directory."""
+
+    with os.scandir(cwd) as it:
+        for entry in it:
+            yield make_entry(entry)
+
+
+def scan(cwd):
+    """Get entry records for the given directory."""
+
+    return list(iter_scan(cwd))
+
+
+def drive_entries(drives):
+    """Get entry records for a list of Windows drives."""
+
+    return [Entry(d, True, False, False) for d in drives]
+
+
+def pack_flags(entry):
+    """Get the flags of an entry record."""
+
+    return (
+        (FLAG_DIR if entry.is_dir else 0) |
+        (FLAG_HIDDEN if entry.is_hidden else 0) |
+        (FLAG_LINK if entry.is_link else 0)
+    )
+
+
+class PackedEntries(Sequence):
+    """
+    Compact sequence of entry records.
+
+    Names are UTF-8 encoded into one shared buffer and each entry is an
+    offset and length into it plus a byte of flags, so an entry costs a
+    few bytes more than its name instead of a string, a tuple, and a list
+    slot.  `Entry` records are only created when an entry is read.
+
+    Slices share the buffer.  Inserted names are appended to the buffer
+    and removed names are left in it until at least half of it is unused,
+    at which point the live names are copied to a new buffer.
+    """
+
+    def __init__(self, entries=(), buffer=None):
+        """Pack the entry records."""
+
+        self.buffer = bytearray() if buffer is None else buffer
+        self.starts = array('Q')
+        self.lengths = array('I')
+        self.flags = array('B')
+        self.unused = 0
+        self.extend(entries)
+
+    def __len__(self):
+        """Get the number of entries."""
+
+        return len(self.flags)
+
+    def __iter__(self):
+        """Iterate the entry records."""
+
+        buffer = self.buffer
+        for start, length, flags in zip(self.starts, self.lengths, self.flags):
+            yield Entry(
+                buffer[start:start + length].decode(*NAME_ENCODING),
+                bool(flags & FLAG_DIR), bool(flags & FLAG_HIDDEN), bool(flags & FLAG_LINK)
+            )
+
+    def __getitem__(self, index):
+        """Get an entry record, or a packed slice of the entries."""
+
+        if isinstance(index, slice):
+            result = PackedEntries(buffer=self.buffer)
+            result.starts = self.starts[index]
+            result.lengths = self.lengths[index]
+            result.flags = self.flags[index]
+            return result
+        flags = self.flags[index]
+        return Entry(self.name(index), bool(flags & FLAG_DIR), bool(flags & FLAG_HIDDEN), bool(flags & FLAG_LINK))
+
+    def __delitem__(self, index):
+        """Remove an entry."""
+
+        self.unused += self.lengths[index]
+        del self.starts[index]
+        del self.lengths[index]
+        del self.flags[index]
+        if self.unused > 4096 and self.unused * 2 > len(self.buffer):
+            self.compact()
+
+    def name(self, index):
+        """Get the name of an entry."""
+
+        start = self.starts[index]
+        return self.buffer[start:start + self.lengths[index]].decode(*NAME_ENCODING)
+
+    def is_dir(self, index):
+        """Check if an entry is a directory."""
+
+        return bool(self.flags[index] & FLAG_DIR)
+
+    def store(self, name):
+        """Add an encoded name to the buffer and get its offset and length."""
+
+        data = name.encode(*NAME_ENCODING)
+        start = len(self.buffer)
+        self.buffer += data
+        return start, len(data)
+
+    def append(self, entry):
+        """Add an entry to the end."""
+
+        start, length = self.store(entry.name)
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.flags.append(pack_flags(entry))
+
+    def extend(self, entries):
+        """Add entries to the end, packing them a chunk at a time."""
+
+        entries = iter(entries)
+        while True:
+            chunk = list(islice(entries, PACK_CHUNK))
+            if not chunk:
+                break
+            encoded = [e.name.encode(*NAME_ENCODING) for e in chunk]
+            lengths = array('I', [len(data) for data in encoded])
+            self.starts.extend(accumulate(lengths[:-1], initial=len(self.buffer)))
+            self.lengths.extend(lengths)
+            self.flags.extend([e.is_dir | e.is_hidden << 1 | e.is_link << 2 for e in chunk])
+            self.buffer += b''.join(encoded)
+
+    def insert(self, index, entry):
+        """Insert an entry before the given index."""
+
+        start, length = self.store(entry.name)
+        self.starts.insert(index, start)
+        self.lengths.insert(index, length)
+        self.flags.insert(index, pack_flags(entry))
+
+    def take(self, other, indexes):
+        """Add the entries of another packed sequence at the given indexes."""
+
+        if self.buffer is other.buffer:
+            self.starts.extend(map(other.starts.__getitem__, indexes))
+            self.lengths.extend(map(other.lengths.__getitem__, indexes))
+            self.flags.extend(map(other.flags.__getitem__, indexes))
+        else:
+            for i in indexes:
+                self.append(other[i])
+
+    def sort_keys(self, indexes, suffix=b''):
+        """Sort indexes by their encoded names, which sort the same as the names."""
+
+        # Keys are cut from an immutable copy, as `bytes` compare much faster than `bytearray`.
+        data = bytes(self.buffer)
+        starts, lengths = self.starts, self.lengths
+        if suffix:
+            indexes.sort(key=lambda i: data[starts[i]:starts[i] + lengths[i]] + suffix)
+        else:
+            indexes.sort(key=lambda i: data[starts[i]:starts[i] + lengths[i]])
+
+    def compact(self):
+        """Copy the live names to a new buffer."""
+
+        buffer = bytearray()
+        starts = array('Q')
+        for start, length in zip(self.starts, self.lengths):
+            starts.append(len(buffer))
+            buffer += self.buffer[start:start + length]
+        self.buffer = buffer
+        self.starts = starts
+        self.unused = 0
+
+
+class DisplayNames(Sequence):
+    """
+    The display names of packed entries.
+
+    Names are created when they are read, so only the rows that are shown
+    or searched become strings.  Slices are plain lists, as they are made
+    to be handed to the quick panel.  Compares equal to any sequence with
+    the same names.
+    """
+
+    __hash__ = None
+
+    def __init__(self, entries, sep):
+        """Initialize."""
+
+        self.entries = entries
+        self.sep = sep
+
+    def __len__(self):
+        """Get the number of names."""
+
+        return len(self.entries)
+
+    def __iter__(self):
+        """Iterate the display names."""
+
+        buffer = self.entries.buffer
+        sep = self.sep
+        for start, length, flags in zip(self.entries.starts, self.entries.lengths, self.entries.flags):
+            name = buffer[start:start + length].decode(*NAME_ENCODING)
+            yield name + sep if flags & (FLAG_DIR | FLAG_PARENT) == FLAG_DIR else name
+
+    def __getitem__(self, index):
+        """Get a display name, or a list of them."""
+
+        if isinstance(index, slice):
+            if index.step is None or index.step == 1:
+                return list(DisplayNames(self.entries[index], self.sep))
+            return [self[i] for i in range(*index.indices(len(self)))]
+        name = self.entries.name(index)
+        return name + self.sep if self.entries.flags[index] & (FLAG_DIR | FLAG_PARENT) == FLAG_DIR else name
+
+    def __eq__(self, other):
+        """Compare the names with another sequence."""
+
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+
+class Listing(object):
+    """
+    Processed directory listing.
+
+    Folders come first, then documents, each sorted by their display
+    name.  The first entry is always the parent directory (`..`).
+    `entries` holds the entry records packed (see `PackedEntries`) and
+    `names` the display names handed to the quick panel, index for index.
+
+    Records are sorted on the names they already hold and then packed,
+    so the only extra memory while sorting is the sort itself.  Packed
+    entries are sorted in place by their encoded names.
+    """
+
+    def __init__(self, entries, sep=os.sep):
+        """Sort and pack the entries."""
+
+        self.sep = sep
+        self.version = 0
+        if isinstance(entries, PackedEntries):
+            flags = entries.flags
+            folders = list(compress(range(len(flags)), map(FLAG_DIR.__and__, flags)))
+            documents = list(compress(range(len(flags)), [not f & FLAG_DIR for f in flags]))
+            entries.sort_keys(folders, sep.encode(*NAME_ENCODING))
+            entries.sort_keys(documents)
+            self.entries = PackedEntries(buffer=entries.buffer)
+            self.entries.append(PARENT)
+            self.entries.take(entries, folders)
+            self.entries.take(entries, documents)
+        else:
+            folders = sorted((e for e in entries if e.is_dir), key=lambda e: e.name + sep)
+            documents = sorted((e for e in entries if not e.is_dir), key=attrgetter('name'))
+            self.entries = PackedEntries((PARENT,))
+            self.entries.extend(folders)
+            self.entries.extend(documents)
+        self.entries.flags[0] |= FLAG_PARENT
+        self.folders = len(folders)
+
+    def __len__(self):
+        """Get the number of entries, including the parent directory."""
+
+        return len(self.entries)
+
+    @property
+    def names(self):
+        """Get the display names."""
+
+        return DisplayNames(self.entries, self.sep)
+
+    def is_dir(self, index):
+        """Check if the entry at the given index is a directory."""
+
+        return self.entries.is_dir(index)
+
+    def display_name(self, entry):
+        """Get the display name of an entry."""
+
+        return entry.name + self.sep if entry.is_dir else entry.name
+
+    def find(self, name):
+        """Get the index of an entry by name, or -1 if it isn't listed."""
+
+        names = self.names
+        for display, start, end in (
+            (name + self.sep, 1, 1 + self.folders),
+            (name, 1 + self.folders, len(names))
+        ):
+            index = bisect_left(names, display, start, end)
+            if index < end and names[index] == display:
+                return index
+        return -1
+
+    def insert(self, entry):
+        """
+        Insert an entry in its sorted position and return its index.
+
+        An entry with the same name is replaced.
+        """
+
+        self.remove(entry.name)
+        display = self.display_name(entry)
+        if entry.is_dir:
+            start, end = 1, 1 + self.folders
+        else:
+            start, end = 1 + self.folders, len(self.entries)
+        index = bisect_left(self.names, display, start, end)
+        self.entries.insert(index, entry)
+        if entry.is_dir:
+            self.folders += 1
+        self.version += 1
+        return index
+
+    def copy(self):
+        """Get a copy that can be patched separately, sharing the packed names."""
+
+        result = Listing((), self.sep)
+        result.entries = self.entries[:]
+        result.folders = self.folders
+        return result
+
+    def subset(self, keep):
+        """Get a listing of the entries `keep(entry)` accepts, in the same order, without sorting again."""
+
+        return self.select([i for i, entry in enumerate(self.entries) if i and keep(entry)])
+
+    def select(self, rows):
+        """Get a listing of the entries at the given (ascending) indexes, sharing the packed names."""
+
+        entries = self.entries
+        result = Listing((), self.sep)
+        result.entries = entries[:1]
+        result.entries.take(entries, rows)
+        result.folders = sum(1 for i in rows if entries.flags[i] & FLAG_DIR)
+        return result
+
+    def remove(self, name):
+        """Remove an entry by name and return the index it had, or -1 if it isn't listed."""
+
+        index = self.find(name)
+        if index != -1:
+            if self.entries.is_dir(index):
+                self.folders -= 1
+            del self.entries[index]
+            self.version += 1
+        return index
+
+
+class Folder(object):
+    """
+    Every entry of a folder, with the listings for both hidden file views.
+
+    `all` lists every entry, hidden or not.  The listing with hidden
+    entries and `regex_exclude` matches left out is built from the same
+    records the first time it is needed, without reading the folder again
+    or sorting.  Patches are applied to both listings.
+    """
+
+    def __init__(self, entries, excludes=None, sep=os.sep):
+        """Sort the entries."""
+
+        self.all = Listing(entries, sep)
+        self.excludes = excludes
+        self.visible = None
+
+    @classmethod
+    def from_listing(cls, result, excludes=None):
+        """Create a folder from a listing of every entry, which is used as is."""
+
+        folder = cls((), excludes, result.sep)
+        folder.all = result
+        return folder
+
+    def __len__(self):
+        """Get the number of entries, including the parent directory."""
+
+        return len(self.all)
+
+    def is_hidden(self, entry):
+        """Check if the entry is left out when hidden entries are hidden."""
+
+        return entry.is_hidden or (self.excludes is not None and self.excludes.match(entry.name))
+
+    def view(self, hide_hidden):
+        """Get the listing to show."""
+
+        if not hide_hidden:
+            return self.all
+        if self.visible is None:
+            # Filter on the packed flags and names, without creating entry records.
+            entries = self.all.entries
+            flags = entries.flags
+            match = self.excludes.match if self.excludes else None
+            self.visible = self.all.select([
+                i for i in range(1, len(flags))
+                if not flags[i] & FLAG_HIDDEN and (match is None or not match(entries.name(i)))
+            ])
+        return self.visible
+
+    def insert(self, entry):
+        """Insert or replace an entry in both listings."""
+
+        self.all.insert(entry)
+        if self.visible is not None:
+            if self.is_hidden(entry):
+                self.visible.remove(entry.name)
+            else:
+                self.visible.insert(entry)
+
+    def remove(self, name):
+        """Remove an entry from both listings, returning its index in `all`, or -1 if it isn't listed."""
+
+        index = self.all.remove(name)
+        if self.visible is not None:
+            self.visible.remove(name)
+        return index
@@ -0,0 +1,109 @@
+"""
+Folder reachability cache.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os.path as path
+import threading
+import time
+
+REACHABLE = 'reachable'
+MISSING = 'missing'
+TIMED_OUT = 'timed out'
+
+
+class Reachability(object):
+    """
+    Cache of whether folders can be reached, checked in the background.
+
+    Each folder is checked on its own thread, so a dead network mount
+    only holds up its own result.  Checks that don't finish within
+    `timeout` seconds are recorded as `TIMED_OUT`; the thread is left to
+    finish on its own, and the folder isn't checked again while it is
+    still stuck.  Results are kept for `ttl` seconds; with a `ttl` of 0
+    they aren't cached, but are still passed to the check's `on_done`.
+    """
+
+    def __init__(self, ttl=60.0, timeout=2.0, isdir=path.isdir):
+        """Initialize."""
+
+        self.lock = threading.Lock()
+        self.ttl = ttl
+        self.timeout = timeout
+        self.isdir = isdir
+        self.results = {}
+        self.pending = {}
+
+    def get(self, target):
+        """Get the cached state of a folder, or `None` if it is unknown or has expired."""
+
+        with self.lock:
+            item = self.results.get(target)
+            if item is None or time.monotonic() - item[1] > self.ttl:
+                return None
+            return item[0]
+
+    def invalidate(self, target=None):
+        """Forget the state of a folder, or of every folder."""
+
+        with self.lock:
+            if target is None:
+                self.results.clear()
+            else:
+                self.results.pop(target, None)
+
+    def check(self, targets, on_done=None):
+        """
+        Check the folders whose state is unknown in the background.
+
+        `on_done(states)` is called from a background thread with a
+        dictionary of the state of every target once each check has
+        finished or timed out.  Returns `False` if every state was already
+        cached, in which case `on_done` isn't called.
+        """
+
+        events = {}
+        with self.lock:
+            now = time.monotonic()
+            for target in targets:
+                item = self.results.get(target)
+                if item is not None and now - item[1] <= self.ttl:
+                    continue
+                event = self.pending.get(target)
+                if event is None:
+                    event = self.pending[target] = threading.Event()
+                    threading.Thread(target=self.work, args=(target, event), daemon=True).start()
+                events[target] = event
+        if not events:
+            return False
+        if on_done is not None:
+            threading.Thread(target=self.wait, args=(targets, events, on_done), daemon=True).start()
+        return True
+
+    def work(self, target, event):
+        """Check a folder (runs on its own thread)."""
+
+        try:
+            state = REACHABLE if self.isdir(target) else MISSING
+        except Exception:
+            state = MISSING
+        with self.lock:
+            self.results[target] = (state, time.monotonic())
+            del self.pending[target]
+        event.set()
+
+    def wait(self, targets, events, on_done):
+        """Wait for the checks, marking those that run out of time, and report every state."""
+
+        deadline = time.monotonic() + self.timeout
+        for target, event in events.items():
+            if not event.wait(max(deadline - time.monotonic(), 0)):
+                with self.lock:
+                    # Remember the stuck folder without replacing a result that just came in.
+                    if target in self.pending:
+                        self.results[target] = (TIMED_OUT, time.monotonic())
+        # Report the results that just came in even if they have already expired.
+        with self.lock:
+            states = {target: self.results[target][0] if target in self.results else TIMED_OUT for target in targets}
+        on_done(states)
@@ -0,0 +1,150 @@
+"""
+Settings snapshot.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import threading
+from collections import namedtuple
+
+# Setting name, default, and the type the value is coerced to.
+FIELDS = (
+    ("home", "~", str),
+    ("regex_exclude", (), tuple),
+    ("keep_panel_open_after_action", False, bool),
+    ("keep_panel_open_exceptions", frozenset(), frozenset),
+    ("show_system_hidden_files", False, bool),
+    ("completion_style", "fuzzy", str),
+    ("start_from_here_default_action", "bookmarks", str),
+    ("bookmarks", (), tuple),
+    ("add_folder_to_project_relative", False, bool),
+    ("add_folder_to_project_follow_symlink", True, bool),
+    ("use_sub_notify", False, bool),
+    ("debug", False, bool),
+    ("listing_cache_size", 100000, int),
+    ("listing_store_size", 0, int),
+    ("fs_timeout", 2000, int),
+    ("fs_unreachable_ttl", 30, int),
+    ("bookmark_timeout", 2000, int),
+    ("bookmark_reachability_ttl", 60, int),
+    ("warm_up", False, bool),
+    ("warm_up_delay", 3000, int),
+    ("prefetch_budget", 20, int),
+    ("prefetch_delay", 250, int),
+    ("folder_watcher", "auto", str),
+    ("index_project_folders", False, bool),
+    ("flatten_depth", 5, int),
+    ("flatten_max_entries", 50000, int),
+    ("flatten_workers", 8, int),
+    ("large_listing_threshold", 20000, int),
+    ("large_listing_results", 2000, int),
+    ("paste_workers", 8, int),
+    ("paste_merge_hash", False, bool)
+)
+
+
+class Bookmark(namedtuple('Bookmark', ['name', 'path', 'index', 'warm'])):
+    """A bookmark with its path resolved for this platform and host."""
+
+    __slots__ = ()
+
+    def __new__(cls, name, path, index=False, warm=True):
+        """Create a bookmark, which isn't indexed, but is warmed up, by default."""
+
+        return super().__new__(cls, name, path, index, warm)
+
+
+class Snapshot(namedtuple('Snapshot', [f[0] for f in FIELDS])):
+    """
+    Immutable snapshot of the settings.
+
+    Every value is coerced to the type in `FIELDS`, falling back to the
+    default if it can't be, so readers never need to validate a value.
+    Values that support multiconf (`home` and the bookmark paths) are
+    resolved when the snapshot is created.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, settings, resolve):
+        """
+        Create a snapshot from a settings object.
+
+        `resolve(obj, key, default)` returns the multiconf resolved value
+        of `key` in `obj`.
+        """
+
+        values = {}
+        for name, default, kind in FIELDS:
+            if name == "home":
+                value = resolve(settings, name, default)
+            elif name == "bookmarks":
+                value = cls.resolve_bookmarks(settings.get(name, []), resolve)
+            else:
+                value = settings.get(name, default)
+            try:
+                if kind in (tuple, frozenset) and not isinstance(value, (list, tuple, set, frozenset)):
+                    raise TypeError
+                values[name] = kind(value)
+            except (TypeError, ValueError):
+                values[name] = default
+        return cls(**values)
+
+    @staticmethod
+    def resolve_bookmarks(bookmarks, resolve):
+        """Resolve bookmarks, dropping those that don't apply to this platform or host."""
+
+        resolved = []
+        if not isinstance(bookmarks, list):
+            return resolved
+        for bm in bookmarks:
+            if not isinstance(bm, dict):
+                continue
+            target = resolve(bm, "path", None)
+            if target is not None:
+                resolved.append(
+                    Bookmark(
+                        bm.get("name", target), target,
+                        bm.get("index", False) is True, bm.get("warm", True) is not False
+                    )
+                )
+        return resolved
+
+    def keep_panel_open(self, action):
+        """Check if the panel should stay open after the given action."""
+
+        return self.keep_panel_open_after_action and action not in self.keep_panel_open_exceptions
+
+
+class SettingsStore(object):
+    """
+    Hold the current settings snapshot.
+
+    The settings are only loaded when the snapshot is first requested
+    and when `refresh` is called, which is meant to be hooked up to the
+    settings change callback.
+    """
+
+    def __init__(self, loader, resolve):
+        """Initialize."""
+
+        self.loader = loader
+        self.resolve = resolve
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def get(self):
+        """Get the current snapshot."""
+
+        snapshot = self.snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def refresh(self, settings=None):
+        """Create a new snapshot from the given settings object, loading the settings if one isn't given."""
+
+        with self.lock:
+            self.snapshot = Snapshot.create(self.loader() if settings is None else settings, self.resolve)
+            return self.snapshot
@@ -0,0 +1,89 @@
+"""
+Stat cache for panel key presses.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import os.path as path
+import stat
+from .guard import Unreachable
+
+
+class StatCache(object):
+    """
+    Memoize `exists`/`isdir` lookups while the panel content is unchanged.
+
+    Sublime asks every key binding's context for every key press, so the
+    same few paths get checked over and over.  Results are kept until the
+    key (the panel's change count and current folder) changes, so each
+    unique path costs at most one `stat` per key press.  Names found in the
+    current listing are answered from the listing's records without a
+    `stat` at all; the sorted listing is searched for just the name asked
+    about, so nothing is indexed when the listing changes.  `stat` is the
+    function used to stat paths that aren't listed; paths it raises
+    `Unreachable` for don't exist, but are also reported by `unreachable`.
+    """
+
+    def __init__(self, stat=os.stat):
+        """Initialize."""
+
+        self.stat = stat
+        self.key = None
+        self.results = {}
+        self.listing = None
+        self.cwd = None
+        self.stats = 0
+
+    def update(self, key, cwd, listing=None):
+        """Start a new key press, dropping results if the key has changed."""
+
+        if key != self.key:
+            self.key = key
+            self.results.clear()
+        self.cwd = cwd
+        self.listing = listing
+
+    def clear(self):
+        """Clear everything."""
+
+        self.key = None
+        self.cwd = None
+        self.listing = None
+        self.results.clear()
+
+    def lookup(self, target):
+        """Get whether a path exists, whether it is a directory, and whether it couldn't be reached."""
+
+        if self.listing is not None:
+            folder, name = path.split(target)
+            if folder == self.cwd and name:
+                index = self.listing.find(name)
+                if index > 0:
+                    return True, self.listing.is_dir(index), False
+        result = self.results.get(target)
+        if result is None:
+            self.stats += 1
+            try:
+                result = (True, stat.S_ISDIR(self.stat(target).st_mode), False)
+            except Unreachable:
+                result = (False, False, True)
+            except (OSError, ValueError):
+                result = (False, False, False)
+            self.results[target] = result
+        return result
+
+    def exists(self, target):
+        """Check if the path exists."""
+
+        return self.lookup(target)[0]
+
+    def isdir(self, target):
+        """Check if the path is a directory."""
+
+        return self.lookup(target)[1]
+
+    def unreachable(self, target):
+        """Check if the path didn't respond in time."""
+
+        return self.lookup(target)[2]
@@ -0,0 +1,451 @@
+"""
+Background copy and move.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import errno
+import hashlib
+import os
+import os.path as path
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .jobs import Job
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CHUNK_SIZE = 1024 * 1024
+# The kernel copies without passing the data through Python, so it is asked for more at a time.
+KERNEL_CHUNK_SIZE = 16 * 1024 * 1024
+IS_LINUX = sys.platform.startswith('linux')
+# `ioctl` request that makes the destination share the source's blocks (Btrfs, XFS, ...).
+FICLONE = 0x40049409
+# Errors that mean a copy method isn't supported for these files, rather than that the copy failed.
+UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EBADF, errno.ENOTSUP, errno.EOPNOTSUPP, errno.ENOTTY}
+# Modified times closer than this are the same; some file systems only keep them to a second or two.
+MTIME_WINDOW = 2.0
+PARTIAL_SUFFIX = '.ffn-partial'
+ASIDE_SUFFIX = '.ffn-replaced'
+RE_TEMPORARY = re.compile(r'(?:{}|{})-[0-9a-f]+$'.format(re.escape(PARTIAL_SUFFIX), re.escape(ASIDE_SUFFIX)))
+
+
+class Cancelled(Exception):
+    """The job was cancelled."""
+
+
+def format_size(size):
+    """Format a number of bytes."""
+
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = 'TB'
+    return '{:.0f} {}'.format(size, unit) if unit == 'B' else '{:.1f} {}'.format(size, unit)
+
+
+def is_temporary(name):
+    """Check if a name is one of a paste's temporary copies."""
+
+    return RE_TEMPORARY.search(name) is not None
+
+
+def raise_error(e):
+    """Raise a walk error, so unreadable folders aren't skipped."""
+
+    raise e
+
+
+def remove(target):
+    """Remove a file or a folder tree."""
+
+    if path.isdir(target) and not path.islink(target):
+        shutil.rmtree(target)
+    else:
+        os.remove(target)
+
+
+class PasteJob(Job):
+    """
+    Copy or move a file or folder in the background.
+
+    The source is copied next to `dest` under a temporary name, then
+    renamed into place; an existing `dest` is only removed once the copy
+    is complete.  Temporary names are unique to the job (see
+    `is_temporary`), so a cancelled job that is still stopping can't
+    remove the copy of a job that replaced it.  Files are copied like `shutil.copyfile`.  A move is a
+    rename when the source and `dest` are on the same device, and a copy
+    followed by removing the source when they aren't.
+
+    Folders are copied like `shutil.copytree`, but many files at a time:
+    the tree is walked once, its folders are created, and its files are
+    then copied, with their metadata, by a pool of `workers` threads.
+    Folder metadata is copied last, deepest first, as copying files into
+    a folder changes its modified time.  The first error stops the copy.
+
+    File data is copied by the fastest method the platform and file
+    system support: a reflink (a copy on write clone), then
+    `os.copy_file_range` or `os.sendfile` in large chunks, which copy
+    within the kernel, and finally reads and writes of `chunk_size`
+    bytes.  Progress is counted and cancellation checked after each
+    chunk.  A cancelled job removes its partial copy and leaves the
+    source and `dest` as they were.
+
+    With `merge`, a folder is copied into an existing `dest` folder
+    instead of replacing it.  Files that `dest` already has with the same
+    size and modified time are skipped, or, with `compare_hash`, with the
+    same size and contents.  Other files are copied under a temporary
+    name and renamed over what was there, so a cancelled merge leaves
+    each file either as it was or fully copied.  Files only in `dest` are
+    kept.  A merge that moves always compares contents, and only removes
+    the source files that were copied or found identical, and then the
+    folders that leaves empty.
+
+    `on_progress` is called at most every `interval` seconds; `on_done`
+    once the paste is complete, and `on_error` with the exception if it
+    fails.  Callbacks receive the job first.  Nothing is reported once
+    the job is cancelled.
+    """
+
+    def __init__(
+        self, source, dest, move, on_progress, on_done, on_error,
+        chunk_size=CHUNK_SIZE, interval=0.25, workers=8, merge=False, compare_hash=False
+    ):
+        """Initialize."""
+
+        super().__init__()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.source = source
+        self.dest = dest
+        self.move = move
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.chunk_size = chunk_size
+        self.interval = interval
+        self.workers = max(1, workers)
+        self.merge = merge
+        self.compare_hash = compare_hash
+        self.suffix = '-' + uuid.uuid4().hex[:12]
+        self.partial = dest + PARTIAL_SUFFIX + self.suffix
+        self.files_total = 0
+        self.bytes_total = 0
+        self.files_done = 0
+        self.bytes_done = 0
+        self.files_skipped = 0
+        self.bytes_skipped = 0
+        self.merged = set()
+        self.reported = 0.0
+
+    @property
+    def throughput(self):
+        """Get the bytes copied per second."""
+
+        elapsed = self.elapsed
+        return self.bytes_done / elapsed if elapsed else 0.0
+
+    def status(self):
+        """Describe the progress."""
+
+        return '{} of {}, {} of {} files{}, {}/s'.format(
+            format_size(self.bytes_done), format_size(self.bytes_total),
+            self.files_done, self.files_total,
+            ' ({} unchanged)'.format(self.files_skipped) if self.merge else '',
+            format_size(self.throughput)
+        )
+
+    def work(self):
+        """Copy or move the source."""
+
+        try:
+            if self.merge:
+                self.copy_tree(self.source, self.dest)
+                if self.move:
+                    self.remove_merged()
+            elif not (self.move and self.rename()):
+                if path.isdir(self.source):
+                    self.copy_tree(self.source, self.partial)
+                else:
+                    self.files_total = 1
+                    self.bytes_total = os.stat(self.source).st_size
+                    self.copy_data(self.source, self.partial)
+                self.check()
+                self.install(self.partial)
+                if self.move:
+                    remove(self.source)
+        except Exception as e:
+            self.finished = time.perf_counter()
+            self.clean_up()
+            if not self.cancelled:
+                self.on_error(self, e)
+            return
+        self.finished = time.perf_counter()
+        self.on_done(self)
+
+    def check(self):
+        """Stop if the job was cancelled, or another copy of the tree failed."""
+
+        if self.cancelled or self.stopped.is_set():
+            raise Cancelled()
+
+    def progress(self, size, files=0):
+        """Count copied bytes and files, reporting progress if it hasn't been reported recently."""
+
+        self.check()
+        with self.lock:
+            self.bytes_done += size
+            self.files_done += files
+            now = time.perf_counter()
+            if now - self.reported < self.interval:
+                return
+            self.reported = now
+        self.on_progress(self)
+
+    def rename(self):
+        """Move the source with a rename if it is on the same device as the destination."""
+
+        try:
+            if os.lstat(self.source).st_dev != os.stat(path.dirname(self.dest) or os.curdir).st_dev:
+                return False
+        except OSError:
+            return False
+        self.install(self.source)
+        return True
+
+    def install(self, target):
+        """Rename the target to the destination, removing what was there once it is in place."""
+
+        aside = None
+        if path.lexists(self.dest):
+            aside = self.dest + ASIDE_SUFFIX + self.suffix
+            os.rename(self.dest, aside)
+        try:
+            os.rename(target, self.dest)
+        except OSError:
+            if aside is not None:
+                os.rename(aside, self.dest)
+            raise
+        if aside is not None:
+            remove(aside)
+
+    def clean_up(self):
+        """Remove a partial copy."""
+
+        try:
+            if path.lexists(self.partial):
+                remove(self.partial)
+        except OSError:
+            pass
+
+    def walk(self, source):
+        """Get the relative paths of the folders and files of a tree, counting the bytes to copy."""
+
+        folders = ['']
+        files = []
+        # Like `shutil.copytree`, symlinks are followed and copied as what they point to.
+        for root, dirs, names in os.walk(source, onerror=raise_error, followlinks=True):
+            self.check()
+            rel = path.relpath(root, source)
+            rel = '' if rel == os.curdir else rel
+            folders.extend(path.join(rel, name) for name in dirs)
+            for name in names:
+                files.append(path.join(rel, name))
+                self.bytes_total += os.stat(path.join(root, name)).st_size
+        self.files_total = len(files)
+        return folders, files
+
+    def copy_tree(self, source, dest):
+        """Copy a folder tree, creating its folders first and then copying its files in parallel."""
+
+        folders, files = self.walk(source)
+        for rel in folders:
+            self.check()
+            target = path.join(dest, rel)
+            if not (self.merge and path.isdir(target)):
+                os.mkdir(target)
+            if self.merge:
+                self.merged.add(rel)
+
+        files = iter(files)
+        running = set()
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while True:
+                # Keep the pool busy without queueing every file up front.
+                for rel in files:
+                    running.add(pool.submit(
+                        self.merge_file if self.merge else self.copy_file, path.join(source, rel), path.join(dest, rel)
+                    ))
+                    if len(running) >= self.workers * 4:
+                        break
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+        except BaseException:
+            # Stop the other copies before the partial tree is removed.
+            self.stopped.set()
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        for rel in reversed(folders):
+            self.check()
+            shutil.copystat(path.join(source, rel), path.join(dest, rel))
+
+    def copy_file(self, source, dest):
+        """Copy a file of a folder tree with its metadata (runs on the pool)."""
+
+        self.copy_data(source, dest)
+        shutil.copystat(source, dest)
+
+    def merge_file(self, source, dest):
+        """Copy a file of a merged tree over what is there, unless it is unchanged (runs on the pool)."""
+
+        info = os.stat(source)
+        try:
+            existing = os.stat(dest)
+        except FileNotFoundError:
+            existing = None
+        if existing is not None and self.unchanged(source, dest, info, existing):
+            with self.lock:
+                self.files_skipped += 1
+                self.bytes_skipped += info.st_size
+                self.bytes_total -= info.st_size
+                self.merged.add(path.relpath(source, self.source))
+            self.progress(0, 1)
+            return
+
+        partial = dest + PARTIAL_SUFFIX + self.suffix
+        try:
+            self.copy_file(source, partial)
+            os.replace(partial, dest)
+        except BaseException:
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+            raise
+        with self.lock:
+            self.merged.add(path.relpath(source, self.source))
+
+    def remove_merged(self):
+        """Remove the source files of a merge that were copied or found identical, then the emptied folders."""
+
+        if path.islink(self.source):
+            os.remove(self.source)
+            return
+        # Links are removed, not followed, so nothing outside the source is removed.
+        for root, dirs, names in os.walk(self.source, topdown=False):
+            rel = path.relpath(root, self.source)
+            rel = '' if rel == os.curdir else rel
+            for name in names:
+                if path.join(rel, name) in self.merged:
+                    os.remove(path.join(root, name))
+            for name in dirs:
+                target = path.join(root, name)
+                if path.islink(target) and path.join(rel, name) in self.merged:
+                    os.remove(target)
+            try:
+                os.rmdir(root)
+            except OSError:
+                # Something that wasn't merged is left in it.
+                pass
+
+    def unchanged(self, source, dest, info, existing):
+        """Check if the destination already has the file."""
+
+        if info.st_size != existing.st_size:
+            return False
+        # A move removes the source, so a file of the same size is only skipped if it is proven identical.
+        if not (self.compare_hash or self.move):
+            return abs(info.st_mtime - existing.st_mtime) < MTIME_WINDOW
+        if self.digest(source) != self.digest(dest):
+            return False
+        # Sync the modified time, so the file isn't read again by a merge without hashes.
+        if info.st_mtime_ns != existing.st_mtime_ns:
+            shutil.copystat(source, dest)
+        return True
+
+    def digest(self, target):
+        """Hash a file's contents a chunk at a time."""
+
+        digest = hashlib.sha1()
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        with open(target, 'rb') as f:
+            while True:
+                self.check()
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digest.update(view[:count])
+        return digest.digest()
+
+    def copy_data(self, source, dest):
+        """Copy a file's contents."""
+
+        with open(source, 'rb') as src, open(dest, 'wb') as dst:
+            if not (IS_LINUX and (self.clone(src, dst) or self.copy_kernel(src, dst))):
+                self.copy_buffered(src, dst)
+        self.progress(0, 1)
+
+    def clone(self, src, dst):
+        """Share the source's blocks if the file system supports reflinks."""
+
+        if fcntl is None:
+            return False
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno in UNSUPPORTED:
+                return False
+            raise
+        self.progress(os.fstat(src.fileno()).st_size)
+        return True
+
+    def copy_kernel(self, src, dst):
+        """Copy within the kernel a chunk at a time, returning `False` if it isn't supported for these files."""
+
+        infd = src.fileno()
+        outfd = dst.fileno()
+        for copy in (
+            lambda count: os.copy_file_range(infd, outfd, count),
+            lambda count: os.sendfile(outfd, infd, None, count)
+        ):
+            copied = 0
+            try:
+                while True:
+                    count = copy(KERNEL_CHUNK_SIZE)
+                    if not count:
+                        return True
+                    copied += count
+                    self.progress(count)
+            except (OSError, AttributeError) as e:
+                # A method that fails before copying anything isn't supported; try the next one.
+                if copied or (isinstance(e, OSError) and e.errno not in UNSUPPORTED):
+                    raise
+        return False
+
+    def copy_buffered(self, src, dst):
+        """Copy through a reused buffer a chunk at a time."""
+
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        while True:
+            count = src.readinto(buffer)
+            if not count:
+                break
+            dst.write(view[:count])
+            self.progress(count)
@@ -0,0 +1,116 @@
+"""
+Parallel directory tree walk.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import os
+import os.path as path
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .jobs import Job
+
+
+class WalkJob(Job):
+    """
+    List every file under a folder, reading directories concurrently.
+
+    Directories are read by a pool of `workers` threads, shallowest
+    first, down to `max_depth` levels below the root (0 only lists the
+    root's own files).  `accept(entry)` is applied to each `os.DirEntry`
+    as it is read, so rejected folders are never descended into.
+    Symlinked folders are not followed.  Relative file paths (joined
+    with `sep`) are collected in `files` and streamed to `on_chunk`; the
+    walk stops once `max_entries` files are found, setting `truncated`.
+    Sub-folders that can't be read are skipped, but `on_error` is called
+    if the root can't be read.  Callbacks receive the job first.
+    """
+
+    def __init__(
+        self, root, on_chunk, on_done, on_error, accept=None,
+        max_depth=5, max_entries=50000, workers=8, sep=os.sep
+    ):
+        """Initialize."""
+
+        super().__init__()
+        self.root = root
+        self.on_chunk = on_chunk
+        self.on_done = on_done
+        self.on_error = on_error
+        self.accept = accept
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.workers = max(1, workers)
+        self.sep = sep
+        self.files = []
+        self.folders = 0
+        self.truncated = False
+
+    def read_dir(self, rel):
+        """Read one folder, returning its accepted file and sub-folder names."""
+
+        files = []
+        dirs = []
+        with os.scandir(path.join(self.root, rel) if rel else self.root) as it:
+            for entry in it:
+                if self.cancelled:
+                    break
+                if self.accept is not None and not self.accept(entry):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                (dirs if is_dir else files).append(entry.name)
+        return files, dirs
+
+    def work(self):
+        """Walk the tree."""
+
+        pending = deque([('', 0)])
+        running = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while (pending or running) and not self.cancelled:
+                # Keep the pool busy without queueing the whole tree up front.
+                while pending and len(running) < self.workers * 2:
+                    rel, depth = pending.popleft()
+                    running[pool.submit(self.read_dir, rel)] = (rel, depth)
+
+                done = wait(running, return_when=FIRST_COMPLETED)[0]
+                chunk = []
+                for future in done:
+                    rel, depth = running.pop(future)
+                    try:
+                        files, dirs = future.result()
+                    except OSError as e:
+                        if not rel:
+                            self.finished = time.perf_counter()
+                            if not self.cancelled:
+                                self.on_error(self, e)
+                            return
+                        continue
+                    self.folders += 1
+                    prefix = rel + self.sep if rel else ''
+                    chunk.extend(prefix + name for name in files)
+                    if depth < self.max_depth:
+                        pending.extend((prefix + name, depth + 1) for name in dirs)
+
+                room = self.max_entries - len(self.files)
+                if len(chunk) >= room and (pending or running or len(chunk) > room):
+                    del chunk[room:]
+                    self.truncated = True
+                if self.cancelled:
+                    return
+                if chunk:
+                    self.files.extend(chunk)
+                    self.on_chunk(self, chunk)
+                if self.truncated:
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if self.cancelled:
+            return
+        self.finished = time.perf_counter()
+        self.on_done(self)
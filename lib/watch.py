@@ -0,0 +1,311 @@
+"""
+Folder watchers.
+
+Licensed under MIT
+Copyright (c) 2012 - 2015 Isaac Muse <isaacmuse@gmail.com>
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+from collections import namedtuple
+from .cache import signature
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT = struct.Struct('iIII')
+
+
+class Change(namedtuple('Change', ['folder', 'name', 'added'])):
+    """
+    A change in a watched folder.
+
+    `name` is the entry that was added or removed.  When `name` is `None`
+    the watcher can't say what changed (the folder itself went away, or
+    events were lost), and the folder's listing must be read again.
+    """
+
+    __slots__ = ()
+
+
+class Watcher(object):
+    """Base watcher."""
+
+    def __init__(self, callback):
+        """
+        Initialize.
+
+        `callback` is called from the watcher's thread with a list of
+        `Change` records.
+        """
+
+        self.callback = callback
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def watch(self, folder):
+        """Watch a folder, returning whether it is watched."""
+
+        raise NotImplementedError
+
+    def unwatch(self, folder):
+        """Stop watching a folder."""
+
+        raise NotImplementedError
+
+    def watched(self):
+        """Get the watched folders."""
+
+        raise NotImplementedError
+
+    def clear(self):
+        """Stop watching all folders."""
+
+        for folder in self.watched():
+            self.unwatch(folder)
+
+    def close(self):
+        """Release all watches and stop the watcher."""
+
+        raise NotImplementedError
+
+
+class InotifyWatcher(Watcher):
+    """
+    Linux `inotify` watcher.
+
+    A single `inotify` instance is shared by all watches and read from one
+    thread.  Closing the watcher closes the descriptor, which releases
+    every watch with it.
+    """
+
+    def __init__(self, callback):
+        """Create the `inotify` instance and start reading events."""
+
+        super().__init__(callback)
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.wake_read, self.wake_write = os.pipe()
+        self.folders = {}
+        self.descriptors = {}
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def watch(self, folder):
+        """Watch a folder."""
+
+        with self.lock:
+            if self.closed:
+                return False
+            if folder in self.folders:
+                return True
+        # Adding a watch on a stale network mount can block; don't hold up the event reader meanwhile.
+        wd = self._add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            # Most likely the user's watch limit (`ENOSPC`) or a folder we can't read.
+            return False
+        with self.lock:
+            if self.closed:
+                return False
+            self.folders[folder] = wd
+            self.descriptors[wd] = folder
+            return True
+
+    def unwatch(self, folder):
+        """Stop watching a folder."""
+
+        with self.lock:
+            wd = self.folders.pop(folder, None)
+            if wd is not None:
+                self.descriptors.pop(wd, None)
+                if not self.closed:
+                    self._rm_watch(self.fd, wd)
+
+    def watched(self):
+        """Get the watched folders."""
+
+        with self.lock:
+            return list(self.folders)
+
+    def close(self):
+        """Close the `inotify` instance."""
+
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.folders.clear()
+            self.descriptors.clear()
+        try:
+            os.write(self.wake_write, b'x')
+        except OSError:
+            pass
+        self.thread.join(1)
+
+    def read_events(self):
+        """Read and decode pending events."""
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+        changes = []
+        offset = 0
+        with self.lock:
+            while offset + EVENT.size <= len(data):
+                wd, mask, cookie, size = EVENT.unpack_from(data, offset)
+                offset += EVENT.size
+                name = os.fsdecode(data[offset:offset + size].rstrip(b'\0'))
+                offset += size
+
+                if mask & IN_Q_OVERFLOW:
+                    changes.extend(Change(f, None, False) for f in self.folders)
+                    continue
+                folder = self.descriptors.get(wd)
+                if folder is None:
+                    continue
+                if mask & IN_IGNORED or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    # The watch is gone with the folder.
+                    if mask & IN_IGNORED:
+                        self.descriptors.pop(wd, None)
+                        self.folders.pop(folder, None)
+                    changes.append(Change(folder, None, False))
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    changes.append(Change(folder, name, True))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changes.append(Change(folder, name, False))
+        return changes
+
+    def work(self):
+        """Read events until closed."""
+
+        try:
+            while True:
+                ready = select.select([self.fd, self.wake_read], [], [])[0]
+                if self.wake_read in ready or self.closed:
+                    break
+                changes = self.read_events()
+                if changes:
+                    self.callback(changes)
+        finally:
+            os.close(self.fd)
+            os.close(self.wake_read)
+            os.close(self.wake_write)
+
+
+class PollingWatcher(Watcher):
+    """
+    Portable watcher that polls the watched folders' signatures.
+
+    Polling can't tell what changed, only that something did, so every
+    change requires the folder to be read again.
+    """
+
+    def __init__(self, callback, interval=1.0):
+        """Start polling."""
+
+        super().__init__(callback)
+        self.interval = interval
+        self.folders = {}
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def watch(self, folder):
+        """Watch a folder."""
+
+        try:
+            sig = signature(folder)
+        except OSError:
+            return False
+        with self.lock:
+            if self.closed:
+                return False
+            self.folders.setdefault(folder, sig)
+            return True
+
+    def unwatch(self, folder):
+        """Stop watching a folder."""
+
+        with self.lock:
+            self.folders.pop(folder, None)
+
+    def watched(self):
+        """Get the watched folders."""
+
+        with self.lock:
+            return list(self.folders)
+
+    def close(self):
+        """Stop polling."""
+
+        with self.lock:
+            self.closed = True
+            self.folders.clear()
+        self.wake.set()
+        self.thread.join(1)
+
+    def work(self):
+        """Poll until closed."""
+
+        while not self.wake.wait(self.interval):
+            with self.lock:
+                folders = list(self.folders.items())
+            changes = []
+            for folder, sig in folders:
+                try:
+                    current = signature(folder)
+                except OSError:
+                    current = None
+                if current != sig:
+                    with self.lock:
+                        if folder not in self.folders:
+                            continue
+                        if current is None:
+                            del self.folders[folder]
+                        else:
+                            self.folders[folder] = current
+                    changes.append(Change(folder, None, False))
+            if changes and not self.closed:
+                self.callback(changes)
+
+
+def create_watcher(callback, backend="auto", interval=1.0):
+    """
+    Create a watcher.
+
+    `backend` is `inotify`, `poll`, or `auto`, which uses `inotify` when
+    it is available and falls back to polling otherwise.
+    """
+
+    if backend in ("auto", "inotify") and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(callback)
+        except (OSError, AttributeError):
+            if backend == "inotify":
+                raise
+    return PollingWatcher(callback, interval)
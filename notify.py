@@ -18,11 +18,21 @@ except Exception:
             return False
 
 
+# Set from the settings snapshot, so messages shown on key presses don't load the settings.
+USE_SUB_NOTIFY = False
+
+
+def set_sub_notify(enabled):
+    """Set whether messages go through SubNotify when it is available."""
+
+    global USE_SUB_NOTIFY
+    USE_SUB_NOTIFY = enabled
+
+
 def notify(msg):
     """Notify message."""
 
-    settings = sublime.load_settings("fuzzy_file_nav.sublime-settings")
-    if settings.get("use_sub_notify", False) and Notify.is_ready():
+    if USE_SUB_NOTIFY and Notify.is_ready():
         sublime.run_command("sub_notify", {"title": "FuzzyFileNav", "msg": msg})
     else:
         sublime.status_message(msg)
@@ -31,8 +41,7 @@ def notify(msg):
 def error(msg):
     """Error message."""
 
-    settings = sublime.load_settings("fuzzy_file_nav.sublime-settings")
-    if settings.get("use_sub_notify", False) and Notify.is_ready():
+    if USE_SUB_NOTIFY and Notify.is_ready():
         sublime.run_command("sub_notify", {"title": "FuzzyFileNav", "msg": msg, "level": "error"})
     else:
         sublime.error_message("FuzzyFileNav:\n%s" % msg)
@@ -0,0 +1,159 @@
+"""Test listing cache."""
+import unittest
+import os
+import shutil
+import tempfile
+from lib import cache, listing
+
+
+class TestListingCache(unittest.TestCase):
+    """Test the listing cache."""
+
+    def test_hit_and_miss(self):
+        """Test that a listing is only served while its signature matches."""
+
+        c = cache.ListingCache(10)
+        self.assertIsNone(c.get('a', 1))
+        c.put('a', 1, ['x', 'y'])
+        self.assertEqual(c.get('a', 1), ['x', 'y'])
+        self.assertIsNone(c.get('a', 2))
+        self.assertNotIn('a', c)
+        self.assertEqual(c.stats()['hits'], 1)
+        self.assertEqual(c.stats()['misses'], 2)
+
+    def test_patched_in_place(self):
+        """Test that a listing changed in place and put again doesn't throw off the entry count."""
+
+        c = cache.ListingCache(10)
+        listing = ['x']
+        c.put('a', 1, listing)
+        for name in 'yz':
+            listing.append(name)
+            c.put('a', 1, listing)
+        self.assertEqual(c.stats()['entries'], 3)
+        listing.append('w')
+        c.invalidate('a')
+        self.assertEqual(c.stats()['entries'], 0)
+
+    def test_eviction(self):
+        """Test that the least recently used listings are evicted by entry count."""
+
+        c = cache.ListingCache(5)
+        c.put('a', 1, [1, 2])
+        c.put('b', 1, [1, 2])
+        c.get('a', 1)
+        c.put('c', 1, [1, 2])
+        self.assertIn('a', c)
+        self.assertNotIn('b', c)
+        self.assertIn('c', c)
+        self.assertEqual(c.stats()['evictions'], 1)
+        self.assertEqual(c.stats()['entries'], 4)
+
+        # Too big to ever fit.
+        c.put('d', 1, list(range(6)))
+        self.assertNotIn('d', c)
+
+        c.resize(2)
+        self.assertEqual(len(c), 1)
+        self.assertEqual(c.stats()['entries'], 2)
+
+    def test_signature(self):
+        """Test that the signature changes when the folder changes."""
+
+        tempdir = tempfile.mkdtemp()
+        try:
+            before = cache.signature(tempdir)
+            self.assertEqual(before, cache.signature(tempdir))
+            os.utime(tempdir, ns=(0, 0))
+            self.assertNotEqual(before, cache.signature(tempdir))
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_peek_and_take(self):
+        """Test that peek doesn't count and take removes the listing."""
+
+        c = cache.ListingCache(10)
+        c.put('a', 1, ['x'])
+        self.assertTrue(c.peek('a', 1))
+        self.assertFalse(c.peek('a', 2))
+        self.assertEqual(c.stats()['hits'] + c.stats()['misses'], 0)
+        self.assertEqual(c.take('a', 1), ['x'])
+        self.assertNotIn('a', c)
+
+
+class TestListingStore(unittest.TestCase):
+    """Test the persistent listing store."""
+
+    def setUp(self):
+        """Create the store folder."""
+
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the store folder."""
+
+        shutil.rmtree(self.tempdir)
+
+    def make_listing(self, names):
+        """Create a listing of files and `/` suffixed folders."""
+
+        return listing.Listing(
+            [listing.Entry(n.rstrip('/'), n.endswith('/'), n.startswith('.'), False) for n in names], '/'
+        )
+
+    def test_round_trip(self):
+        """Test that a stored listing loads with the same names, flags, and signature."""
+
+        store = cache.ListingStore(self.tempdir, 1024 * 1024)
+        result = self.make_listing(['b', 'a/', '.c', 'caf\xe9', 'bad\udcff'])
+        store.save('/x', (1, 2, 3), result)
+        sig, loaded = store.load('/x')
+        self.assertEqual(sig, (1, 2, 3))
+        self.assertEqual(loaded.names, list(result.names))
+        self.assertEqual(list(loaded.entries), list(result.entries))
+        self.assertEqual(loaded.folders, 1)
+        self.assertEqual(loaded.find('b'), result.find('b'))
+        self.assertIsNone(store.load('/y'))
+
+    def test_disabled(self):
+        """Test that a store without space doesn't store anything."""
+
+        store = cache.ListingStore(self.tempdir, 0)
+        self.assertFalse(store)
+        store.save('/x', (1,), self.make_listing(['a']))
+        self.assertEqual(os.listdir(self.tempdir), [])
+        self.assertIsNone(store.load('/x'))
+
+    def test_corrupt(self):
+        """Test that truncated or foreign files are ignored and deleted."""
+
+        store = cache.ListingStore(self.tempdir, 1024 * 1024)
+        store.save('/x', (1,), self.make_listing(['a', 'b']))
+        filename = store.filename('/x')
+        with open(filename, 'rb') as f:
+            data = f.read()
+        with open(filename, 'wb') as f:
+            f.write(data[:-1])
+        self.assertIsNone(store.load('/x'))
+        self.assertFalse(os.path.exists(filename))
+
+        # A file named for one folder that holds another.
+        store.save('/y', (1,), self.make_listing(['a']))
+        os.replace(store.filename('/y'), filename)
+        self.assertIsNone(store.load('/x'))
+
+    def test_trim_and_purge(self):
+        """Test that the least recently used listings are deleted to fit, and that purge deletes them all."""
+
+        result = self.make_listing(['a' * 100])
+        size = len(cache.ListingStore.encode('/a', (1,), result))
+        store = cache.ListingStore(self.tempdir, size * 2)
+        store.save('/a', (1,), result)
+        store.save('/b', (1,), result)
+        os.utime(store.filename('/a'), ns=(0, 0))
+        store.save('/c', (1,), result)
+        self.assertIsNone(store.load('/a'))
+        self.assertIsNotNone(store.load('/b'))
+        self.assertIsNotNone(store.load('/c'))
+        self.assertEqual(store.purge(), 2)
+        self.assertEqual(os.listdir(self.tempdir), [])
@@ -0,0 +1,101 @@
+"""Test path completion index."""
+import unittest
+import random
+from lib import complete, listing
+
+
+def reference(files, is_dir, text, nix_path_complete, case_insensitive):
+    """Completion as done by scanning every entry."""
+
+    result = []
+    current = text.lower() if case_insensitive else text
+    for index, item in enumerate(files):
+        if item == '..':
+            continue
+        i = item.lower() if case_insensitive else item
+        if i.startswith(current):
+            if is_dir(index):
+                item = item[0:len(item) - 1]
+            result.append(item)
+
+    if nix_path_complete and result:
+        common = current
+        while True:
+            match = True
+            cmn_len = len(current)
+            if len(result[0]) > cmn_len:
+                common += result[0][cmn_len].lower() if case_insensitive else result[0][cmn_len]
+                cmn_len += 1
+            else:
+                break
+            for item in result:
+                value = item.lower() if case_insensitive else item
+                if not value.startswith(common):
+                    match = False
+                    break
+            if not match:
+                break
+            else:
+                current = common
+        result = [result[0][0:len(current)]]
+    return result
+
+
+class TestCompletionIndex(unittest.TestCase):
+    """Test the completion index against a full scan."""
+
+    def setUp(self):
+        """Create a listing."""
+
+        rand = random.Random(1)
+        entries = []
+        names = set()
+        while len(names) < 500:
+            name = ''.join(rand.choice('abAB._-1') for _ in range(rand.randint(1, 6)))
+            if name in names or name in ('.', '..'):
+                continue
+            names.add(name)
+            entries.append(listing.Entry(name, rand.random() < 0.3, False, False))
+        self.listing = listing.Listing(entries, '/')
+        self.texts = ['', 'a', 'A', 'ab', 'aB', 'b.', '_', '1', 'zz', 'abab', 'A-']
+
+    def complete(self, text, nix_path_complete, case_insensitive):
+        """Complete with the index."""
+
+        index = complete.CompletionIndex(self.listing, case_insensitive)
+        start, end = index.find(text)
+        if nix_path_complete and start != end:
+            return [index.common_prefix(start, end)]
+        return index.completions(start, end)
+
+    def test_windows(self):
+        """Test cycling completions are the same, in the same order."""
+
+        for text in self.texts:
+            self.assertEqual(
+                self.complete(text, False, True),
+                reference(self.listing.names, self.listing.is_dir, text, False, True),
+                text
+            )
+
+    def test_nix(self):
+        """Test common prefix completion, case sensitive and insensitive."""
+
+        for case_insensitive in (False, True):
+            for text in self.texts:
+                self.assertEqual(
+                    self.complete(text, True, case_insensitive),
+                    reference(self.listing.names, self.listing.is_dir, text, True, case_insensitive),
+                    text
+                )
+
+    def test_max_char(self):
+        """Test text ending with the highest code point."""
+
+        entries = [
+            listing.Entry('a\U0010ffff', False, False, False),
+            listing.Entry('a\U0010ffffb', False, False, False)
+        ]
+        index = complete.CompletionIndex(listing.Listing(entries, '/'), False)
+        start, end = index.find('a\U0010ffff')
+        self.assertEqual(index.completions(start, end), ['a\U0010ffff', 'a\U0010ffffb'])
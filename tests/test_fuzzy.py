@@ -0,0 +1,100 @@
+"""Test the fuzzy matcher."""
+import unittest
+from lib import fuzzy
+
+PATHS = [
+    'src/app/main.py',
+    'src/lib/main_test.py',
+    'docs/index.md',
+    'maintenance/a.txt',
+    'README.md',
+    'lib/MainWindow.py',
+    'lib/domain.py'
+]
+
+
+class TestScore(unittest.TestCase):
+    """Test scoring."""
+
+    def score(self, query, text):
+        """Score a text."""
+
+        return fuzzy.score(query, text, text.lower())
+
+    def test_subsequence(self):
+        """Test that only subsequences match."""
+
+        self.assertIsNotNone(self.score('mpy', 'src/app/main.py'))
+        self.assertIsNone(self.score('ypm', 'src/app/main.py'))
+        self.assertIsNone(self.score('z', 'src/app/main.py'))
+
+    def test_mask(self):
+        """Test that the mask never rejects a match."""
+
+        for text in PATHS:
+            lowered = text.lower()
+            mask = fuzzy.char_mask(lowered)
+            for size in range(1, len(lowered) + 1):
+                query = lowered[::size]
+                qmask = fuzzy.char_mask(query)
+                self.assertEqual(mask & qmask, qmask)
+
+    def test_bonuses(self):
+        """Test that boundaries and consecutive matches score higher than gaps."""
+
+        self.assertGreater(self.score('main', 'src/main.py'), self.score('main', 'src/domain.py'))
+        self.assertGreater(self.score('mw', 'MainWindow'), self.score('mw', 'mainwindow'))
+        self.assertGreater(self.score('ab', 'ab'), self.score('ab', 'axxb'))
+        # The tightest window is scored, not the first occurrence.
+        self.assertEqual(self.score('ab', 'a_xxxxab'), self.score('ab', 'ab') - fuzzy.BONUS_SEPARATOR * 2)
+
+
+class TestMatcher(unittest.TestCase):
+    """Test the matcher."""
+
+    def test_search(self):
+        """Test that results are ranked and limited."""
+
+        matcher = fuzzy.Matcher(PATHS)
+        results = [PATHS[i] for _, i in matcher.search('main')]
+        self.assertEqual(results[0], 'src/app/main.py')
+        self.assertEqual(results[-1], 'lib/domain.py')
+        self.assertEqual(len(matcher.search('main', limit=2)), 2)
+        self.assertEqual(matcher.search('qqq'), [])
+        self.assertEqual(matcher.search(''), [(0, i) for i in range(len(PATHS))])
+
+    def test_length_change(self):
+        """Test that names whose lower case form is longer are searched."""
+
+        names = ['\u0130stanbul', 'x\u0130l', 'lib']
+        self.assertNotEqual(len(names[0].lower()), len(names[0]))
+        matcher = fuzzy.Matcher(names)
+        self.assertEqual(sorted(i for _, i in matcher.search('l')), [0, 1, 2])
+        self.assertEqual([i for _, i in matcher.search('stan')], [0])
+
+    def test_incremental(self):
+        """Test that an extended query only scores the previous matches."""
+
+        matcher = fuzzy.Matcher(PATHS)
+        matcher.search('ma')
+        matched = list(matcher.last[1])
+        full = matcher.search('main')
+        self.assertTrue(set(matcher.last[1]) <= set(matched))
+        matcher.last = None
+        self.assertEqual(matcher.search('main'), full)
+
+    def test_parallel(self):
+        """Test that searching shards in worker processes gives the same results."""
+
+        threshold = fuzzy.PARALLEL_THRESHOLD
+        fuzzy.PARALLEL_THRESHOLD = 2
+        try:
+            matcher = fuzzy.Matcher(PATHS, processes=2)
+        finally:
+            fuzzy.PARALLEL_THRESHOLD = threshold
+        try:
+            self.assertEqual(matcher.processes, 2)
+            self.assertEqual(matcher.search('main', 3), fuzzy.Matcher(PATHS).search('main', 3))
+            self.assertEqual(len(matcher.shards), 2)
+        finally:
+            matcher.close()
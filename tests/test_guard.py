@@ -0,0 +1,121 @@
+"""Test deadline guarded file system calls."""
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from lib import guard
+
+
+class BlockingCall(object):
+    """A file system call that blocks, like one on a stale network mount, until it is released."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self, target):
+        """Block until released."""
+
+        self.calls += 1
+        self.release.wait(5)
+        return target
+
+
+class TestGuard(unittest.TestCase):
+    """Test the file system guard."""
+
+    def setUp(self):
+        """Create a folder to check."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.blocking = BlockingCall()
+
+    def tearDown(self):
+        """Release blocked calls and remove the folder."""
+
+        self.blocking.release.set()
+        shutil.rmtree(self.tempdir)
+
+    def test_checks(self):
+        """Test that calls that return in time behave like the `os` functions."""
+
+        g = guard.Guard(timeout=1)
+        missing = os.path.join(self.tempdir, 'missing')
+        self.assertTrue(g.exists(self.tempdir))
+        self.assertTrue(g.isdir(self.tempdir))
+        self.assertFalse(g.exists(missing))
+        self.assertFalse(g.isdir(missing))
+        with self.assertRaises(FileNotFoundError):
+            g.stat(missing)
+        self.assertFalse(g.unreachable(missing))
+
+    def test_timeout(self):
+        """Test that a blocked call is reported as unreachable in time and remembered."""
+
+        g = guard.Guard(timeout=0.1, ttl=30)
+        target = os.path.join('/mnt', 'stale')
+        start = time.monotonic()
+        with self.assertRaises(guard.Unreachable):
+            g.call(target, self.blocking, target)
+        self.assertLess(time.monotonic() - start, 2)
+
+        # The path and everything under it fail right away without another call.
+        self.assertTrue(g.unreachable(target))
+        self.assertTrue(g.unreachable(os.path.join(target, 'sub', 'file')))
+        self.assertFalse(g.unreachable(os.path.join('/mnt', 'other')))
+        self.assertFalse(g.isdir(os.path.join(target, 'sub')))
+        with self.assertRaises(guard.Unreachable):
+            g.call(target, self.blocking, target)
+        self.assertEqual(self.blocking.calls, 1)
+
+        # Other calls still go through while the stuck one is blocked.
+        self.assertTrue(g.isdir(self.tempdir))
+
+        # Once the time to live is over, the path is tried again.
+        g.ttl = 0
+        time.sleep(0.01)
+        self.assertFalse(g.unreachable(target))
+        self.blocking.release.set()
+        self.assertEqual(g.call(target, self.blocking, target), target)
+
+    def test_create(self):
+        """Test that creating a path in an unreachable folder fails right away."""
+
+        g = guard.Guard(timeout=1)
+        folder = os.path.join(self.tempdir, 'a', 'b')
+        g.makedirs(folder)
+        g.touch(os.path.join(folder, 'file'))
+        self.assertEqual(os.listdir(folder), ['file'])
+        g.remove(os.path.join(folder, 'file'))
+        self.assertEqual(os.listdir(folder), [])
+
+        g.timed_out[folder] = time.monotonic()
+        with self.assertRaises(guard.Unreachable):
+            g.touch(os.path.join(folder, 'new'))
+        with self.assertRaises(guard.Unreachable):
+            g.makedirs(os.path.join(folder, 'new'))
+        self.assertEqual(os.listdir(folder), [])
+
+    def test_errors(self):
+        """Test that errors raised by the call are passed on."""
+
+        g = guard.Guard(timeout=1)
+
+        def fail(target):
+            raise PermissionError(target)
+
+        with self.assertRaises(PermissionError):
+            g.call(self.tempdir, fail, self.tempdir)
+        self.assertFalse(g.unreachable(self.tempdir))
+
+    def test_disabled(self):
+        """Test that a timeout of 0 calls directly."""
+
+        g = guard.Guard(timeout=0)
+        self.blocking.release.set()
+        self.assertEqual(g.call('/x', self.blocking, '/x'), '/x')
+        self.assertEqual(g.idle, 0)
@@ -0,0 +1,100 @@
+"""Test the recursive file index."""
+import unittest
+import os
+import shutil
+import tempfile
+from lib import index
+
+
+class TestFileIndex(unittest.TestCase):
+    """Test the recursive file index."""
+
+    def setUp(self):
+        """Create a tree to index."""
+
+        self.tempdir = tempfile.mkdtemp()
+        for folder in ('src/app', 'src/lib', 'docs', '.git'):
+            os.makedirs(os.path.join(self.tempdir, folder))
+        for name in ('src/app/main.py', 'src/lib/util.py', 'src/lib/main_test.py', 'docs/index.md', '.git/HEAD'):
+            self.touch(name)
+
+    def tearDown(self):
+        """Remove the tree."""
+
+        shutil.rmtree(self.tempdir)
+
+    def touch(self, name):
+        """Create a file in the tree."""
+
+        with open(os.path.join(self.tempdir, name), 'w'):
+            pass
+
+    def build(self):
+        """Build an index that skips dot files."""
+
+        idx = index.FileIndex(self.tempdir, 'hidden')
+        idx.update(lambda e: not e.name.startswith('.'))
+        return idx
+
+    def test_paths(self):
+        """Test that every file is indexed and filtered entries are skipped."""
+
+        idx = self.build()
+        self.assertEqual(len(idx), 4)
+        self.assertEqual(
+            sorted(idx.paths()),
+            ['docs/index.md', 'src/app/main.py', 'src/lib/main_test.py', 'src/lib/util.py']
+        )
+
+    def test_incremental(self):
+        """Test that only changed directories are listed again."""
+
+        idx = self.build()
+        self.assertEqual(idx.update(lambda e: not e.name.startswith('.')), 0)
+
+        self.touch('src/lib/new.py')
+        os.utime(os.path.join(self.tempdir, 'src/lib'), ns=(0, 1))
+        self.assertEqual(idx.update(lambda e: not e.name.startswith('.')), 1)
+        self.assertIn('src/lib/new.py', list(idx.paths()))
+
+        shutil.rmtree(os.path.join(self.tempdir, 'src/app'))
+        idx.update(lambda e: not e.name.startswith('.'))
+        self.assertNotIn('src/app/main.py', list(idx.paths()))
+        self.assertEqual(len(idx), 4)
+
+    def test_cancel(self):
+        """Test that a cancelled update leaves the index unchanged."""
+
+        idx = index.FileIndex(self.tempdir)
+        self.assertIsNone(idx.update(cancelled=lambda: True))
+        self.assertEqual(len(idx), 0)
+
+    def test_search(self):
+        """Test that matches are ranked by where the query matched."""
+
+        idx = self.build()
+        self.assertEqual(idx.search('main'), ['src/app/main.py', 'src/lib/main_test.py'])
+        self.assertEqual(idx.search('LIBMAIN'), ['src/lib/main_test.py'])
+        self.assertEqual(idx.search('dix'), ['docs/index.md'])
+        self.assertEqual(idx.search('zzz'), [])
+        self.assertEqual(len(idx.search('s', limit=2)), 2)
+
+    def test_save_load(self):
+        """Test that an index survives a round trip through a file."""
+
+        idx = self.build()
+        fd, filename = tempfile.mkstemp(suffix='.idx')
+        os.close(fd)
+        self.addCleanup(os.remove, filename)
+        idx.save(filename)
+        loaded = index.FileIndex.load(filename)
+        self.assertEqual(loaded.root, self.tempdir)
+        self.assertEqual(loaded.key, 'hidden')
+        self.assertEqual(len(loaded), len(idx))
+        self.assertEqual(sorted(loaded.paths()), sorted(idx.paths()))
+        self.assertEqual(loaded.update(lambda e: not e.name.startswith('.')), 0)
+
+        with open(filename, 'r+b') as f:
+            f.truncate(os.path.getsize(filename) - 3)
+        with self.assertRaises(ValueError):
+            index.FileIndex.load(filename)
@@ -0,0 +1,142 @@
+"""Test background jobs."""
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from lib import jobs
+
+
+class TestScanJob(unittest.TestCase):
+    """Test background directory listing."""
+
+    def setUp(self):
+        """Create a directory to list."""
+
+        self.tempdir = tempfile.mkdtemp()
+        for i in range(25):
+            with open(os.path.join(self.tempdir, str(i)), 'w'):
+                pass
+        self.chunks = []
+        self.done = []
+        self.errors = []
+
+    def tearDown(self):
+        """Remove the directory."""
+
+        shutil.rmtree(self.tempdir)
+
+    def job(self, cwd, chunk_size=10):
+        """Create a job that records its callbacks."""
+
+        return jobs.ScanJob(
+            cwd,
+            lambda job, chunk: self.chunks.append(len(chunk)),
+            lambda job: self.done.append(len(job.entries)),
+            lambda job, e: self.errors.append(e),
+            chunk_size
+        )
+
+    def test_chunks(self):
+        """Test that entries are streamed in chunks."""
+
+        job = self.job(self.tempdir).start()
+        job.thread.join(5)
+        self.assertFalse(job.is_alive())
+        self.assertEqual(self.chunks, [10, 10, 5])
+        self.assertEqual(self.done, [25])
+        self.assertEqual(self.errors, [])
+
+    def test_elapsed(self):
+        """Test that the listing time is fixed once the job finishes."""
+
+        job = self.job(self.tempdir)
+        self.assertEqual(job.elapsed, 0.0)
+        job.start().thread.join(5)
+        self.assertIsNotNone(job.finished)
+        elapsed = job.elapsed
+        self.assertGreater(elapsed, 0.0)
+        self.assertEqual(job.elapsed, elapsed)
+
+    def test_cancel(self):
+        """Test that a cancelled job stops reporting."""
+
+        job = self.job(self.tempdir)
+        job.on_chunk = lambda job, chunk: job.cancel()
+        job.work()
+        self.assertEqual(len(job.entries), 10)
+        self.assertEqual(self.done, [])
+
+    def test_build(self):
+        """Test that results are built on the job's thread, partial ones at most every interval."""
+
+        built = []
+        threads = set()
+
+        def build(entries):
+            threads.add(threading.current_thread())
+            built.append(len(entries))
+            return sorted(e.name for e in entries)
+
+        job = self.job(self.tempdir)
+        job.build = build
+        job.interval = 60
+        job.start().thread.join(5)
+        self.assertEqual(threads, {job.thread})
+        self.assertEqual(built, [10, 25])
+        self.assertEqual(self.chunks, [10])
+        self.assertEqual(self.done, [25])
+        self.assertEqual(len(job.result), 25)
+
+        built.clear()
+        job = self.job(self.tempdir)
+        job.build = build
+        job.interval = 0
+        job.work()
+        self.assertEqual(built, [10, 20, 25])
+
+    def test_error(self):
+        """Test that errors are reported."""
+
+        self.job(os.path.join(self.tempdir, 'missing')).work()
+        self.assertEqual(len(self.errors), 1)
+        self.assertEqual(self.done, [])
+
+
+class TestWorkQueue(unittest.TestCase):
+    """Test the work queue."""
+
+    def test_order(self):
+        """Test that tasks run in order on the worker."""
+
+        q = jobs.WorkQueue(low_priority=True)
+        results = []
+        done = threading.Event()
+        for i in range(5):
+            q.submit(results.append, i)
+        q.submit(done.set)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, list(range(5)))
+
+    def test_clear(self):
+        """Test that cleared tasks don't run."""
+
+        q = jobs.WorkQueue()
+        results = []
+        started = threading.Event()
+        release = threading.Event()
+        done = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        q.submit(block)
+        self.assertTrue(started.wait(5))
+        q.submit(results.append, 'dropped')
+        q.clear()
+        q.submit(results.append, 'kept')
+        q.submit(done.set)
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, ['kept'])
@@ -0,0 +1,244 @@
+"""Test directory listing."""
+import unittest
+import os
+import re
+import shutil
+import tempfile
+from lib import listing
+
+
+class TestListing(unittest.TestCase):
+    """Test the directory listing engine."""
+
+    def setUp(self):
+        """Create a directory to list."""
+
+        self.tempdir = tempfile.mkdtemp()
+        for name in ('b_dir', 'a-dir', 'a', '.hidden_dir'):
+            os.mkdir(os.path.join(self.tempdir, name))
+        for name in ('file.txt', 'File.txt', '.hidden'):
+            with open(os.path.join(self.tempdir, name), 'w'):
+                pass
+
+    def tearDown(self):
+        """Remove the directory."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_scan(self):
+        """Test that the scan records type and hidden state."""
+
+        entries = {e.name: e for e in listing.scan(self.tempdir)}
+        self.assertEqual(len(entries), 7)
+        self.assertTrue(entries['b_dir'].is_dir)
+        self.assertFalse(entries['file.txt'].is_dir)
+        if not listing.IS_WINDOWS:
+            self.assertTrue(entries['.hidden'].is_hidden)
+            self.assertTrue(entries['.hidden_dir'].is_hidden)
+        self.assertFalse(entries['file.txt'].is_hidden)
+
+    def test_symlink(self):
+        """Test that symlinks to folders are listed as folders."""
+
+        try:
+            os.symlink(os.path.join(self.tempdir, 'b_dir'), os.path.join(self.tempdir, 'link'))
+        except (OSError, NotImplementedError):
+            self.skipTest('Symlinks are not supported')
+        entries = {e.name: e for e in listing.scan(self.tempdir)}
+        self.assertTrue(entries['link'].is_dir)
+        self.assertTrue(entries['link'].is_link)
+        self.assertFalse(entries['b_dir'].is_link)
+
+    def test_order(self):
+        """Test that folders are listed first and sorted by display name."""
+
+        result = listing.Listing(listing.scan(self.tempdir), '/')
+        self.assertEqual(
+            result.names,
+            ['..', '.hidden_dir/', 'a-dir/', 'a/', 'b_dir/', '.hidden', 'File.txt', 'file.txt']
+        )
+        self.assertEqual([e.name for e in result.entries[1:]], [n.rstrip('/') for n in result.names[1:]])
+        self.assertTrue(result.is_dir(0))
+        self.assertTrue(result.is_dir(1))
+        self.assertFalse(result.is_dir(len(result) - 1))
+
+
+class TestExcludes(unittest.TestCase):
+    """Test compiled exclusion patterns."""
+
+    def test_match(self):
+        """Test that joined patterns match like `re.match` on each pattern."""
+
+        patterns = [r'.*\.(DS_Store|svn|git)$', r'build\d+', r'(?i)temp', r'(a)\1', r'(?P<x>z)(?P=x)']
+        excludes = listing.Excludes(patterns)
+        self.assertEqual(excludes.errors, [])
+        names = ['.git', 'x.svn', 'build12', 'rebuild1', 'TEMP', 'Temp2', 'aa', 'ab', 'zz', 'z', 'file.txt']
+        for name in names:
+            self.assertEqual(
+                excludes.match(name),
+                any(re.match(p, name) for p in patterns),
+                name
+            )
+
+    def test_invalid(self):
+        """Test that invalid patterns are reported and skipped."""
+
+        excludes = listing.Excludes([r'(unclosed', r'\.git$'])
+        self.assertEqual(len(excludes.errors), 1)
+        self.assertEqual(excludes.errors[0][0], r'(unclosed')
+        self.assertTrue(excludes.match('.git'))
+        self.assertFalse(excludes.match('(unclosed'))
+
+    def test_empty(self):
+        """Test that no patterns match nothing."""
+
+        excludes = listing.Excludes()
+        self.assertFalse(excludes)
+        self.assertFalse(excludes.match('anything'))
+
+    def test_duplicate_group_names(self):
+        """Test that patterns that can't be joined still match."""
+
+        excludes = listing.Excludes([r'(?P<n>a)b', r'(?P<n>c)d'])
+        self.assertTrue(excludes.match('ab'))
+        self.assertTrue(excludes.match('cd'))
+        self.assertFalse(excludes.match('ad'))
+
+
+class TestListingPatch(unittest.TestCase):
+    """Test inserting and removing entries in a listing."""
+
+    def test_insert_remove(self):
+        """Test that patched listings keep their order."""
+
+        entries = [
+            listing.Entry('b', True, False, False),
+            listing.Entry('d', True, False, False),
+            listing.Entry('b.txt', False, False, False),
+            listing.Entry('d.txt', False, False, False)
+        ]
+        result = listing.Listing(entries, '/')
+        self.assertEqual(result.insert(listing.Entry('c', True, False, False)), 2)
+        self.assertEqual(result.insert(listing.Entry('a.txt', False, False, False)), 4)
+        self.assertEqual(result.insert(listing.Entry('e.txt', False, False, False)), 7)
+        self.assertEqual(result.names, ['..', 'b/', 'c/', 'd/', 'a.txt', 'b.txt', 'd.txt', 'e.txt'])
+        self.assertEqual(result.find('c'), 2)
+        self.assertEqual(result.find('b.txt'), 5)
+        self.assertEqual(result.find('missing'), -1)
+
+        # Replacing a file with a folder of the same name.
+        self.assertEqual(result.insert(listing.Entry('b.txt', True, False, False)), 1)
+        self.assertEqual(result.remove('d'), 4)
+        self.assertEqual(result.remove('d'), -1)
+        self.assertEqual(result.names, ['..', 'b.txt/', 'b/', 'c/', 'a.txt', 'd.txt', 'e.txt'])
+        self.assertEqual(result.folders, 3)
+        self.assertEqual(result.names[1:], [result.display_name(e) for e in result.entries[1:]])
+        self.assertEqual(result.names, listing.Listing(result.entries[1:], '/').names)
+
+    def test_patch_large(self):
+        """Test that a run of new entries in a large listing matches reading it again."""
+
+        entries = [listing.Entry('entry_{:05d}'.format(i), i % 10 == 0, False, False) for i in range(0, 40000, 2)]
+        result = listing.Listing(entries, '/')
+        for i in range(30):
+            entry = listing.Entry('new_{:02d}.txt'.format(i), False, False, False)
+            entries.append(entry)
+            index = result.insert(entry)
+            self.assertEqual(result.names[index], entry.name)
+        self.assertEqual(result.version, 30)
+        self.assertEqual(result.names, listing.Listing(entries, '/').names)
+
+
+class TestPackedEntries(unittest.TestCase):
+    """Test the compact entry records."""
+
+    def test_round_trip(self):
+        """Test that records and odd names come back unchanged."""
+
+        entries = [
+            listing.Entry('plain', False, False, False),
+            listing.Entry('\u00e9t\u00e9', True, False, True),
+            listing.Entry('bad\udcff', False, True, False),
+            listing.Entry('\U0001f600', False, False, False)
+        ]
+        packed = listing.PackedEntries(entries)
+        self.assertEqual(list(packed), entries)
+        self.assertEqual(packed[-1], entries[-1])
+        part = packed[1:3]
+        self.assertIsInstance(part, listing.PackedEntries)
+        self.assertIs(part.buffer, packed.buffer)
+        self.assertEqual(list(part), entries[1:3])
+
+    def test_sort(self):
+        """Test that names sort the same packed as they do as strings."""
+
+        names = ['b', 'B', 'a-b', 'a', '\u00e9', 'z', '\U0001f600', '\uffff', '_', 'A']
+        result = listing.Listing([listing.Entry(n, n < 'b', False, False) for n in names], '/')
+        folders = sorted(n + '/' for n in names if n < 'b')
+        documents = sorted(n for n in names if n >= 'b')
+        self.assertEqual(result.names, ['..'] + folders + documents)
+
+    def test_compact(self):
+        """Test that removed names are dropped from the buffer once most of it is unused."""
+
+        entries = [listing.Entry('entry_{:05d}'.format(i), False, False, False) for i in range(1000)]
+        result = listing.Listing(entries, '/')
+        size = len(result.entries.buffer)
+        for entry in entries[:900]:
+            result.remove(entry.name)
+        self.assertLess(len(result.entries.buffer), size // 2)
+        self.assertEqual(result.names, ['..'] + [e.name for e in entries[900:]])
+
+
+class TestFolder(unittest.TestCase):
+    """Test the dual view folder records."""
+
+    def setUp(self):
+        """Create a folder's records."""
+
+        self.entries = [
+            listing.Entry('src', True, False, False),
+            listing.Entry('.git', True, True, False),
+            listing.Entry('main.py', False, False, False),
+            listing.Entry('main.pyc', False, False, False),
+            listing.Entry('.env', False, True, False)
+        ]
+        self.folder = listing.Folder(self.entries, listing.Excludes([r'.*\.pyc$']), '/')
+
+    def test_views(self):
+        """Test that both views share the same records."""
+
+        self.assertEqual(self.folder.view(False).names, ['..', '.git/', 'src/', '.env', 'main.py', 'main.pyc'])
+        visible = self.folder.view(True)
+        self.assertEqual(visible.names, ['..', 'src/', 'main.py'])
+        self.assertEqual(visible.folders, 1)
+        self.assertIs(self.folder.view(True), visible)
+        self.assertEqual(visible.entries[1], self.entries[0])
+        self.assertIs(visible.entries.buffer, self.folder.view(False).entries.buffer)
+        self.assertEqual(len(self.folder), 6)
+
+    def test_patch(self):
+        """Test that patches are applied to both views."""
+
+        visible = self.folder.view(True)
+        self.folder.insert(listing.Entry('lib', True, False, False))
+        self.folder.insert(listing.Entry('.cache', True, True, False))
+        self.folder.insert(listing.Entry('main.py', True, False, False))
+        self.assertEqual(self.folder.remove('.env'), 6)
+        self.assertEqual(self.folder.remove('missing'), -1)
+        self.assertEqual(visible.names, ['..', 'lib/', 'main.py/', 'src/'])
+        self.assertEqual(
+            self.folder.view(False).names,
+            ['..', '.cache/', '.git/', 'lib/', 'main.py/', 'src/', 'main.pyc']
+        )
+        self.assertEqual(visible.names, self.folder.view(False).subset(lambda e: not self.folder.is_hidden(e)).names)
+
+    def test_from_listing(self):
+        """Test that a folder made from a copied listing filters it without changing the original."""
+
+        result = self.folder.view(False).copy()
+        folder = listing.Folder.from_listing(result, self.folder.excludes)
+        self.assertEqual(folder.view(True).names, ['..', 'src/', 'main.py'])
+        folder.remove('src')
+        self.assertEqual(result.names, ['..', '.git/', '.env', 'main.py', 'main.pyc'])
+        self.assertEqual(self.folder.view(False).names, ['..', '.git/', 'src/', '.env', 'main.py', 'main.pyc'])
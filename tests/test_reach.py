@@ -0,0 +1,89 @@
+"""Test the reachability cache."""
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from lib import reach
+
+
+class TestReachability(unittest.TestCase):
+    """Test background folder checks."""
+
+    def setUp(self):
+        """Create a folder to check."""
+
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the folder."""
+
+        shutil.rmtree(self.tempdir)
+
+    def check(self, r, targets):
+        """Check folders and wait for the states."""
+
+        done = threading.Event()
+        states = {}
+
+        def on_done(result):
+            states.update(result)
+            done.set()
+
+        self.assertTrue(r.check(targets, on_done))
+        self.assertTrue(done.wait(5))
+        return states
+
+    def test_states(self):
+        """Test that folders are reported as reachable or missing and cached."""
+
+        r = reach.Reachability()
+        missing = os.path.join(self.tempdir, 'missing')
+        states = self.check(r, [self.tempdir, missing])
+        self.assertEqual(states, {self.tempdir: reach.REACHABLE, missing: reach.MISSING})
+        self.assertEqual(r.get(self.tempdir), reach.REACHABLE)
+        self.assertFalse(r.check([self.tempdir, missing]))
+
+        # Expired results are checked again.
+        r.ttl = -1
+        self.assertIsNone(r.get(self.tempdir))
+        self.assertTrue(r.check([self.tempdir]))
+
+    def test_no_cache(self):
+        """Test that without caching every check is run, and its results are still reported."""
+
+        r = reach.Reachability(ttl=0)
+        missing = os.path.join(self.tempdir, 'missing')
+        for _ in range(2):
+            states = self.check(r, [self.tempdir, missing])
+            self.assertEqual(states, {self.tempdir: reach.REACHABLE, missing: reach.MISSING})
+        self.assertIsNone(r.get(self.tempdir))
+
+    def test_timeout(self):
+        """Test that a folder that blocks is reported as timed out without holding up the others."""
+
+        release = threading.Event()
+        calls = []
+
+        def isdir(target):
+            calls.append(target)
+            if target == '/hung':
+                release.wait(5)
+            return True
+
+        r = reach.Reachability(timeout=0.1, isdir=isdir)
+        states = self.check(r, ['/hung', '/fine'])
+        self.assertEqual(states, {'/hung': reach.TIMED_OUT, '/fine': reach.REACHABLE})
+
+        # A folder that is still stuck isn't checked again.
+        r.invalidate('/hung')
+        self.check(r, ['/hung'])
+        self.assertEqual(calls.count('/hung'), 1)
+
+        # Once it answers, its real state replaces the time out.
+        release.set()
+        for _ in range(50):
+            if r.get('/hung') == reach.REACHABLE:
+                break
+            threading.Event().wait(0.05)
+        self.assertEqual(r.get('/hung'), reach.REACHABLE)
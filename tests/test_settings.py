@@ -0,0 +1,324 @@
+"""Test settings snapshot."""
+import unittest
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import types
+from unittest import mock
+from lib import settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def resolve(obj, key, default):
+    """Resolve a value without multiconf."""
+
+    return obj.get(key, default)
+
+
+class TestSettings(unittest.TestCase):
+    """Test the settings snapshot."""
+
+    def setUp(self):
+        """Set up a store with a loader that counts its calls."""
+
+        self.loads = 0
+        self.values = {
+            "home": "/home/user",
+            "regex_exclude": [r"\.git$"],
+            "keep_panel_open_after_action": True,
+            "keep_panel_open_exceptions": ["delete"],
+            "bookmarks": [
+                {"name": "Root", "path": "/"}, {"path": "/tmp", "index": True, "warm": False},
+                {"name": "Other host", "path": None}
+            ],
+            "prefetch_budget": "not a number"
+        }
+
+        def loader():
+            self.loads += 1
+            return self.values
+
+        self.store = settings.SettingsStore(loader, resolve)
+
+    def test_loads_per_keystroke(self):
+        """Test that reading settings on every keystroke doesn't load settings."""
+
+        self.store.get()
+        self.assertEqual(self.loads, 1)
+        for _ in range(100):
+            s = self.store.get()
+            s.completion_style
+            s.debug
+        self.assertEqual(self.loads, 1)
+
+    def test_loads_per_navigation(self):
+        """Test that navigating and running actions doesn't load settings."""
+
+        self.store.get()
+        for action in ("open", "delete", "mkfile", "mkdir", "paste", "saveas"):
+            s = self.store.get()
+            s.keep_panel_open(action)
+            s.home
+            s.show_system_hidden_files
+        self.assertEqual(self.loads, 1)
+
+        # Only a settings change loads the settings again.
+        self.values["home"] = "/other"
+        self.assertEqual(self.store.refresh().home, "/other")
+        self.assertEqual(self.store.get().home, "/other")
+        self.assertEqual(self.loads, 2)
+
+    def test_values(self):
+        """Test that values are resolved and coerced."""
+
+        s = self.store.get()
+        self.assertEqual(s.regex_exclude, (r"\.git$",))
+        self.assertTrue(s.keep_panel_open("open"))
+        self.assertFalse(s.keep_panel_open("delete"))
+        self.assertEqual(s.prefetch_budget, 20)
+        self.assertEqual(s.completion_style, "fuzzy")
+        self.assertEqual(
+            list(s.bookmarks),
+            [settings.Bookmark("Root", "/"), settings.Bookmark("/tmp", "/tmp", True, False)]
+        )
+        with self.assertRaises(AttributeError):
+            s.home = "/"
+
+    def test_defaults(self):
+        """Test that missing settings use the defaults in `FIELDS`."""
+
+        s = settings.Snapshot.create({}, resolve)
+        for name, default, kind in settings.FIELDS:
+            self.assertEqual(getattr(s, name), kind(default), name)
+
+
+class Region(object):
+    """Stand in for `sublime.Region`."""
+
+    def __init__(self, a, b=None):
+        """Initialize."""
+
+        self.a = a
+        self.b = a if b is None else b
+
+
+class Settings(object):
+    """Stand in for `sublime.Settings`."""
+
+    def __init__(self, values):
+        """Initialize."""
+
+        self.values = values
+        self.callbacks = {}
+
+    def get(self, key, default=None):
+        """Get a value."""
+
+        return self.values.get(key, default)
+
+    def add_on_change(self, tag, callback):
+        """Register a change callback."""
+
+        self.callbacks[tag] = callback
+
+    def clear_on_change(self, tag):
+        """Remove a change callback."""
+
+        self.callbacks.pop(tag, None)
+
+
+class View(object):
+    """A quick panel input view holding a line of text."""
+
+    def __init__(self, text):
+        """Initialize."""
+
+        self.text = text
+
+    def id(self):  # noqa: A003
+        """Get the view's ID."""
+
+        return 2
+
+    def change_count(self):
+        """Get the change count, which changes with the text."""
+
+        return hash(self.text)
+
+    def size(self):
+        """Get the size of the text."""
+
+        return len(self.text)
+
+    def sel(self):
+        """Get the selection, a cursor at the end."""
+
+        return [Region(len(self.text))]
+
+    def line(self, region):
+        """Get the line of a region."""
+
+        return Region(0, len(self.text))
+
+    def substr(self, region):
+        """Get the text of a region."""
+
+        return self.text[region.a:region.b]
+
+
+class Window(object):
+    """A window that records the panels shown and the commands run."""
+
+    def __init__(self):
+        """Initialize."""
+
+        self.commands = []
+        self.panels = []
+
+    def id(self):  # noqa: A003
+        """Get the window's ID."""
+
+        return 1
+
+    def active_view(self):
+        """Get the active view."""
+
+        return None
+
+    def run_command(self, name, args=None):
+        """Record a command."""
+
+        self.commands.append(name)
+
+    def show_quick_panel(self, items, *args, **kwargs):
+        """Record the rows of a quick panel."""
+
+        self.panels.append(list(items))
+
+
+class TestPluginSettings(unittest.TestCase):
+    """Test that the plugin only loads settings when they change."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Import the plugin with stand ins for the Sublime API that count settings loads."""
+
+        cls.loads = 0
+        cls.timeouts = []
+        cls.cache = tempfile.mkdtemp()
+        cls.values = {"folder_watcher": "none", "debug": False}
+        cls.settings = Settings(cls.values)
+
+        def load_settings(name):
+            cls.loads += 1
+            return cls.settings
+
+        sublime = types.ModuleType("sublime")
+        sublime.Region = Region
+        sublime.Settings = Settings
+        sublime.load_settings = load_settings
+        sublime.set_timeout = lambda callback, delay=0: cls.timeouts.append(callback)
+        sublime.cache_path = lambda: cls.cache
+        sublime.status_message = lambda msg: None
+        sublime.platform = lambda: {"win32": "windows", "darwin": "osx"}.get(sys.platform, "linux")
+        sublime_plugin = types.ModuleType("sublime_plugin")
+        sublime_plugin.EventListener = type("EventListener", (object,), {})
+        sublime_plugin.ApplicationCommand = type("ApplicationCommand", (object,), {})
+        sublime_plugin.TextCommand = type("TextCommand", (object,), {"__init__": lambda self, view: None})
+        sublime_plugin.WindowCommand = type(
+            "WindowCommand", (object,), {"__init__": lambda self, window: setattr(self, "window", window)}
+        )
+        package = types.ModuleType("FuzzyFileNav")
+        package.__path__ = [ROOT]
+        modules = {"sublime": sublime, "sublime_plugin": sublime_plugin, "FuzzyFileNav": package}
+        with mock.patch.dict(sys.modules, modules):
+            from FuzzyFileNav import fuzzy_file_nav
+        cls.plugin = fuzzy_file_nav
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the cache folder."""
+
+        shutil.rmtree(cls.cache)
+
+    def setUp(self):
+        """Load the plugin and create a folder to navigate."""
+
+        self.tempdir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tempdir, "folder"))
+        with open(os.path.join(self.tempdir, "file.txt"), "w"):
+            pass
+        self.values.update({"folder_watcher": "none", "debug": False})
+        self.plugin.plugin_loaded()
+        del self.timeouts[:]
+        type(self).loads = 0
+
+    def tearDown(self):
+        """Close the panel and remove the folder."""
+
+        self.plugin.FuzzyFileNavCommand.reset()
+        del self.timeouts[:]
+        shutil.rmtree(self.tempdir)
+
+    def navigate(self, window, start):
+        """Run the navigation command and let the folder finish listing."""
+
+        self.plugin.FuzzyFileNavCommand(window).run(start)
+        job = self.plugin.FuzzyFileNavCommand.job
+        if job is not None:
+            job.thread.join()
+        while self.timeouts:
+            self.timeouts.pop(0)()
+
+    def test_keystrokes(self):
+        """Test that key binding contexts queried on every keystroke don't load settings."""
+
+        self.navigate(Window(), self.tempdir)
+        listener = self.plugin.FuzzyEventListener()
+        cmd = self.plugin.FuzzyFileNavCommand
+        keys = ("fuzzy_path_complete", "fuzzy_open_folder", "fuzzy_quick_open", "fuzzy_make_file", "fuzzy_delete")
+        # Rejected keys show a message, which mustn't load the settings either.
+        for text in ("f", "fo", "new.txt", "folder"):
+            cmd.view = View(text)
+            for _ in range(10):
+                for key in keys:
+                    listener.on_query_context(cmd.view, key, None, None, False)
+        self.assertTrue(listener.on_query_context(View("folder"), "fuzzy_open_folder", None, None, False))
+        self.assertTrue(listener.on_query_context(View("new.txt"), "fuzzy_make_file", None, None, False))
+        self.assertEqual(self.loads, 0)
+
+    def test_navigation(self):
+        """Test that opening the panel and moving between folders doesn't load settings."""
+
+        window = Window()
+        for start in (self.tempdir, os.path.join(self.tempdir, "folder"), self.tempdir):
+            self.navigate(window, start)
+        self.assertEqual(window.panels[-1], ["..", "folder" + os.sep, "file.txt"])
+        self.assertEqual(self.loads, 0)
+
+    def test_debug_log(self):
+        """Test that debug logging doesn't load settings."""
+
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for _ in range(100):
+                self.plugin.debug_log("message")
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(self.loads, 0)
+
+    def test_on_change(self):
+        """Test that a settings change loads the settings and is used from then on."""
+
+        self.values["debug"] = True
+        self.settings.callbacks["reload"]()
+        self.assertEqual(self.loads, 1)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            for _ in range(100):
+                self.plugin.debug_log("message")
+        self.assertEqual(out.getvalue(), "FuzzyFileNav: message\n" * 100)
+        self.assertEqual(self.loads, 1)
@@ -0,0 +1,86 @@
+"""Test stat cache."""
+import unittest
+import os
+import shutil
+import tempfile
+from lib import guard, listing, statcache
+
+
+class TestStatCache(unittest.TestCase):
+    """Test the per key press stat cache."""
+
+    def setUp(self):
+        """Create a directory."""
+
+        self.tempdir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tempdir, 'folder'))
+        with open(os.path.join(self.tempdir, 'file'), 'w'):
+            pass
+        os.mkdir(os.path.join(self.tempdir, '.hidden'))
+        self.listing = listing.Listing([e for e in listing.scan(self.tempdir) if not e.is_hidden])
+
+    def tearDown(self):
+        """Remove the directory."""
+
+        shutil.rmtree(self.tempdir)
+
+    def test_listing_records(self):
+        """Test that names in the listing don't need a stat."""
+
+        cache = statcache.StatCache()
+        cache.update(1, self.tempdir, self.listing)
+        self.assertTrue(cache.exists(os.path.join(self.tempdir, 'folder')))
+        self.assertTrue(cache.isdir(os.path.join(self.tempdir, 'folder')))
+        self.assertTrue(cache.exists(os.path.join(self.tempdir, 'file')))
+        self.assertFalse(cache.isdir(os.path.join(self.tempdir, 'file')))
+        self.assertEqual(cache.stats, 0)
+
+    def test_listing_changed(self):
+        """Test that names added to the listing in place are found without a stat."""
+
+        cache = statcache.StatCache()
+        added = os.path.join(self.tempdir, 'added')
+        cache.update(1, self.tempdir, self.listing)
+        self.assertFalse(cache.exists(added))
+        self.listing.insert(listing.Entry('added', True, False, False))
+        cache.update(2, self.tempdir, self.listing)
+        self.assertTrue(cache.isdir(added))
+        self.assertEqual(cache.stats, 1)
+
+    def test_one_stat_per_key(self):
+        """Test that unknown paths are stat'd once per key."""
+
+        cache = statcache.StatCache()
+        hidden = os.path.join(self.tempdir, '.hidden')
+        missing = os.path.join(self.tempdir, 'missing')
+        for _ in range(10):
+            cache.update(1, self.tempdir, self.listing)
+            self.assertTrue(cache.isdir(hidden))
+            self.assertFalse(cache.exists(missing))
+            self.assertTrue(cache.exists(self.tempdir))
+        self.assertEqual(cache.stats, 3)
+
+        # A new key press checks the disk again.
+        with open(missing, 'w'):
+            pass
+        cache.update(2, self.tempdir, self.listing)
+        self.assertTrue(cache.exists(missing))
+        self.assertEqual(cache.stats, 4)
+
+    def test_unreachable(self):
+        """Test that paths that don't respond don't exist and are reported as unreachable."""
+
+        def stat(target):
+            if target.startswith(self.tempdir):
+                return os.stat(target)
+            raise guard.Unreachable(target)
+
+        cache = statcache.StatCache(stat)
+        cache.update(1, self.tempdir, self.listing)
+        stale = os.path.join('/mnt', 'stale', 'file')
+        self.assertFalse(cache.exists(stale))
+        self.assertTrue(cache.unreachable(stale))
+        missing = os.path.join(self.tempdir, 'missing')
+        self.assertFalse(cache.exists(missing))
+        self.assertFalse(cache.unreachable(missing))
+        self.assertFalse(cache.unreachable(os.path.join(self.tempdir, 'folder')))
@@ -0,0 +1,289 @@
+"""Test background copy and move."""
+import unittest
+import os
+import shutil
+import tempfile
+from lib import transfer
+
+
+class TestPasteJob(unittest.TestCase):
+    """Test the paste job."""
+
+    def setUp(self):
+        """Create a tree to paste."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tempdir, 'src')
+        os.makedirs(os.path.join(self.source, 'sub'))
+        for name, size in (('a', 10), (os.path.join('sub', 'b'), 3000)):
+            with open(os.path.join(self.source, name), 'wb') as f:
+                f.write(b'x' * size)
+        os.utime(os.path.join(self.source, 'a'), ns=(10 ** 9, 10 ** 9))
+        self.progress = []
+        self.done = []
+        self.errors = []
+
+    def tearDown(self):
+        """Remove the tree."""
+
+        shutil.rmtree(self.tempdir)
+
+    def job(self, source, dest, move=False):
+        """Create a job that records its callbacks."""
+
+        return transfer.PasteJob(
+            source, dest, move,
+            lambda job: self.progress.append(job.bytes_done),
+            lambda job: self.done.append(job),
+            lambda job, e: self.errors.append(e),
+            chunk_size=1024, interval=0
+        )
+
+    def test_copy_tree(self):
+        """Test that a tree is copied with its metadata and progress is reported."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        job = self.job(self.source, dest)
+        job.work()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(len(self.done), 1)
+        self.assertEqual(os.path.getsize(os.path.join(dest, 'sub', 'b')), 3000)
+        self.assertEqual(os.stat(os.path.join(dest, 'a')).st_mtime_ns, 10 ** 9)
+        self.assertEqual((job.files_done, job.files_total), (2, 2))
+        self.assertEqual((job.bytes_done, job.bytes_total), (3010, 3010))
+        self.assertEqual(self.progress[-1], 3010)
+        self.assertGreater(len(self.progress), 2)
+        self.assertFalse(os.path.exists(job.partial))
+        self.assertTrue(os.path.exists(self.source))
+
+    def test_overwrite(self):
+        """Test that an existing destination is only replaced once the copy is complete."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        os.makedirs(os.path.join(dest, 'old'))
+        self.job(self.source, dest).work()
+        self.assertEqual(sorted(os.listdir(dest)), ['a', 'sub'])
+        self.assertEqual(sorted(os.listdir(self.tempdir)), ['dest', 'src'])
+
+    def test_cancel(self):
+        """Test that a cancelled paste removes its partial copy and leaves the destination alone."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        with open(dest, 'w') as f:
+            f.write('keep')
+        job = self.job(os.path.join(self.source, 'sub', 'b'), dest)
+        job.on_progress = lambda job: job.cancel()
+        job.work()
+        self.assertEqual(self.done, [])
+        self.assertEqual(self.errors, [])
+        self.assertFalse(os.path.exists(job.partial))
+        with open(dest) as f:
+            self.assertEqual(f.read(), 'keep')
+
+    def test_cancel_replaced(self):
+        """Test that a cancelled paste doesn't remove the copy of a paste to the same destination."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        cancelled = self.job(self.source, dest)
+        job = self.job(self.source, dest)
+        self.assertNotEqual(cancelled.partial, job.partial)
+        self.assertTrue(transfer.is_temporary(os.path.basename(job.partial)))
+        self.assertFalse(transfer.is_temporary('notes.ffn-partial.txt'))
+        os.mkdir(job.partial)
+        cancelled.cancel()
+        cancelled.work()
+        self.assertTrue(os.path.exists(job.partial))
+
+    def test_move(self):
+        """Test that a move renames the source into place."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        self.job(self.source, dest, True).work()
+        self.assertEqual(len(self.done), 1)
+        self.assertFalse(os.path.exists(self.source))
+        self.assertEqual(sorted(os.listdir(dest)), ['a', 'sub'])
+
+    def test_error(self):
+        """Test that a failed paste is reported and cleaned up."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        job = self.job(os.path.join(self.tempdir, 'missing'), dest)
+        job.work()
+        self.assertEqual(len(self.errors), 1)
+        self.assertFalse(os.path.exists(dest))
+
+    def test_parallel_tree(self):
+        """Test that a tree of many files is copied by the pool with folder metadata."""
+
+        for i in range(50):
+            folder = os.path.join(self.source, 'many', str(i % 5))
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, str(i)), 'w') as f:
+                f.write(str(i))
+        os.utime(os.path.join(self.source, 'many'), ns=(2 * 10 ** 9, 2 * 10 ** 9))
+        dest = os.path.join(self.tempdir, 'dest')
+        job = self.job(self.source, dest)
+        job.workers = 4
+        job.work()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(job.files_done, 52)
+        with open(os.path.join(dest, 'many', '3', '13')) as f:
+            self.assertEqual(f.read(), '13')
+        self.assertEqual(os.stat(os.path.join(dest, 'many')).st_mtime_ns, 2 * 10 ** 9)
+
+    def test_tree_error(self):
+        """Test that the first error stops a tree copy and removes it."""
+
+        os.symlink(os.path.join(self.tempdir, 'missing'), os.path.join(self.source, 'sub', 'dangling'))
+        dest = os.path.join(self.tempdir, 'dest')
+        job = self.job(self.source, dest)
+        job.work()
+        self.assertEqual(len(self.errors), 1)
+        self.assertIsInstance(self.errors[0], FileNotFoundError)
+        self.assertEqual(self.done, [])
+        self.assertEqual(sorted(os.listdir(self.tempdir)), ['src'])
+
+    def test_copy_methods(self):
+        """Test that every copy method copies a file of several chunks and counts its progress."""
+
+        source = os.path.join(self.tempdir, 'large')
+        data = os.urandom(300000)
+        with open(source, 'wb') as f:
+            f.write(data)
+        chunk_size = transfer.KERNEL_CHUNK_SIZE
+        is_linux = transfer.IS_LINUX
+        try:
+            transfer.KERNEL_CHUNK_SIZE = 4096
+            for linux in (True, False):
+                transfer.IS_LINUX = linux
+                dest = os.path.join(self.tempdir, 'copy')
+                self.progress = []
+                job = self.job(source, dest)
+                job.work()
+                with open(dest, 'rb') as f:
+                    self.assertEqual(f.read(), data)
+                self.assertEqual(job.bytes_done, len(data))
+                self.assertGreater(len(self.progress), 1)
+        finally:
+            transfer.KERNEL_CHUNK_SIZE = chunk_size
+            transfer.IS_LINUX = is_linux
+
+    def test_merge(self):
+        """Test that a merge only copies new and changed files and keeps the destination's other files."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        shutil.copytree(self.source, dest)
+        with open(os.path.join(dest, 'extra'), 'w') as f:
+            f.write('keep')
+        with open(os.path.join(self.source, 'sub', 'b'), 'wb') as f:
+            f.write(b'y' * 2000)
+        with open(os.path.join(self.source, 'sub', 'c'), 'wb') as f:
+            f.write(b'z' * 5)
+        job = self.job(self.source, dest)
+        job.merge = True
+        job.work()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(len(self.done), 1)
+        self.assertEqual(sorted(os.listdir(dest)), ['a', 'extra', 'sub'])
+        self.assertEqual(sorted(os.listdir(os.path.join(dest, 'sub'))), ['b', 'c'])
+        with open(os.path.join(dest, 'sub', 'b'), 'rb') as f:
+            self.assertEqual(f.read(), b'y' * 2000)
+        self.assertEqual((job.files_done, job.files_total, job.files_skipped), (3, 3, 1))
+        self.assertEqual((job.bytes_done, job.bytes_total, job.bytes_skipped), (2005, 2005, 10))
+        self.assertIn('1 unchanged', job.status())
+
+    def test_merge_hash(self):
+        """Test that a merge comparing hashes copies changed contents and skips touched files."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        shutil.copytree(self.source, dest)
+        # Same size and time, different contents.
+        with open(os.path.join(dest, 'a'), 'wb') as f:
+            f.write(b'y' * 10)
+        os.utime(os.path.join(dest, 'a'), ns=(10 ** 9, 10 ** 9))
+        # Same contents, different time.
+        os.utime(os.path.join(dest, 'sub', 'b'), ns=(5 * 10 ** 9, 5 * 10 ** 9))
+
+        # Comparing times misses the changed contents and copies the touched file.
+        job = self.job(self.source, dest)
+        job.merge = True
+        job.work()
+        self.assertEqual(job.files_skipped, 1)
+        with open(os.path.join(dest, 'a'), 'rb') as f:
+            self.assertEqual(f.read(), b'y' * 10)
+
+        os.utime(os.path.join(dest, 'sub', 'b'), ns=(5 * 10 ** 9, 5 * 10 ** 9))
+        job = self.job(self.source, dest)
+        job.merge = True
+        job.compare_hash = True
+        job.work()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(job.files_skipped, 1)
+        with open(os.path.join(dest, 'a'), 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 10)
+        self.assertEqual(
+            os.stat(os.path.join(dest, 'sub', 'b')).st_mtime_ns,
+            os.stat(os.path.join(self.source, 'sub', 'b')).st_mtime_ns
+        )
+
+    def test_merge_move(self):
+        """Test that a merging move copies files that only match by size and time before removing the source."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        shutil.copytree(self.source, dest)
+        with open(os.path.join(dest, 'a'), 'wb') as f:
+            f.write(b'y' * 10)
+        os.utime(os.path.join(dest, 'a'), ns=(10 ** 9, 10 ** 9))
+        outside = os.path.join(self.tempdir, 'outside')
+        os.mkdir(outside)
+        with open(os.path.join(outside, 'c'), 'w') as f:
+            f.write('linked')
+        os.symlink(outside, os.path.join(self.source, 'link'))
+
+        job = self.job(self.source, dest, True)
+        job.merge = True
+        job.work()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(job.files_skipped, 1)
+        with open(os.path.join(dest, 'a'), 'rb') as f:
+            self.assertEqual(f.read(), b'x' * 10)
+        with open(os.path.join(dest, 'link', 'c')) as f:
+            self.assertEqual(f.read(), 'linked')
+        self.assertFalse(os.path.exists(self.source))
+        # The linked folder's files are copied, but only the link is removed.
+        self.assertEqual(os.listdir(outside), ['c'])
+
+    def test_merge_move_partial(self):
+        """Test that a merging move keeps source files that weren't merged."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        os.mkdir(dest)
+        job = self.job(self.source, dest, True)
+        job.merge = True
+        job.copy_tree(self.source, dest)
+        with open(os.path.join(self.source, 'sub', 'new'), 'w') as f:
+            f.write('new')
+        job.remove_merged()
+        self.assertEqual(sorted(os.listdir(self.source)), ['sub'])
+        self.assertEqual(os.listdir(os.path.join(self.source, 'sub')), ['new'])
+
+    def test_merge_error(self):
+        """Test that a merge that fails leaves no partial files behind."""
+
+        dest = os.path.join(self.tempdir, 'dest')
+        os.makedirs(os.path.join(dest, 'a'))
+        job = self.job(self.source, dest)
+        job.merge = True
+        job.work()
+        self.assertEqual(len(self.errors), 1)
+        self.assertEqual(sorted(os.listdir(dest)), ['a', 'sub'])
+        self.assertEqual(os.listdir(os.path.join(dest, 'a')), [])
+        partial = [name for name in os.listdir(os.path.join(dest, 'sub')) if transfer.is_temporary(name)]
+        self.assertEqual(partial, [])
+
+    def test_format_size(self):
+        """Test that sizes are formatted with a unit."""
+
+        self.assertEqual(transfer.format_size(10), '10 B')
+        self.assertEqual(transfer.format_size(1536), '1.5 KB')
+        self.assertEqual(transfer.format_size(3 * 1024 ** 3), '3.0 GB')
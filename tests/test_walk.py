@@ -0,0 +1,76 @@
+"""Test the parallel tree walk."""
+import unittest
+import os
+import shutil
+import tempfile
+from lib import walk
+
+
+class TestWalkJob(unittest.TestCase):
+    """Test the parallel tree walk."""
+
+    def setUp(self):
+        """Create a tree to walk."""
+
+        self.tempdir = tempfile.mkdtemp()
+        for folder in ('a/b/c', 'd', '.hidden'):
+            os.makedirs(os.path.join(self.tempdir, folder))
+        for name in ('top.txt', 'a/1.txt', 'a/b/2.txt', 'a/b/c/3.txt', 'd/4.txt', '.hidden/5.txt'):
+            with open(os.path.join(self.tempdir, name), 'w'):
+                pass
+        self.chunks = []
+        self.done = []
+        self.errors = []
+
+    def tearDown(self):
+        """Remove the tree."""
+
+        shutil.rmtree(self.tempdir)
+
+    def walk(self, root=None, **kwargs):
+        """Walk the tree and wait for the job to finish."""
+
+        job = walk.WalkJob(
+            root or self.tempdir,
+            lambda job, chunk: self.chunks.append(list(chunk)),
+            lambda job: self.done.append(len(job.files)),
+            lambda job, e: self.errors.append(e),
+            sep='/',
+            **kwargs
+        ).start()
+        job.thread.join(5)
+        self.assertFalse(job.is_alive())
+        return job
+
+    def test_walk(self):
+        """Test that every file is found, filtered as the tree is read."""
+
+        job = self.walk(accept=lambda e: not e.name.startswith('.'), workers=4)
+        self.assertEqual(sorted(job.files), ['a/1.txt', 'a/b/2.txt', 'a/b/c/3.txt', 'd/4.txt', 'top.txt'])
+        self.assertEqual(sum(len(c) for c in self.chunks), 5)
+        self.assertEqual(self.done, [5])
+        self.assertFalse(job.truncated)
+        self.assertEqual(job.folders, 5)
+
+    def test_depth(self):
+        """Test that the walk stops at the maximum depth."""
+
+        job = self.walk(accept=lambda e: not e.name.startswith('.'), max_depth=1)
+        self.assertEqual(sorted(job.files), ['a/1.txt', 'd/4.txt', 'top.txt'])
+        job = self.walk(max_depth=0)
+        self.assertEqual(job.files, ['top.txt'])
+
+    def test_cap(self):
+        """Test that the walk stops at the entry cap."""
+
+        job = self.walk(max_entries=2, workers=1)
+        self.assertEqual(len(job.files), 2)
+        self.assertTrue(job.truncated)
+        self.assertEqual(self.done, [2])
+
+    def test_error(self):
+        """Test that an unreadable root is reported."""
+
+        self.walk(os.path.join(self.tempdir, 'missing'))
+        self.assertEqual(len(self.errors), 1)
+        self.assertEqual(self.done, [])
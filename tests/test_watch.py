@@ -0,0 +1,106 @@
+"""Test folder watchers."""
+import unittest
+import os
+import queue
+import shutil
+import sys
+import tempfile
+from lib import watch
+
+
+class _WatcherTests(object):
+    """Tests shared by all watchers."""
+
+    def create(self, callback):
+        """Create the watcher."""
+
+        raise NotImplementedError
+
+    def setUp(self):
+        """Create a folder and a watcher."""
+
+        self.tempdir = tempfile.mkdtemp()
+        self.changes = queue.Queue()
+        self.watcher = self.create(lambda changes: [self.changes.put(c) for c in changes])
+
+    def tearDown(self):
+        """Close the watcher and remove the folder."""
+
+        self.watcher.close()
+        shutil.rmtree(self.tempdir)
+
+    def get_changes(self, count):
+        """Wait for the given number of changes."""
+
+        return [self.changes.get(timeout=5) for _ in range(count)]
+
+    def test_watch_and_clear(self):
+        """Test that watches are tracked and released."""
+
+        self.assertTrue(self.watcher.watch(self.tempdir))
+        self.assertFalse(self.watcher.watch(os.path.join(self.tempdir, 'missing')))
+        self.assertEqual(self.watcher.watched(), [self.tempdir])
+        self.watcher.clear()
+        self.assertEqual(self.watcher.watched(), [])
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is only available on Linux')
+class TestInotifyWatcher(_WatcherTests, unittest.TestCase):
+    """Test the inotify watcher."""
+
+    def create(self, callback):
+        """Create the watcher."""
+
+        return watch.InotifyWatcher(callback)
+
+    def test_changes(self):
+        """Test that added and removed names are reported."""
+
+        self.watcher.watch(self.tempdir)
+        name = os.path.join(self.tempdir, 'file')
+        with open(name, 'w'):
+            pass
+        os.mkdir(os.path.join(self.tempdir, 'folder'))
+        os.remove(name)
+        self.assertEqual(
+            self.get_changes(3),
+            [
+                watch.Change(self.tempdir, 'file', True),
+                watch.Change(self.tempdir, 'folder', True),
+                watch.Change(self.tempdir, 'file', False)
+            ]
+        )
+
+    def test_close(self):
+        """Test that closing the watcher releases its descriptors."""
+
+        before = len(os.listdir('/proc/self/fd'))
+        watcher = watch.InotifyWatcher(lambda changes: None)
+        watcher.watch(self.tempdir)
+        watcher.close()
+        self.assertEqual(len(os.listdir('/proc/self/fd')), before)
+
+    def test_folder_removed(self):
+        """Test that removing the watched folder asks for a relist and drops the watch."""
+
+        folder = os.path.join(self.tempdir, 'folder')
+        os.mkdir(folder)
+        self.watcher.watch(folder)
+        os.rmdir(folder)
+        self.assertEqual(self.get_changes(1), [watch.Change(folder, None, False)])
+
+
+class TestPollingWatcher(_WatcherTests, unittest.TestCase):
+    """Test the polling watcher."""
+
+    def create(self, callback):
+        """Create the watcher."""
+
+        return watch.PollingWatcher(callback, 0.05)
+
+    def test_changes(self):
+        """Test that a change asks for a relist."""
+
+        self.watcher.watch(self.tempdir)
+        os.utime(self.tempdir, ns=(0, 0))
+        self.assertEqual(self.get_changes(1), [watch.Change(self.tempdir, None, False)])
@@ -0,0 +1 @@
+"""FuzzyFileNav development tools."""
@@ -0,0 +1,82 @@
+"""
+Benchmark the parallel tree copy against `shutil.copytree`.
+
+```
+python -m tools.bench_copytree [--files 100000] [--size 2048] [--workers 8] [--repeat 3] [path]
+```
+
+If no path is given, a temporary tree of small files is created.  Copies
+are made next to the source and removed after each run.  The benefit is
+largest on network file systems, where each file costs a round trip.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from lib import transfer
+
+
+def parallel_copy(source, dest, workers):
+    """Copy a tree with `PasteJob`."""
+
+    job = transfer.PasteJob(
+        source, dest, False, lambda job: None, lambda job: None,
+        lambda job, e: print('Error: {}'.format(e)), workers=workers
+    )
+    job.work()
+
+
+def populate(root, count, size, per_folder=500):
+    """Create a tree of `count` files of `size` bytes."""
+
+    data = b'x' * size
+    folder = root
+    for i in range(count):
+        if i % per_folder == 0:
+            folder = os.path.join(root, 'dir_{}'.format(i // per_folder), 'sub')
+            os.makedirs(folder)
+        with open(os.path.join(folder, 'file_{}.txt'.format(i)), 'wb') as f:
+            f.write(data)
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(prog='bench_copytree', description='Benchmark tree copies.')
+    parser.add_argument('path', nargs='?', default=None, help='Folder to copy.')
+    parser.add_argument('--files', type=int, default=100000, help='Files in the generated tree.')
+    parser.add_argument('--size', type=int, default=2048, help='Size of the generated files.')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel copy threads.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs.')
+    args = parser.parse_args()
+
+    tempdir = tempfile.mkdtemp()
+    source = args.path
+    if source is None:
+        source = os.path.join(tempdir, 'source')
+        os.mkdir(source)
+        populate(source, args.files, args.size)
+    dest = os.path.join(tempdir, 'copy')
+
+    try:
+        count = sum(len(names) for _, _, names in os.walk(source))
+        print('Copying {} ({} files)'.format(source, count))
+        for name, fn in (
+            ('copytree', lambda: shutil.copytree(source, dest)),
+            ('parallel', lambda: parallel_copy(source, dest, args.workers))
+        ):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+                shutil.rmtree(dest)
+            print('{:>8}: {:8.2f} s ({:.0f} files/s)'.format(name, best, count / best))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark `regex_exclude` filtering.
+
+```
+python -m tools.bench_exclude [--names 100000] [--patterns 40] [--repeat 5]
+```
+
+Compares calling `re.match` for every pattern on every name with the
+compiled `Excludes` matcher.
+"""
+import argparse
+import random
+import re
+import time
+from lib import listing
+
+EXTENSIONS = ['txt', 'py', 'c', 'h', 'o', 'so', 'pyc', 'log', 'tmp', 'json', 'md', 'png', 'jpg', 'zip']
+
+
+def make_patterns(count):
+    """Create a set of exclusion patterns similar to real configurations."""
+
+    patterns = [r'.*\.(DS_Store|svn|git)$']
+    i = 0
+    while len(patterns) < count:
+        patterns.append(r'.*\.{}_{}$'.format(EXTENSIONS[i % len(EXTENSIONS)], i))
+        patterns.append(r'build_{}\d*$'.format(i))
+        patterns.append(r'(?:node_modules|__pycache__|\.cache)_{}$'.format(i))
+        i += 1
+    return patterns[:count]
+
+
+def make_names(count):
+    """Create file names."""
+
+    rand = random.Random(0)
+    return [
+        'file_{}_{}.{}'.format(i, rand.randint(0, 50), EXTENSIONS[rand.randint(0, len(EXTENSIONS) - 1)])
+        for i in range(count)
+    ]
+
+
+def legacy_filter(names, patterns):
+    """Filter names the way `get_files` did before compiled patterns."""
+
+    result = []
+    for f in names:
+        valid = True
+        for regex in patterns:
+            if re.match(regex, f):
+                valid = False
+        if valid:
+            result.append(f)
+    return result
+
+
+def compiled_filter(names, patterns):
+    """Filter names with the compiled matcher (compiled once, as on settings load)."""
+
+    excludes = listing.Excludes(patterns)
+    return [f for f in names if not excludes.match(f)]
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(prog='bench_exclude', description='Benchmark exclusion patterns.')
+    parser.add_argument('--names', type=int, default=100000, help='Number of names to filter.')
+    parser.add_argument('--patterns', type=int, default=40, help='Number of exclusion patterns.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs.')
+    args = parser.parse_args()
+
+    names = make_names(args.names)
+    patterns = make_patterns(args.patterns)
+    assert legacy_filter(names, patterns) == compiled_filter(names, patterns)
+
+    print('Filtering {} names with {} patterns'.format(len(names), len(patterns)))
+    for label, fn in (('re.match', legacy_filter), ('compiled', compiled_filter)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn(names, patterns)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print('{:>9}: {:8.2f} ms'.format(label, best * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark copying a large file with `PasteJob` against `shutil.copyfile` and a buffered copy.
+
+```
+python -m tools.bench_filecopy [--size 2048] [--repeat 3] [path]
+```
+
+If no path is given, a temporary file of `--size` megabytes is created.
+Copies are made next to the source and removed after each run.  The
+source is in the page cache after the first run, so this measures the
+cost of the copy itself rather than of reading the disk.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from lib import transfer
+
+
+def job_copy(source, dest, kernel=True):
+    """Copy a file with `PasteJob`, optionally without the kernel side methods."""
+
+    is_linux = transfer.IS_LINUX
+    transfer.IS_LINUX = is_linux and kernel
+    try:
+        transfer.PasteJob(
+            source, dest, False, lambda job: None, lambda job: None,
+            lambda job, e: print('Error: {}'.format(e))
+        ).work()
+    finally:
+        transfer.IS_LINUX = is_linux
+
+
+def populate(target, size):
+    """Create a file of `size` megabytes."""
+
+    block = os.urandom(1024 * 1024)
+    with open(target, 'wb') as f:
+        for _ in range(size):
+            f.write(block)
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(prog='bench_filecopy', description='Benchmark large file copies.')
+    parser.add_argument('path', nargs='?', default=None, help='File to copy.')
+    parser.add_argument('--size', type=int, default=2048, help='Size of the generated file in megabytes.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs.')
+    args = parser.parse_args()
+
+    tempdir = tempfile.mkdtemp()
+    source = args.path
+    if source is None:
+        source = os.path.join(tempdir, 'source')
+        populate(source, args.size)
+    dest = os.path.join(tempdir, 'copy')
+
+    try:
+        size = os.path.getsize(source)
+        print('Copying {} ({})'.format(source, transfer.format_size(size)))
+        methods = (
+            ('copyfile', lambda: shutil.copyfile(source, dest)),
+            ('buffered', lambda: job_copy(source, dest, False)),
+            ('kernel', lambda: job_copy(source, dest))
+        )
+        best = {}
+        # Methods take turns, and the previous copy is written out before the next one starts,
+        # so no method pays for another's write back.
+        for _ in range(args.repeat):
+            for name, fn in methods:
+                start = time.perf_counter()
+                fn()
+                elapsed = time.perf_counter() - start
+                best[name] = min(best.get(name, elapsed), elapsed)
+                os.remove(dest)
+                if hasattr(os, 'sync'):
+                    os.sync()
+        for name, _ in methods:
+            print('{:>8}: {:8.2f} s ({}/s)'.format(name, best[name], transfer.format_size(size / best[name])))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark the fuzzy matcher.
+
+```
+python -m tools.bench_fuzzy [--sizes 100000,1000000,5000000] [--processes 0] [--limit 100]
+```
+
+Synthetic paths are generated for each size and a fixed set of queries
+is run against them.  Queries per second are reported for independent
+queries and for a typing session, where each query extends the last and
+only the previous matches are scored again.  `--processes` sets the
+worker processes used for lists over a million candidates (by default,
+one per CPU).
+"""
+import argparse
+import os
+import random
+import time
+from lib import fuzzy
+
+WORDS = [
+    'src', 'lib', 'test', 'tests', 'docs', 'core', 'util', 'utils', 'main', 'app', 'api', 'client', 'server',
+    'model', 'view', 'controller', 'config', 'build', 'vendor', 'common', 'data', 'index', 'parser', 'render'
+]
+EXTENSIONS = ['py', 'js', 'ts', 'c', 'h', 'md', 'json', 'txt', 'html', 'css']
+QUERIES = ['main', 'srcutil', 'cfgjs', 'testparser', 'apiclientpy', 'x', 'docsindexmd', 'zzq']
+
+
+def make_paths(count):
+    """Create paths similar to a source tree."""
+
+    rand = random.Random(0)
+    paths = []
+    for i in range(count):
+        depth = rand.randint(1, 6)
+        parts = [rand.choice(WORDS) for _ in range(depth)]
+        paths.append('/'.join(parts) + '/{}_{}.{}'.format(rand.choice(WORDS), i, rand.choice(EXTENSIONS)))
+    return paths
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(prog='bench_fuzzy', description='Benchmark fuzzy matching.')
+    parser.add_argument('--sizes', default='100000,1000000,5000000', help='Comma separated candidate counts.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Worker processes over 1M.')
+    parser.add_argument('--limit', type=int, default=100, help='Results kept per query.')
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(',')):
+        paths = make_paths(size)
+        start = time.perf_counter()
+        matcher = fuzzy.Matcher(paths, args.processes)
+        prepared = time.perf_counter() - start
+        try:
+            # Warm up the worker processes, if any.
+            matcher.search('warm', args.limit)
+
+            start = time.perf_counter()
+            for q in QUERIES:
+                matcher.last = None
+                matcher.search(q, args.limit)
+            independent = len(QUERIES) / (time.perf_counter() - start)
+
+            typed = 0
+            start = time.perf_counter()
+            for q in QUERIES:
+                matcher.last = None
+                for i in range(1, len(q) + 1):
+                    matcher.search(q[:i], args.limit)
+                    typed += 1
+            typing = typed / (time.perf_counter() - start)
+
+            print(
+                '{:>9} paths: prepare {:8.0f} ms  {:8.1f} queries/s  {:8.1f} queries/s typing  (processes: {})'.format(
+                    size, prepared * 1000, independent, typing, matcher.processes
+                )
+            )
+        finally:
+            matcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Benchmark the directory listing engine against the `os.listdir` implementation.
+
+```
+python -m tools.bench_listing [--entries 50000] [--repeat 5] [path]
+```
+
+If no path is given, a temporary folder with the requested number of entries
+is created.  Wall time is always reported.  Stat calls made from Python are
+counted by wrapping `os.stat`; if `strace` is available, kernel level system
+call totals are reported as well.
+"""
+import argparse
+import os
+import os.path as path
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from lib import listing
+
+
+def legacy_get_files(cwd, hide_hidden=True, regex_exclude=()):
+    """List a folder the way `get_files` did before the `scandir` engine."""
+
+    files = os.listdir(cwd)
+    folders = []
+    documents = []
+    for f in files:
+        valid = True
+        full_path = path.join(cwd, f)
+        if hide_hidden:
+            if f.startswith('.') and f != "..":
+                valid = False
+            if valid:
+                for regex in regex_exclude:
+                    if re.match(regex, f):
+                        valid = False
+        if valid:
+            if not path.isdir(full_path):
+                documents.append(f)
+            else:
+                folders.append(f + "/")
+    return [".."] + sorted(folders) + sorted(documents)
+
+
+def scandir_get_files(cwd, hide_hidden=True, regex_exclude=()):
+    """List a folder with the `scandir` engine."""
+
+    entries = listing.scan(cwd)
+    if hide_hidden:
+        excludes = listing.Excludes(regex_exclude)
+        entries = [e for e in entries if not e.is_hidden and not excludes.match(e.name)]
+    return listing.Listing(entries, '/').names
+
+
+IMPLEMENTATIONS = {
+    'listdir': legacy_get_files,
+    'scandir': scandir_get_files
+}
+
+
+def populate(folder, count):
+    """Populate a folder with files and folders."""
+
+    for i in range(count):
+        name = path.join(folder, 'entry_{:07d}'.format(i))
+        if i % 10 == 0:
+            os.mkdir(name)
+        else:
+            with open(name, 'w'):
+                pass
+
+
+def count_stats(fn, cwd):
+    """Count the stat calls made from Python while running `fn`."""
+
+    counter = [0]
+    original = os.stat, os.lstat
+
+    def counted(func):
+        def wrapper(*args, **kwargs):
+            counter[0] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    os.stat, os.lstat = counted(original[0]), counted(original[1])
+    try:
+        fn(cwd, regex_exclude=[r'.*\.(DS_Store|svn|git)$'])
+    finally:
+        os.stat, os.lstat = original
+    return counter[0]
+
+
+def strace_totals(name, cwd):
+    """Run an implementation under `strace` and return total and stat family system call counts."""
+
+    with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+        out = f.name
+    try:
+        subprocess.check_call(
+            ['strace', '-f', '-c', '-o', out, sys.executable, '-m', 'tools.bench_listing', '--child', name, cwd],
+            stdout=subprocess.DEVNULL
+        )
+        total = stats = 0
+        with open(out) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 5 or not parts[3].isdigit():
+                    continue
+                calls = int(parts[3])
+                if parts[-1] == 'total':
+                    total = calls
+                elif 'stat' in parts[-1]:
+                    stats += calls
+        return total, stats
+    finally:
+        os.remove(out)
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(prog='bench_listing', description='Benchmark directory listing.')
+    parser.add_argument('path', nargs='?', default=None, help='Folder to list.')
+    parser.add_argument('--entries', type=int, default=50000, help='Entries to create when no path is given.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs.')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        IMPLEMENTATIONS[args.child](args.path)
+        return
+
+    tempdir = None
+    cwd = args.path
+    if cwd is None:
+        tempdir = cwd = tempfile.mkdtemp()
+        populate(cwd, args.entries)
+
+    try:
+        assert legacy_get_files(cwd) == scandir_get_files(cwd)
+        use_strace = sys.platform.startswith('linux') and shutil.which('strace')
+        print('Listing {} ({} entries)'.format(cwd, len(os.listdir(cwd))))
+        for name, fn in IMPLEMENTATIONS.items():
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn(cwd, regex_exclude=[r'.*\.(DS_Store|svn|git)$'])
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print('{:>8}: {:8.2f} ms  python stat calls: {}'.format(name, best * 1000, count_stats(fn, cwd)))
+            if use_strace:
+                total, stats = strace_totals(name, cwd)
+                print('{:>8}  syscalls: {} (stat family: {})'.format('', total, stats))
+        if not use_strace:
+            print('strace not available; kernel level system call counts skipped.')
+    finally:
+        if tempdir is not None:
+            shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark the memory used by folder listings.
+
+```
+python -m tools.bench_memory [--entries 100000,1000000,3000000]
+```
+
+Each listing is built in a fresh process from synthetic entry records,
+once with the packed `Listing` and once with the lists of strings and
+records it replaced.  Peak resident memory (`ru_maxrss`) above the
+process's baseline is reported, along with the memory the finished
+listing keeps once its input is released (measured with `tracemalloc`
+in a separate run, as tracing inflates the peak).  Unix only.
+"""
+import argparse
+import gc
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from lib import listing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class ListListing(object):
+    """The listing as it was stored before packing: sorted lists of display names and entry records."""
+
+    def __init__(self, entries, sep):
+        """Sort the entries and build the display names."""
+
+        folders = sorted(((e.name + sep, e) for e in entries if e.is_dir), key=lambda x: x[0])
+        documents = sorted(((e.name, e) for e in entries if not e.is_dir), key=lambda x: x[0])
+        self.names = [listing.PARENT.name]
+        self.entries = [listing.PARENT]
+        for name, entry in folders + documents:
+            self.names.append(name)
+            self.entries.append(entry)
+
+
+IMPLEMENTATIONS = {
+    'lists': ListListing,
+    'packed': listing.Listing
+}
+
+
+def make_entries(count):
+    """Create entry records similar to a large folder, in the order a scan might return them."""
+
+    return [
+        listing.Entry('entry_{:08d}_{}.txt'.format((i * 7919) % count, i % 13), i % 10 == 0, i % 50 == 0, False)
+        for i in range(count)
+    ]
+
+
+def peak_kib():
+    """Get the peak resident memory of this process in KiB."""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def child(name, count, trace):
+    """Build one listing and report its cost as JSON."""
+
+    if trace:
+        # Traced from before the input is made, as the old listing keeps the input's records.
+        tracemalloc.start()
+    entries = make_entries(count)
+    gc.collect()
+    baseline = peak_kib()
+    start = time.perf_counter()
+    result = IMPLEMENTATIONS[name](entries, '/')
+    elapsed = time.perf_counter() - start
+    peak = peak_kib() - baseline
+    del entries
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] if trace else None
+    assert len(result.names) == count + 1
+    print(json.dumps({'peak': peak, 'retained': retained, 'elapsed': elapsed}))
+
+
+def run(name, count, trace):
+    """Run a child process and get its report."""
+
+    out = subprocess.check_output(
+        [sys.executable, '-m', 'tools.bench_memory', '--child', name, '--entries', str(count)] +
+        (['--trace'] if trace else [])
+    )
+    return json.loads(out.decode('utf-8'))
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(prog='bench_memory', description='Benchmark listing memory.')
+    parser.add_argument('--entries', default='100000,1000000,3000000', help='Comma separated entry counts.')
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if resource is None:
+        print('The resource module is not available on this platform.')
+        return
+
+    if args.child:
+        child(args.child, int(args.entries), args.trace)
+        return
+
+    for count in (int(c) for c in args.entries.split(',')):
+        for name in IMPLEMENTATIONS:
+            report = run(name, count, False)
+            retained = run(name, count, True)['retained']
+            print(
+                '{:>9} entries {:>7}: peak +{:8.1f} MiB  retained {:8.1f} MiB ({:6.1f} B/entry)  {:8.0f} ms'.format(
+                    count, name, report['peak'] / 1024, retained / 1048576, retained / count,
+                    report['elapsed'] * 1000
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
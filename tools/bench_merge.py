@@ -0,0 +1,90 @@
+"""
+Benchmark pasting a folder over an earlier copy of itself.
+
+```
+python -m tools.bench_merge [--files 20000] [--size 65536] [--changed 10] [--workers 8] [--repeat 3] [path]
+```
+
+If no path is given, a temporary tree is created.  A copy of the tree is
+made first; before each run, `--changed` of its files are edited in the
+source.  Each run then pastes the source over the copy: `replace` copies
+the whole tree and swaps it in, `merge` only copies files whose size or
+modified time differ, and `hash` compares the contents of files of the
+same size.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from lib import transfer
+from tools.bench_copytree import populate
+
+
+def paste(source, dest, workers, merge=False, compare_hash=False):
+    """Paste a tree with `PasteJob`, returning the job."""
+
+    job = transfer.PasteJob(
+        source, dest, False, lambda job: None, lambda job: None,
+        lambda job, e: print('Error: {}'.format(e)), workers=workers, merge=merge, compare_hash=compare_hash
+    )
+    job.work()
+    return job
+
+
+def edit(files, run):
+    """Change some files of the source."""
+
+    for target in files:
+        with open(target, 'r+b') as f:
+            f.write('{:08d}'.format(run).encode('ascii'))
+        os.utime(target, (time.time() + run * 10, time.time() + run * 10))
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(prog='bench_merge', description='Benchmark merge pastes.')
+    parser.add_argument('path', nargs='?', default=None, help='Folder to paste.')
+    parser.add_argument('--files', type=int, default=20000, help='Files in the generated tree.')
+    parser.add_argument('--size', type=int, default=65536, help='Size of the generated files.')
+    parser.add_argument('--changed', type=int, default=10, help='Files edited before each run.')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel copy threads.')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs.')
+    args = parser.parse_args()
+
+    tempdir = tempfile.mkdtemp()
+    source = os.path.join(tempdir, 'source')
+    if args.path is None:
+        os.mkdir(source)
+        populate(source, args.files, args.size)
+    else:
+        shutil.copytree(args.path, source)
+    dest = os.path.join(tempdir, 'copy')
+
+    try:
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(source) for name in names)
+        changed = files[::max(len(files) // max(args.changed, 1), 1)][:args.changed]
+        shutil.copytree(source, dest)
+        print('Pasting {} ({} files, {} changed)'.format(source, len(files), len(changed)))
+        run = 0
+        for name, merge, compare_hash in (
+            ('replace', False, False),
+            ('merge', True, False),
+            ('hash', True, True)
+        ):
+            best = None
+            for _ in range(args.repeat):
+                run += 1
+                edit(changed, run)
+                start = time.perf_counter()
+                job = paste(source, dest, args.workers, merge, compare_hash)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print('{:>8}: {:8.2f} s ({} files copied)'.format(name, best, job.files_done - job.files_skipped))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == "__main__":
+    main()